@@ -0,0 +1,67 @@
+from flask import Flask, Response, request, jsonify, render_template
+from flask_cors import CORS, cross_origin
+from cnnClassifier.utils.common import decodeImageBytes
+from cnnClassifier.config.configuration import ConfigurationManager
+from cnnClassifier.pipeline.prediction import PredictionPipeline
+from cnnClassifier.components.micro_batcher import MicroBatcher
+from cnnClassifier.utils.metrics import REGISTRY, CONTENT_TYPE
+
+
+app = Flask(__name__)
+CORS(app)
+
+
+class ClientApp:
+    def __init__(self):
+        # One warm model shared by every request; concurrent requests are micro-batched
+        config = ConfigurationManager().get_prediction_config()
+        self.classifier = PredictionPipeline(config=config)
+        self.batcher = MicroBatcher(
+            self.classifier.predict_bytes,
+            max_batch_size=config.params_max_batch_size,
+            max_wait_ms=config.params_max_wait_ms
+        )
+
+
+@app.route("/", methods=['GET'])
+@cross_origin()
+def home():
+    return render_template('index.html')
+
+
+@app.route("/predict", methods=['POST'])
+@cross_origin()
+def predictRoute():
+    """
+    Accepts {"image": <base64>} or {"images": [<base64>, ...]}.
+    """
+    payload = request.get_json(force=True)
+    images = payload["images"] if "images" in payload else [payload["image"]]
+    futures = [clApp.batcher.submit(decodeImageBytes(image)) for image in images]
+    return jsonify([future.result() for future in futures])
+
+
+@app.route("/cache", methods=['GET'])
+@cross_origin()
+def cacheRoute():
+    cache = clApp.classifier.cache
+    return jsonify(cache.stats() if cache is not None else {})
+
+
+@app.route("/latency", methods=['GET'])
+@cross_origin()
+def latencyRoute():
+    # p50/p95/p99 model latency per batch bucket (traced Keras runners only)
+    latency = getattr(clApp.classifier.model, "latency", None)
+    return jsonify(latency.report() if latency is not None else {})
+
+
+@app.route("/metrics", methods=['GET'])
+def metricsRoute():
+    # Prometheus text format: images, inference latency, queue depth, cache hit rate, memory
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+
+if __name__ == "__main__":
+    clApp = ClientApp()
+    app.run(host='0.0.0.0', port=8080, threaded=True)
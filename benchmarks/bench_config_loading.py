@@ -0,0 +1,67 @@
+"""
+Measures the per-call cost of loading the configuration and of the utils helpers.
+
+Compares re-parsing both YAML files (what every ConfigurationManager did
+before) with the process-wide snapshot, and load_json with and without the
+ensure_annotations checks (enabled with CNNCLASSIFIER_DEBUG=1).
+
+Run from the repository root:
+    python benchmarks/bench_config_loading.py --runs 200
+"""
+import json
+import logging
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from ensure import ensure_annotations
+from cnnClassifier import logger
+from cnnClassifier.constants import CONFIG_FILE_PATH, PARAMS_FILE_PATH
+from cnnClassifier.config.configuration import ConfigurationManager
+from cnnClassifier.utils.common import read_yaml, load_json, save_json
+
+
+def per_call_us(func, runs):
+    func()  # warm-up
+    start = time.perf_counter()
+    for _ in range(runs):
+        func()
+    return round(1e6 * (time.perf_counter() - start) / runs, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=200, help="Calls timed per case")
+    args = parser.parse_args()
+
+    # Keep log I/O out of the measurement
+    logger.setLevel(logging.WARNING)
+
+    def parse_both_files():
+        read_yaml(CONFIG_FILE_PATH)
+        read_yaml(PARAMS_FILE_PATH)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_file = Path(tmp_dir) / "data.json"
+        save_json(path=json_file, data={"VGG16": {"images_per_sec": 10.0}})
+        checked_load_json = ensure_annotations(load_json)
+
+        results = {
+            "config": {
+                "parse_yaml_files_us": per_call_us(parse_both_files, args.runs),
+                "snapshot_manager_us": per_call_us(ConfigurationManager, args.runs),
+                "snapshot_training_config_us": per_call_us(
+                    lambda: ConfigurationManager().get_training_config(), args.runs
+                )
+            },
+            "load_json": {
+                "ensure_annotations_us": per_call_us(lambda: checked_load_json(json_file), args.runs),
+                "unchecked_us": per_call_us(lambda: load_json(json_file), args.runs)
+            }
+        }
+
+    print(json.dumps(results, indent=4))
+
+
+if __name__ == "__main__":
+    main()
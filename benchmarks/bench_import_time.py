@@ -0,0 +1,68 @@
+"""
+Checks that the light entry points import quickly and without TensorFlow.
+
+Every module is imported in a fresh interpreter, so the numbers are cold
+import times. Exits with 1 when a module is over the budget or loads
+TensorFlow:
+    python benchmarks/bench_import_time.py --budget 0.5
+
+tests/test_import_time.py asserts the same budget under pytest.
+"""
+import sys
+import json
+import argparse
+import subprocess
+
+MODULES = [
+    "cnnClassifier",
+    "cnnClassifier.cli",
+    "cnnClassifier.utils.common",
+    "cnnClassifier.config.configuration",
+    "cnnClassifier.pipeline.stage_runner",
+    "cnnClassifier.pipeline.stage_01_data_ingestion",
+    "cnnClassifier.pipeline.stage_01b_data_sharding",
+    "cnnClassifier.pipeline.stage_02_prepare_base_model",
+    "cnnClassifier.pipeline.stage_03_model_trainer",
+    "cnnClassifier.pipeline.stage_04_model_quantization",
+    "cnnClassifier.pipeline.prediction",
+]
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+print(json.dumps({{"seconds": time.perf_counter() - start, "tensorflow": "tensorflow" in sys.modules}}))
+"""
+
+
+def import_time(module):
+    # Best of a few runs, to keep disk cache noise out of the check
+    runs = []
+    for _ in range(3):
+        output = subprocess.run([sys.executable, "-c", PROBE.format(module=module)],
+                                capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return min(runs, key=lambda run: run["seconds"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=float, default=0.5, help="Seconds allowed per module import")
+    parser.add_argument("--modules", nargs="+", default=MODULES, help="Modules to check")
+    args = parser.parse_args()
+
+    results = {}
+    failed = False
+    for module in args.modules:
+        result = import_time(module)
+        result["seconds"] = round(result["seconds"], 4)
+        result["ok"] = result["seconds"] <= args.budget and not result["tensorflow"]
+        failed = failed or not result["ok"]
+        results[module] = result
+
+    print(json.dumps({"budget_seconds": args.budget, "modules": results}, indent=4))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
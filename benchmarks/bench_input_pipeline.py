@@ -0,0 +1,29 @@
+"""
+Compares the images/sec of the ImageDataGenerator and tf.data training loaders.
+
+Run from the repository root after the data ingestion stage:
+    python benchmarks/bench_input_pipeline.py --batches 50
+    python benchmarks/bench_input_pipeline.py --batches 50 --augmentation
+"""
+import argparse
+import json
+from cnnClassifier.config.configuration import ConfigurationManager
+from cnnClassifier.components.model_trainer import benchmark_loaders
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batches", type=int, default=50, help="Timed batches per loader")
+    parser.add_argument("--loaders", nargs="+", default=["generator", "tf_data"], help="Loaders to compare")
+    parser.add_argument("--augmentation", action=argparse.BooleanOptionalAction,
+                        help="Benchmark with/without augmentation (defaults to AUGMENTATION)")
+    args = parser.parse_args()
+
+    training_config = ConfigurationManager().get_training_config()
+    results = benchmark_loaders(training_config, loaders=args.loaders, num_batches=args.batches,
+                                augmentation=args.augmentation)
+    print(json.dumps(results, indent=4))
+
+
+if __name__ == "__main__":
+    main()
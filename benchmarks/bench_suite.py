@@ -0,0 +1,371 @@
+"""
+End-to-end performance suite on synthetic CT-like slices (no Kaggle download).
+
+Generates a small 3-class dataset of grayscale "CT slices", then times:
+  - extract:    DataIngestion.extract_zip_file and the dataset index
+  - loaders:    images/sec of the generator, tf_data and shards loaders
+  - model:      PrepareBaseModel build/save and model load
+  - training:   Training step time on prefetched batches
+  - inference:  latency percentiles per batch size, Keras predict vs the traced runner
+
+Run from the repository root:
+    python benchmarks/bench_suite.py --output bench.json
+    python benchmarks/bench_suite.py --baseline bench.json --tolerance 0.15
+
+With --baseline, metrics that got worse by more than the tolerance are listed
+and the exit code is 1. Metrics ending in "_per_sec" are higher-is-better,
+"_ms" and "_seconds" lower-is-better; other values are informational.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import zipfile
+import argparse
+import platform
+import tempfile
+import numpy as np
+from pathlib import Path
+from PIL import Image
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+CLASSES = ("adenocarcinoma", "normal", "squamous.cell.carcinoma")
+
+
+def synthetic_slice(rng, size, label):
+    """
+    A grayscale axial "CT slice": body ellipse, two dark lungs, noise and a
+    few bright nodules whose number depends on the class.
+    """
+    y, x = np.mgrid[0:size, 0:size] / size
+    image = np.zeros((size, size), np.float32)
+    body = ((x - 0.5) / rng.uniform(0.38, 0.45)) ** 2 + ((y - 0.5) / rng.uniform(0.30, 0.36)) ** 2 < 1
+    image[body] = 110
+    for cx in (0.35, 0.65):
+        lung = ((x - cx + rng.uniform(-0.02, 0.02)) / 0.12) ** 2 + ((y - 0.48) / 0.2) ** 2 < 1
+        image[lung] = 25
+    for _ in range(2 * label + rng.integers(0, 2)):
+        cx, cy, r = rng.uniform(0.28, 0.72), rng.uniform(0.32, 0.64), rng.uniform(0.01, 0.03)
+        image[(x - cx) ** 2 + (y - cy) ** 2 < r ** 2] = 200
+    image += rng.normal(0, 12, image.shape)
+    return np.clip(image, 0, 255).astype(np.uint8)
+
+
+def make_dataset(workdir, images_per_class, size, seed=0):
+    """
+    Writes the slices as PNG/JPEG under curated_data/curated_data/<class>/ and zips them
+    like the Kaggle archive.
+    """
+    rng = np.random.default_rng(seed)
+    source = workdir / "source"
+    for label, class_name in enumerate(CLASSES):
+        class_dir = source / "curated_data" / "curated_data" / class_name
+        class_dir.mkdir(parents=True, exist_ok=True)
+        for i in range(images_per_class):
+            extension = "png" if i % 2 else "jpg"
+            Image.fromarray(synthetic_slice(rng, size, label)).convert("RGB").save(class_dir / f"slice_{i:05d}.{extension}")
+
+    archive = workdir / "synthetic_ct.zip"
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zip_ref:
+        for file in sorted(source.rglob("*")):
+            if file.is_file():
+                zip_ref.write(file, file.relative_to(source).as_posix())
+    shutil.rmtree(source)
+    return archive
+
+
+def write_config(workdir, archive, args):
+    import yaml
+
+    config = yaml.safe_load((REPO_ROOT / "config" / "config.yaml").read_text())
+    config["data_ingestion"]["source_URL"] = str(archive)
+    (workdir / "config").mkdir(exist_ok=True)
+    (workdir / "config" / "config.yaml").write_text(yaml.safe_dump(config))
+
+    params = yaml.safe_load((REPO_ROOT / "params.yaml").read_text())
+    params.update(
+        IMAGE_SIZE=[args.image_size, args.image_size, 3],
+        BACKBONE=args.backbone,
+        WEIGHTS=None,
+        BATCH_SIZE=args.batch_size,
+        EPOCHS=1,
+        AUGMENTATION=False,
+        CHECKPOINTS_TO_KEEP=0,
+        HEAD_BENCHMARK=False,
+        BACKBONE_BENCHMARK=[]
+    )
+    (workdir / "params.yaml").write_text(yaml.safe_dump(params))
+    return params
+
+
+def percentiles_ms(seconds):
+    ms = 1000 * np.asarray(seconds)
+    return {
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "mean_ms": round(float(ms.mean()), 3)
+    }
+
+
+def bench_extract(config_manager):
+    from cnnClassifier.components.data_ingestion import DataIngestion
+
+    ingestion_config = config_manager.get_data_ingestion_config()
+    data_ingestion = DataIngestion(config=ingestion_config)
+    data_ingestion.download_file()
+
+    with zipfile.ZipFile(ingestion_config.local_data_file) as zip_ref:
+        members = [member for member in zip_ref.infolist() if not member.is_dir()]
+    megabytes = sum(member.file_size for member in members) / 2**20
+
+    start = time.perf_counter()
+    data_ingestion.extract_zip_file()
+    extract_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    data_ingestion.extract_zip_file()
+    skip_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    data_ingestion.build_index()
+    index_seconds = time.perf_counter() - start
+
+    return {
+        "files": len(members),
+        "extract_seconds": round(extract_seconds, 4),
+        "extract_files_per_sec": round(len(members) / extract_seconds, 2),
+        "extract_mb_per_sec": round(megabytes / extract_seconds, 2),
+        "re_extract_seconds": round(skip_seconds, 4),
+        "index_seconds": round(index_seconds, 4)
+    }
+
+
+def bench_loaders(config_manager, num_batches):
+    from cnnClassifier.components.data_sharding import DataSharding
+    from cnnClassifier.components.model_trainer import benchmark_loaders
+
+    start = time.perf_counter()
+    DataSharding(config=config_manager.get_data_sharding_config()).build()
+    shard_seconds = time.perf_counter() - start
+
+    results = benchmark_loaders(
+        config_manager.get_training_config(), loaders=("generator", "tf_data", "shards"), num_batches=num_batches
+    )
+    results = {loader: {"images_per_sec": result["images_per_sec"]} for loader, result in results.items()}
+    results["shard_build_seconds"] = round(shard_seconds, 4)
+    return results
+
+
+def bench_model(config_manager):
+    import tensorflow as tf
+    from cnnClassifier.components.prepare_base_model import PrepareBaseModel
+
+    prepare_base_model_config = config_manager.get_prepare_base_model_config()
+    prepare_base_model = PrepareBaseModel(config=prepare_base_model_config)
+
+    start = time.perf_counter()
+    prepare_base_model.get_base_model()
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    prepare_base_model.update_base_model()
+    update_seconds = time.perf_counter() - start
+
+    model_path = Path(prepare_base_model_config.updated_base_model_path)
+    start = time.perf_counter()
+    prepare_base_model.save_model(path=model_path, model=prepare_base_model.full_model)
+    save_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tf.keras.models.load_model(model_path)
+    load_seconds = time.perf_counter() - start
+
+    return {
+        "build_and_save_backbone_seconds": round(build_seconds, 4),
+        "add_head_and_save_seconds": round(update_seconds, 4),
+        "save_seconds": round(save_seconds, 4),
+        "load_seconds": round(load_seconds, 4),
+        "model_size_mb": round(model_path.stat().st_size / 2**20, 2),
+        "params": int(prepare_base_model.full_model.count_params())
+    }
+
+
+def bench_training(config_manager, steps):
+    from cnnClassifier.components.model_trainer import Training
+
+    training = Training(config=config_manager.get_training_config())
+    training.configure_runtime()
+    training.get_base_model()
+    training.restore_checkpoint()
+    training.train_valid_generator()
+
+    # Batches are fetched first, so only the step itself is timed
+    iterator = iter(training.train_generator)
+    batches = [next(iterator) for _ in range(steps + 2)]
+    for x, y in batches[:2]:
+        training.model.train_on_batch(x, y)  # warm-up (tracing)
+
+    durations = []
+    for x, y in batches[2:]:
+        start = time.perf_counter()
+        training.model.train_on_batch(x, y)
+        durations.append(time.perf_counter() - start)
+
+    batch_size = int(batches[0][0].shape[0])
+    return {
+        "batch_size": batch_size,
+        **{f"step_{key}": value for key, value in percentiles_ms(durations).items()},
+        "images_per_sec": round(batch_size * len(durations) / sum(durations), 2)
+    }
+
+
+def bench_inference(config_manager, batch_sizes, runs):
+    from cnnClassifier.components.model_runner import KerasModelRunner, TracedModelRunner
+
+    prepare_base_model_config = config_manager.get_prepare_base_model_config()
+    model_path = prepare_base_model_config.updated_base_model_path
+    image_size = list(prepare_base_model_config.params_image_size)
+    serving_config = config_manager.get_prediction_config()
+
+    start = time.perf_counter()
+    traced = TracedModelRunner(model_path, image_size, serving_config.params_batch_buckets)
+    results = {"traced_startup_seconds": round(time.perf_counter() - start, 4)}
+
+    for name, runner in [("keras", KerasModelRunner(model_path)), ("traced", traced)]:
+        results[name] = {}
+        for batch_size in batch_sizes:
+            batch = np.random.uniform(-1, 1, (batch_size, *image_size)).astype(np.float32)
+            start = time.perf_counter()
+            runner.predict(batch)
+            first_ms = 1000 * (time.perf_counter() - start)
+            durations = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                runner.predict(batch)
+                durations.append(time.perf_counter() - start)
+            results[name][f"batch_{batch_size}"] = {
+                "first_call_ms": round(first_ms, 3),
+                **percentiles_ms(durations),
+                "images_per_sec": round(batch_size * runs / sum(durations), 2)
+            }
+    return results
+
+
+def flatten(results, prefix=""):
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, prefix=f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(results, baseline, tolerance):
+    """
+    Lists the metrics that are worse than the baseline by more than `tolerance` (relative).
+    """
+    current, previous = flatten(results), flatten(baseline)
+    regressions = []
+    for name, value in sorted(current.items()):
+        old = previous.get(name)
+        if not old:
+            continue
+        metric = name.rsplit(".", 1)[-1]
+        if metric.endswith("_per_sec"):
+            change = (old - value) / old
+        elif metric.endswith(("_ms", "_seconds")):
+            change = (value - old) / old
+        else:
+            continue
+        if change > tolerance:
+            regressions.append({"metric": name, "baseline": old, "current": value, "worse_by": round(change, 3)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images-per-class", type=int, default=64, help="Synthetic slices per class")
+    parser.add_argument("--slice-size", type=int, default=512, help="Side of the generated slices in pixels")
+    parser.add_argument("--image-size", type=int, default=224, help="Model input side (IMAGE_SIZE)")
+    parser.add_argument("--backbone", default="VGG16", help="BACKBONE of the benchmarked model")
+    parser.add_argument("--batch-size", type=int, default=16, help="Training BATCH_SIZE")
+    parser.add_argument("--loader-batches", type=int, default=20, help="Timed batches per loader")
+    parser.add_argument("--train-steps", type=int, default=10, help="Timed training steps")
+    parser.add_argument("--inference-batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--inference-runs", type=int, default=30, help="Timed calls per batch size")
+    parser.add_argument("--benchmarks", nargs="+", default=["extract", "loaders", "model", "training", "inference"],
+                        choices=["extract", "loaders", "model", "training", "inference"])
+    parser.add_argument("--workdir", help="Directory for the synthetic data and artifacts (temporary by default)")
+    parser.add_argument("--output", help="JSON file the results are written to")
+    parser.add_argument("--baseline", help="JSON results of a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative slowdown per metric")
+    args = parser.parse_args()
+
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="cnnclassifier_bench_")).resolve()
+    workdir.mkdir(parents=True, exist_ok=True)
+    output = Path(args.output).resolve() if args.output else None
+    baseline = json.loads(Path(args.baseline).read_text()) if args.baseline else None
+
+    archive = make_dataset(workdir, args.images_per_class, args.slice_size)
+    params = write_config(workdir, archive, args)
+
+    import tensorflow as tf
+    from cnnClassifier.config.configuration import ConfigurationManager
+    from cnnClassifier.pipeline.stage_runner import git_commit
+
+    commit = git_commit()
+    os.chdir(workdir)
+
+    config_manager = ConfigurationManager()
+    benchmarks = {
+        # The later benchmarks use the data and model produced by the earlier ones
+        "extract": lambda: bench_extract(config_manager),
+        "loaders": lambda: bench_loaders(config_manager, args.loader_batches),
+        "model": lambda: bench_model(config_manager),
+        "training": lambda: bench_training(config_manager, args.train_steps),
+        "inference": lambda: bench_inference(config_manager, args.inference_batch_sizes, args.inference_runs)
+    }
+    needed = set(args.benchmarks)
+    if needed & {"loaders", "training"}:
+        needed.add("extract")
+    if needed & {"training", "inference"}:
+        needed.add("model")
+
+    results = {}
+    for name, run in benchmarks.items():
+        if name in needed:
+            results[name] = run()
+
+    report = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "git_commit": commit,
+            "python": sys.version.split()[0],
+            "tensorflow": tf.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "images": args.images_per_class * len(CLASSES),
+            "slice_size": args.slice_size,
+            "image_size": params["IMAGE_SIZE"],
+            "backbone": params["BACKBONE"],
+            "batch_size": params["BATCH_SIZE"]
+        },
+        "results": {name: results[name] for name in args.benchmarks}
+    }
+    if baseline is not None:
+        report["regressions"] = compare(report["results"], baseline["results"], args.tolerance)
+
+    print(json.dumps(report, indent=4))
+    if output is not None:
+        output.write_text(json.dumps(report, indent=4))
+    if not args.workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+    sys.exit(1 if report.get("regressions") else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -27,5 +27,8 @@ setuptools.setup(
         "Bug Tracker": f"https://github.com/{AUTHOR_USER_NAME}/{REPO_NAME}/issues",
     },
     package_dir={"": "src"},  # Root directory for the package source
-    packages=setuptools.find_packages(where="src")  # Automatically find packages in the specified directory
+    packages=setuptools.find_packages(where="src"),  # Automatically find packages in the specified directory
+    entry_points={  # Command line tools installed with the package
+        "console_scripts": ["cnnclassifier = cnnClassifier.cli:main"],
+    },
 )
\ No newline at end of file
@@ -1,6 +1,9 @@
 import os  # Import the os module for interacting with the operating system
 import sys  # Import the sys module for system-specific parameters and functions
+import queue  # Import the queue module for the queue between the logging calls and the handlers
+import atexit  # Import the atexit module to flush the log queue when the process exits
 import logging  # Import the logging module for logging events
+import logging.handlers  # Import QueueHandler and QueueListener
 
 # Define the logging format string
 logging_str = "[%(asctime)s: %(levelname)s: %(module)s: %(message)s]"
@@ -12,14 +15,28 @@ log_filepath = os.path.join(log_dir, "running_logs.log")
 # Create the log directory if it doesn't exist
 os.makedirs(log_dir, exist_ok=True)
 
+# The file and console handlers run on a listener thread, so logging calls in the training
+# loop or a request handler only put the record on a queue and never wait for disk I/O
+formatter = logging.Formatter(logging_str)
+file_handler = logging.FileHandler(log_filepath)  # Log to a file
+stream_handler = logging.StreamHandler(sys.stdout)  # Log to the console (stdout)
+for handler in (file_handler, stream_handler):
+    handler.setFormatter(formatter)
+
+log_queue = queue.SimpleQueue()
+log_listener = logging.handlers.QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+log_listener.start()
+# Write the records still queued before the process exits
+atexit.register(log_listener.stop)
+
+# The queue handler passes the bare message on, the listener's handlers add logging_str
+queue_handler = logging.handlers.QueueHandler(log_queue)
+queue_handler.setFormatter(logging.Formatter("%(message)s"))
+
 # Configure the logging settings
 logging.basicConfig(
     level=logging.INFO,  # Set the logging level to INFO
-    format=logging_str,  # Set the logging format
-    handlers=[
-        logging.FileHandler(log_filepath),  # Log to a file
-        logging.StreamHandler(sys.stdout)   # Log to the console (stdout)
-    ]
+    handlers=[queue_handler]
 )
 
 # Create a logger object for the cnnClassifier
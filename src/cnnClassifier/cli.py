@@ -0,0 +1,137 @@
+import sys
+import json
+import argparse
+from dataclasses import replace
+from cnnClassifier.config.configuration import ConfigurationManager
+from cnnClassifier.utils.instrumentation import span, write_run_report
+from cnnClassifier import logger
+
+# Pipelines and components are imported inside the commands, so `cnnclassifier --help`
+# and commands that do not touch a model never load TensorFlow.
+
+
+def ingest(args):
+    from cnnClassifier.pipeline.stage_01_data_ingestion import DataIngestionTrainingPipeline
+    from cnnClassifier.pipeline.stage_01b_data_sharding import DataShardingTrainingPipeline
+    from cnnClassifier.pipeline.context import PipelineContext
+
+    context = PipelineContext()
+    with span("Data Ingestion stage"):
+        DataIngestionTrainingPipeline(context=context).main()
+    with span("Data Sharding stage"):
+        DataShardingTrainingPipeline(context=context).main()
+
+
+def prepare(args):
+    from cnnClassifier.pipeline.stage_02_prepare_base_model import PrepareBaseModelTrainingPipeline
+
+    with span("Prepare base model"):
+        PrepareBaseModelTrainingPipeline().main()
+
+
+def train(args):
+    if args.num_workers:
+        from cnnClassifier.pipeline.distributed_training import main as distributed_main
+
+        return distributed_main(["--num-workers", str(args.num_workers)])
+
+    from cnnClassifier.pipeline.stage_03_model_trainer import ModelTrainingPipeline
+
+    with span("Training"):
+        ModelTrainingPipeline().main()
+
+
+def predict(args):
+    from cnnClassifier.pipeline.prediction import main as prediction_main
+
+    with span("Prediction"):
+        prediction_main(args.args)
+
+
+def run(args):
+    from cnnClassifier.pipeline.stage_runner import main as stage_runner_main
+
+    stage_runner_main(args.args)
+
+
+def bench(args):
+    config = ConfigurationManager()
+    if args.target == "loaders":
+        from cnnClassifier.components.model_trainer import benchmark_loaders
+
+        results = benchmark_loaders(config.get_training_config(), loaders=args.loaders, num_batches=args.batches,
+                                    augmentation=args.augmentation)
+    else:
+        from cnnClassifier.components.prepare_base_model import PrepareBaseModel
+
+        prepare_base_model_config = config.get_prepare_base_model_config()
+        if args.target == "backbones" and args.backbones:
+            prepare_base_model_config = replace(prepare_base_model_config, params_backbone_benchmark=args.backbones)
+        if args.target == "backbones" and args.accuracy_epochs is not None:
+            prepare_base_model_config = replace(prepare_base_model_config,
+                                                params_backbone_benchmark_accuracy_epochs=args.accuracy_epochs)
+        prepare_base_model = PrepareBaseModel(config=prepare_base_model_config)
+        if args.target == "heads":
+            prepare_base_model.get_base_model()
+            results = prepare_base_model.benchmark_heads()
+        else:
+            results = prepare_base_model.benchmark_backbones()
+    print(json.dumps(results, indent=4))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cnnclassifier", description="Chest CT cancer classifier pipeline")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("ingest", help="Download and extract the dataset (and build shards)").set_defaults(func=ingest)
+    commands.add_parser("prepare", help="Build the base model and its classification head").set_defaults(func=prepare)
+
+    train_parser = commands.add_parser("train", help="Train the model")
+    train_parser.add_argument("--num-workers", type=int, default=0,
+                              help="Train on this many local worker processes (multi_worker_mirrored)")
+    train_parser.set_defaults(func=train)
+
+    predict_parser = commands.add_parser("predict", add_help=False,
+                                         help="Score CT slices, see `cnnclassifier predict --help`")
+    predict_parser.set_defaults(func=predict)
+
+    run_parser = commands.add_parser("run", add_help=False,
+                                     help="Run the out-of-date stages, see `cnnclassifier run --help`")
+    run_parser.set_defaults(func=run)
+
+    bench_parser = commands.add_parser("bench", help="Benchmark the loaders, heads or backbones")
+    bench_parser.add_argument("target", choices=["loaders", "heads", "backbones"])
+    bench_parser.add_argument("--batches", type=int, default=50, help="Timed batches per loader")
+    bench_parser.add_argument("--loaders", nargs="+", default=["generator", "tf_data"], help="Loaders to compare")
+    bench_parser.add_argument("--augmentation", action=argparse.BooleanOptionalAction,
+                              help="Benchmark the loaders with/without augmentation (defaults to AUGMENTATION)")
+    bench_parser.add_argument("--backbones", nargs="+", help="Backbones to compare (defaults to BACKBONE_BENCHMARK)")
+    bench_parser.add_argument("--accuracy-epochs", type=int,
+                              help="Head training epochs before the backbone accuracy is measured "
+                                   "(defaults to BACKBONE_BENCHMARK_ACCURACY_EPOCHS, 0 skips it)")
+    bench_parser.set_defaults(func=bench)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    # predict and run forward their arguments to the prediction and stage runner parsers
+    args, forwarded = parser.parse_known_args(argv)
+    if args.command in ("predict", "run"):
+        args.args = forwarded
+    elif forwarded:
+        parser.error(f"unrecognized arguments: {' '.join(forwarded)}")
+    try:
+        with span(args.command):
+            exit_code = args.func(args)
+    except Exception as e:
+        logger.exception(e)
+        raise e
+    # `run` writes its own pipeline report
+    if args.command != "run":
+        write_run_report(ConfigurationManager().get_instrumentation_config().report_dir, args.command)
+    return exit_code or 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
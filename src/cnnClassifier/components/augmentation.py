@@ -0,0 +1,131 @@
+import math
+import tensorflow as tf
+
+# ImageDataGenerator transforms used when AUGMENTATION is enabled
+AUGMENTATION_KWARGS = dict(
+    rotation_range=40,
+    horizontal_flip=True,
+    width_shift_range=0.2,
+    height_shift_range=0.2,
+    shear_range=0.2,
+    zoom_range=0.2
+)
+
+
+def random_affine_transforms(seed, batch_size, height, width, rotation_range=0, width_shift_range=0.,
+                             height_shift_range=0., shear_range=0., zoom_range=0.):
+    """
+    Draws one random affine transform per image, with the ranges and
+    composition of ImageDataGenerator (rotation, shift, shear, zoom around
+    the image center).
+
+    The matrices are built in the (x=column, y=row) order of
+    ImageProjectiveTransformV3: the width shift moves images horizontally,
+    the height shift vertically, and the center is (width/2, height/2) for
+    any IMAGE_SIZE. (Keras 2.12 scales the horizontal shift by the height
+    and centers x on height/2, so on non-square images it differs.)
+
+    Args:
+        seed (tf.Tensor): Stateless seed, shape [2].
+        batch_size (tf.Tensor): Number of transforms.
+        height, width (tf.Tensor): Image size in pixels.
+        rotation_range (float): Degrees, drawn from [-rotation_range, rotation_range].
+        width_shift_range, height_shift_range (float): Fraction of the image size.
+        shear_range (float): Shear angle in degrees.
+        zoom_range (float): Zoom drawn from [1 - zoom_range, 1 + zoom_range], per axis.
+
+    Returns:
+        tf.Tensor: [batch_size, 8] projective transforms mapping output to input
+        pixels, as taken by ImageProjectiveTransformV3.
+    """
+    seeds = tf.random.experimental.stateless_split(seed, num=6)
+    height, width = tf.cast(height, tf.float32), tf.cast(width, tf.float32)
+
+    def uniform(i, low, high):
+        return tf.random.stateless_uniform([batch_size], seed=seeds[i], minval=low, maxval=high)
+
+    theta = uniform(0, -rotation_range, rotation_range) * (math.pi / 180)
+    tx = uniform(1, -width_shift_range, width_shift_range) * width
+    ty = uniform(2, -height_shift_range, height_shift_range) * height
+    shear = uniform(3, -shear_range, shear_range) * (math.pi / 180)
+    zx = uniform(4, 1 - zoom_range, 1 + zoom_range)
+    zy = uniform(5, 1 - zoom_range, 1 + zoom_range)
+
+    zeros, ones = tf.zeros_like(theta), tf.ones_like(theta)
+
+    def matrices(*rows):
+        return tf.reshape(tf.stack(rows, axis=-1), [-1, 3, 3])
+
+    rotation = matrices(tf.cos(theta), -tf.sin(theta), zeros, tf.sin(theta), tf.cos(theta), zeros, zeros, zeros, ones)
+    shift = matrices(ones, zeros, tx, zeros, ones, ty, zeros, zeros, ones)
+    shear_matrix = matrices(ones, -tf.sin(shear), zeros, zeros, tf.cos(shear), zeros, zeros, zeros, ones)
+    zoom = matrices(zx, zeros, zeros, zeros, zy, zeros, zeros, zeros, ones)
+
+    # Pixel centers as in keras' transform_matrix_offset_center, x along the width
+    o_x, o_y = width / 2 - 0.5, height / 2 - 0.5
+    offset = tf.stack([tf.stack([1., 0., o_x]), tf.stack([0., 1., o_y]), tf.constant([0., 0., 1.])])
+    reset = tf.stack([tf.stack([1., 0., -o_x]), tf.stack([0., 1., -o_y]), tf.constant([0., 0., 1.])])
+    transform = offset @ rotation @ shift @ shear_matrix @ zoom @ reset
+
+    return tf.concat([
+        tf.reshape(transform, [-1, 9])[:, :6],
+        tf.zeros([batch_size, 2], tf.float32)
+    ], axis=1)
+
+
+def augment_batch(images, seed, rotation_range=0, horizontal_flip=False, width_shift_range=0.,
+                  height_shift_range=0., shear_range=0., zoom_range=0.):
+    """
+    Applies random ImageDataGenerator-style transforms to a whole batch at once.
+
+    Every image gets its own affine transform, applied by one batched
+    ImageProjectiveTransformV3 op (bilinear, "nearest" fill as in
+    ImageDataGenerator), then a random horizontal flip.
+
+    Args:
+        images (tf.Tensor): [batch, height, width, channels] images.
+        seed (tf.Tensor): Stateless seed, shape [2]; the same seed gives the same transforms.
+        Other arguments: the AUGMENTATION_KWARGS ranges.
+
+    Returns:
+        tf.Tensor: float32 augmented images.
+    """
+    images = tf.cast(images, tf.float32)
+    shape = tf.shape(images)
+    affine_seed, flip_seed = tf.unstack(tf.random.experimental.stateless_split(seed, num=2))
+
+    transforms = random_affine_transforms(
+        affine_seed, shape[0], shape[1], shape[2],
+        rotation_range=rotation_range,
+        width_shift_range=width_shift_range,
+        height_shift_range=height_shift_range,
+        shear_range=shear_range,
+        zoom_range=zoom_range
+    )
+    images = tf.raw_ops.ImageProjectiveTransformV3(
+        images=images,
+        transforms=transforms,
+        output_shape=shape[1:3],
+        fill_value=0.0,
+        interpolation="BILINEAR",
+        fill_mode="NEAREST"
+    )
+
+    if horizontal_flip:
+        flip = tf.random.stateless_uniform([shape[0]], seed=flip_seed) < 0.5
+        images = tf.where(flip[:, None, None, None], tf.reverse(images, axis=[2]), images)
+    return images
+
+
+def augment_dataset(dataset, seed=None, augmentation_kwargs=AUGMENTATION_KWARGS):
+    """
+    Augments the images of a batched (images, labels) dataset inside the tf.data graph.
+
+    Every batch gets the next seed of a tf.data random stream, so the
+    augmented batches of a seeded dataset are reproducible.
+    """
+    seeds = tf.data.Dataset.random(seed=seed).batch(2)
+    return tf.data.Dataset.zip((dataset, seeds)).map(
+        lambda batch, batch_seed: (augment_batch(batch[0], batch_seed, **augmentation_kwargs), batch[1]),
+        num_parallel_calls=tf.data.AUTOTUNE
+    )
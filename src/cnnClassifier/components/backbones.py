@@ -0,0 +1,89 @@
+import os
+import tensorflow as tf
+from pathlib import Path
+from cnnClassifier import logger
+
+# Backbone name -> (tf.keras.applications module holding preprocess_input, constructor)
+BACKBONES = {
+    "VGG16": ("vgg16", "VGG16"),
+    "MobileNetV3Small": ("mobilenet_v3", "MobileNetV3Small"),
+    "MobileNetV3Large": ("mobilenet_v3", "MobileNetV3Large"),
+    "EfficientNetB0": ("efficientnet", "EfficientNetB0"),
+    "ResNet50": ("resnet50", "ResNet50"),
+}
+
+
+def _application_module(name):
+    if name not in BACKBONES:
+        raise ValueError(f"Unknown BACKBONE {name!r}, expected one of {sorted(BACKBONES)}")
+    return getattr(tf.keras.applications, BACKBONES[name][0])
+
+
+def get_preprocess_fn(name):
+    """
+    Returns the preprocess_input function the backbone was trained with.
+
+    It maps float pixels in [0, 255] to what the backbone expects (e.g. caffe
+    mean subtraction for VGG16/ResNet50, identity for MobileNetV3/EfficientNet,
+    which rescale inside the model).
+    """
+    return _application_module(name).preprocess_input
+
+
+def build_backbone(name, input_shape, weights, include_top, weights_cache_dir=None):
+    """
+    Builds a backbone from the registry, loading its weights from a local cache when possible.
+
+    The first time pre-trained weights are downloaded they are stored under
+    `weights_cache_dir`, so later builds (or machines where that directory is
+    pre-populated) work offline.
+
+    Args:
+        name (str): Backbone name, one of BACKBONES.
+        input_shape (list): Model input size, e.g. [224, 224, 3].
+        weights (str): "imagenet", None or a weights file path.
+        include_top (bool): Whether to keep the original classification layers.
+        weights_cache_dir (Path, optional): Directory of cached weight files.
+
+    Returns:
+        tf.keras.Model: The backbone.
+    """
+    _application_module(name)  # validates the name
+    constructor = getattr(tf.keras.applications, BACKBONES[name][1])
+    kwargs = dict(input_shape=input_shape, include_top=include_top)
+
+    cache_file = None
+    if weights == "imagenet" and weights_cache_dir is not None:
+        suffix = "top" if include_top else "notop"
+        cache_file = Path(weights_cache_dir) / f"{name}_{weights}_{'x'.join(map(str, input_shape))}_{suffix}.h5"
+
+    if cache_file is not None and cache_file.exists():
+        model = constructor(weights=None, **kwargs)
+        model.load_weights(cache_file)
+        logger.info(f"Loaded {name} weights from {cache_file}")
+        return model
+
+    model = constructor(weights=weights, **kwargs)
+    if cache_file is not None:
+        os.makedirs(cache_file.parent, exist_ok=True)
+        model.save_weights(cache_file)
+        logger.info(f"Cached {name} weights at {cache_file}")
+    return model
+
+
+def count_flops(model, input_shape):
+    """
+    Counts the floating point operations of one forward pass at batch size 1.
+    """
+    from tensorflow.python.framework.convert_to_constants import convert_variables_to_constants_v2
+
+    concrete = tf.function(lambda x: model(x, training=False)).get_concrete_function(
+        tf.TensorSpec([1, *input_shape], tf.float32)
+    )
+    frozen = convert_variables_to_constants_v2(concrete)
+    options = tf.compat.v1.profiler.ProfileOptionBuilder.float_operation()
+    options["output"] = "none"
+    profile = tf.compat.v1.profiler.profile(
+        graph=frozen.graph, run_meta=tf.compat.v1.RunMetadata(), cmd="op", options=options
+    )
+    return int(profile.total_float_ops)
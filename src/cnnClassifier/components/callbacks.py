@@ -0,0 +1,283 @@
+import time
+import numpy as np
+import tensorflow as tf
+from pathlib import Path
+from cnnClassifier import logger
+from cnnClassifier.utils.common import save_json
+from cnnClassifier.utils.instrumentation import get_recorder
+from cnnClassifier.utils.metrics import IMAGES, INPUT_WAIT, TRAIN_STEP, EPOCH_DURATION
+
+
+class ThroughputCallback(tf.keras.callbacks.Callback):
+    def __init__(self, batch_size: int, report_file: Path = None, profile: dict = None):
+        """
+        Records images/sec and step times of every training epoch.
+
+        Epochs are kept across several fit() calls (training one epoch per fit
+        works too) and the report is written to `report_file` after each epoch.
+
+        Args:
+            batch_size (int): Images per training step.
+            report_file (Path, optional): JSON file the report is written to.
+            profile (dict, optional): Settings stored alongside the measurements.
+        """
+        super().__init__()
+        self.batch_size = batch_size
+        self.report_file = report_file
+        self.profile = profile or {}
+        self.epochs = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._epoch_start = time.perf_counter()
+        self._step_times = []
+
+    def on_train_batch_begin(self, batch, logs=None):
+        self._step_start = time.perf_counter()
+
+    def on_train_batch_end(self, batch, logs=None):
+        self._step_times.append(time.perf_counter() - self._step_start)
+
+    def on_epoch_end(self, epoch, logs=None):
+        elapsed = time.perf_counter() - self._epoch_start
+        steps = np.asarray(self._step_times)
+        # The first step includes tracing (and XLA compilation), so it is reported apart
+        steady = steps[1:] if len(steps) > 1 else steps
+        train_time = float(steps.sum())
+        result = {
+            "epoch": epoch + 1,
+            "steps": int(len(steps)),
+            "epoch_seconds": round(elapsed, 3),
+            "first_step_ms": round(1000 * float(steps[0]), 3) if len(steps) else None,
+            "mean_step_ms": round(1000 * float(steady.mean()), 3) if len(steady) else None,
+            "p95_step_ms": round(1000 * float(np.percentile(steady, 95)), 3) if len(steady) else None,
+            "images_per_sec": round(len(steps) * self.batch_size / train_time, 2) if train_time > 0 else None
+        }
+        self.epochs.append(result)
+        get_recorder().record(f"epoch {epoch + 1}", self._epoch_start, elapsed, steps=result["steps"])
+        logger.info(f"Epoch {epoch + 1} throughput: {result['images_per_sec']} images/sec, {result['mean_step_ms']} ms/step")
+
+        if self.report_file is not None:
+            save_json(path=Path(self.report_file), data=self.report())
+
+    def report(self) -> dict:
+        return {"batch_size": self.batch_size, "profile": self.profile, "epochs": self.epochs}
+
+
+def can_sync_checkpoint(checkpoint: tf.train.Checkpoint) -> bool:
+    """
+    True when this TensorFlow version lets sync_checkpoint wait for asynchronous writes.
+    """
+    return callable(getattr(checkpoint, "sync", None)) or hasattr(checkpoint, "_async_checkpointer_impl")
+
+
+def sync_checkpoint(checkpoint: tf.train.Checkpoint):
+    """
+    Waits for the asynchronous writes of a checkpoint to finish.
+    """
+    sync = getattr(checkpoint, "sync", None)
+    if callable(sync):
+        sync()
+        return
+    # TensorFlow 2.12 has no public sync(), the async writer is created on the first async save
+    async_checkpointer = getattr(checkpoint, "_async_checkpointer_impl", None)
+    if async_checkpointer is not None:
+        async_checkpointer.sync()
+
+
+class CheckpointCallback(tf.keras.callbacks.Callback):
+    def __init__(self, manager: tf.train.CheckpointManager, epoch: tf.Variable, step: tf.Variable,
+                 steps_per_epoch: int, every_steps: int = 0, background: bool = False):
+        """
+        Saves the training state every `every_steps` steps and at the end of every epoch.
+
+        `epoch` counts completed epochs and `step` the steps completed in the
+        current one, so together they give the position of the data stream.
+
+        Args:
+            manager (tf.train.CheckpointManager): Manager of the checkpoint holding the state.
+            epoch (tf.Variable): Completed epochs.
+            step (tf.Variable): Completed steps of the current epoch.
+            steps_per_epoch (int): Steps of a full epoch.
+            every_steps (int): Save interval in steps (0 only saves at the end of epochs).
+            background (bool): Copy the variables and write them on a background thread,
+                so training continues during the write (only where sync_checkpoint can
+                wait for the writes, saves are in the foreground otherwise).
+        """
+        super().__init__()
+        if background and not can_sync_checkpoint(manager.checkpoint):
+            logger.warning("This TensorFlow version cannot wait for asynchronous checkpoints, saving in the foreground")
+            background = False
+        self.manager = manager
+        self.options = tf.train.CheckpointOptions(experimental_enable_async_checkpoint=background)
+        self.epoch = epoch
+        self.step = step
+        self.steps_per_epoch = steps_per_epoch
+        self.every_steps = every_steps
+
+    def _save(self):
+        global_step = int(self.epoch.numpy()) * self.steps_per_epoch + int(self.step.numpy())
+        start = time.perf_counter()
+        path = self.manager.save(checkpoint_number=global_step, options=self.options)
+        logger.info(f"Saved checkpoint {path} ({1000 * (time.perf_counter() - start):.1f} ms in the training loop)")
+
+    def on_train_batch_end(self, batch, logs=None):
+        self.step.assign_add(1)
+        step = int(self.step.numpy())
+        # The last step of an epoch is saved by on_epoch_end under the same number
+        if self.every_steps and step % self.every_steps == 0 and step < self.steps_per_epoch:
+            self._save()
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.epoch.assign(epoch + 1)
+        self.step.assign(0)
+        self._save()
+
+    def on_train_end(self, logs=None):
+        sync_checkpoint(self.manager.checkpoint)
+
+
+class MetricsCallback(tf.keras.callbacks.Callback):
+    def __init__(self, batch_size: int):
+        """
+        Feeds the training step times, epoch durations and processed images
+        into the /metrics histograms and counters.
+        """
+        super().__init__()
+        self.batch_size = batch_size
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._epoch_start = time.perf_counter()
+
+    def on_train_batch_begin(self, batch, logs=None):
+        self._step_start = time.perf_counter()
+
+    def on_train_batch_end(self, batch, logs=None):
+        TRAIN_STEP.observe(time.perf_counter() - self._step_start)
+        IMAGES.inc(self.batch_size, phase="train")
+
+    def on_epoch_end(self, epoch, logs=None):
+        EPOCH_DURATION.observe(time.perf_counter() - self._epoch_start)
+
+
+class InputWaitCallback(tf.keras.callbacks.Callback):
+    def __init__(self):
+        """
+        Splits every training step into input wait and compute time.
+
+        The training data goes through wrap(), which feeds it to fit() one
+        batch at a time and times how long every batch takes to arrive (input
+        wait); the rest of the step, timed between on_train_batch_begin and
+        on_train_batch_end, is compute. Only single-replica training is
+        instrumented.
+        """
+        super().__init__()
+        self.epochs = []
+        self._instrumented = False
+        self._step_wait = 0.0
+
+    def wrap(self, data):
+        """
+        Returns `data` (a tf.data.Dataset or a Keras iterator such as an
+        ImageDataGenerator flow) as a dataset that records the input wait of
+        every batch. Distributed data is returned unchanged.
+        """
+        if isinstance(data, tf.keras.utils.experimental.DatasetCreator):
+            logger.warning("Input wait is only measured for single-replica training")
+            return data
+
+        iterator = iter(data)
+        if isinstance(data, tf.data.Dataset):
+            signature, peeked = data.element_spec, []
+        else:
+            # The first batch is read now for its shapes, its wait counts towards the first step
+            start = time.perf_counter()
+            peeked = [next(iterator)]
+            self._step_wait += time.perf_counter() - start
+            signature = tuple(
+                tf.TensorSpec((None, *np.shape(x)[1:]), tf.as_dtype(np.asarray(x).dtype)) for x in peeked[0]
+            )
+
+        def batches():
+            while peeked:
+                yield peeked.pop()
+            while True:
+                start = time.perf_counter()
+                try:
+                    batch = next(iterator)
+                except StopIteration:
+                    return
+                self._step_wait += time.perf_counter() - start
+                yield batch
+
+        dataset = tf.data.Dataset.from_generator(batches, output_signature=signature)
+        # A prefetch here would fetch the next batch during the step and hide the wait
+        options = tf.data.Options()
+        options.experimental_optimization.inject_prefetch = False
+        self._instrumented = True
+        return dataset.with_options(options)
+
+    def on_train_end(self, logs=None):
+        get_recorder().add_section("input_wait", self.epochs)
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._wait = 0.0
+        self._compute = 0.0
+
+    def on_train_batch_begin(self, batch, logs=None):
+        self._step_start = time.perf_counter()
+
+    def on_train_batch_end(self, batch, logs=None):
+        # The logs are converted to numbers before the callbacks run, so the step is done here
+        elapsed = time.perf_counter() - self._step_start
+        wait, self._step_wait = self._step_wait, 0.0
+        self._wait += wait
+        self._compute += max(elapsed - wait, 0.0)
+        if self._instrumented:
+            INPUT_WAIT.observe(wait)
+
+    def on_epoch_end(self, epoch, logs=None):
+        if not self._instrumented:
+            return
+        total = self._wait + self._compute
+        result = {
+            "epoch": epoch + 1,
+            "input_wait_seconds": round(self._wait, 3),
+            "compute_seconds": round(self._compute, 3),
+            "input_bound_fraction": round(self._wait / total, 4) if total else None
+        }
+        self.epochs.append(result)
+        logger.info(f"Epoch {epoch + 1}: {result['input_wait_seconds']}s waiting for input, {result['compute_seconds']}s computing")
+
+
+class ProfilerWindowCallback(tf.keras.callbacks.Callback):
+    def __init__(self, start_step: int, stop_step: int, logdir: Path):
+        """
+        Records a TensorFlow profiler trace of training steps [start_step, stop_step)
+        (counted over the whole run) into `logdir`, viewable in TensorBoard.
+        """
+        super().__init__()
+        self.start_step = start_step
+        self.stop_step = stop_step
+        self.logdir = str(logdir)
+        self._step = 0
+        self._tracing = False
+
+    def on_train_batch_begin(self, batch, logs=None):
+        if self._step == self.start_step and not self._tracing:
+            tf.profiler.experimental.start(self.logdir)
+            self._tracing = True
+            logger.info(f"Profiler trace started at step {self._step}")
+
+    def on_train_batch_end(self, batch, logs=None):
+        self._step += 1
+        if self._tracing and self._step >= self.stop_step:
+            self._stop()
+
+    def on_train_end(self, logs=None):
+        if self._tracing:
+            self._stop()
+
+    def _stop(self):
+        tf.profiler.experimental.stop()
+        self._tracing = False
+        logger.info(f"Profiler trace written to {self.logdir}")
@@ -0,0 +1,253 @@
+import os
+import hashlib
+import numpy as np
+import tensorflow as tf
+from pathlib import Path
+from cnnClassifier import logger
+from cnnClassifier.entity.config_entity import DataShardingConfig
+from cnnClassifier.components.input_pipeline import decode_and_resize, normalize_batch
+from cnnClassifier.components.augmentation import augment_dataset
+from cnnClassifier.components.dataset_index import build_dataset_index, load_dataset_index, resplit, oversample
+from cnnClassifier.utils.common import save_json, load_json
+
+
+class DataSharding:
+    def __init__(self, config: DataShardingConfig, dataset_index: list = None):
+        """
+        Initializes the DataSharding class with the provided configuration.
+
+        Args:
+            config (DataShardingConfig): Configuration for building the tensor shards.
+            dataset_index (list, optional): Dataset index rows already in memory.
+        """
+        self.config = config
+        self.dataset_index = dataset_index
+
+    @staticmethod
+    def entries_from_index(rows):
+        """
+        Turns dataset index rows into shard entries.
+
+        Returns:
+            tuple: (entries, class_indices) where every entry is a dict with the
+            relative "path", the integer "label", the "subset" and the content "sha256".
+        """
+        classes = sorted({row["class"] for row in rows})
+        class_indices = dict(zip(classes, range(len(classes))))
+        entries = [
+            dict(path=row["path"], label=class_indices[row["class"]], subset=row["subset"], sha256=row["sha256"])
+            for row in sorted(rows, key=lambda row: (row["class"], row["path"]))
+        ]
+        return entries, class_indices
+
+    def list_entries(self):
+        """
+        Lists the curated images with their label and fixed subset from the dataset index.
+        """
+        validation_split = self.config.params_validation_split
+        if self.dataset_index is not None:
+            rows = resplit(self.dataset_index, validation_split)
+        elif Path(self.config.dataset_index_file).exists():
+            rows = resplit(load_dataset_index(self.config.dataset_index_file), validation_split,
+                           self.config.dataset_index_file)
+        else:
+            rows = build_dataset_index(self.config.source_dir, self.config.dataset_index_file,
+                                       validation_split=self.config.params_validation_split)
+        return self.entries_from_index(rows)
+
+    def _read_source(self, path):
+        with open(Path(self.config.source_dir) / path, "rb") as f:
+            return f.read()
+
+    def _load_index(self):
+        index_file = Path(self.config.index_file)
+        if not index_file.exists():
+            return None
+        index = load_json(index_file)
+        if list(index.image_size) != list(self.config.params_image_size):
+            logger.info("IMAGE_SIZE changed since the shards were built, rebuilding all shards")
+            return None
+        return index
+
+    def _encode(self, blobs):
+        """
+        Decodes and resizes encoded images in parallel into a uint8 array.
+        """
+        dataset = tf.data.Dataset.from_tensor_slices(blobs).map(
+            lambda blob: decode_and_resize(blob, self.config.params_image_size),
+            num_parallel_calls=tf.data.AUTOTUNE
+        ).batch(len(blobs))
+        return next(iter(dataset)).numpy()
+
+    def build(self, entries=None, class_indices=None, read_bytes=None):
+        """
+        Converts the dataset into fixed-size uint8 .npy shards plus an index sidecar.
+
+        Only files whose content hash changed (or that are new) are decoded again;
+        unchanged files keep their existing shard slot. Shards left mostly empty
+        by removed or changed files are re-packed by copying rows, without decoding.
+
+        Args:
+            entries (list, optional): Entries as returned by list_entries. Defaults to the curated data.
+            class_indices (dict, optional): Class name to index mapping of the entries.
+            read_bytes (callable, optional): Returns the encoded bytes of an entry path.
+
+        Returns:
+            dict: Number of reused, re-encoded and removed images.
+        """
+        if entries is None:
+            entries, class_indices = self.list_entries()
+        read_bytes = read_bytes or self._read_source
+
+        shard_dir = Path(self.config.shard_dir)
+        os.makedirs(shard_dir, exist_ok=True)
+
+        index = self._load_index()
+        previous = {} if index is None else {record.path: record for record in index.records}
+        shard_counts = {} if index is None else {shard.file: shard.count for shard in index.shards}
+
+        # Split the entries into rows that can stay where they are and rows to (re-)encode;
+        # entries from the dataset index already carry their hash, so unchanged files are not read
+        kept, pending = [], []
+        for entry in entries:
+            digest = entry.get("sha256") or hashlib.sha256(read_bytes(entry["path"])).hexdigest()
+            record = dict(entry, sha256=digest)
+            old = previous.get(entry["path"])
+            if old is not None and old.sha256 == digest and old.shard in shard_counts:
+                kept.append(dict(record, shard=old.shard, offset=old.offset))
+            else:
+                pending.append(record)
+
+        live = {}
+        for record in kept:
+            live[record["shard"]] = live.get(record["shard"], 0) + 1
+
+        # Shards with less than half of their rows alive are re-packed
+        to_copy = [r for r in kept if live[r["shard"]] * 2 < shard_counts[r["shard"]]]
+        kept = [r for r in kept if live[r["shard"]] * 2 >= shard_counts[r["shard"]]]
+        keep_shards = {r["shard"] for r in kept}
+
+        rows = [("copy", record, None) for record in to_copy] + [("encode", record, None) for record in pending]
+        next_id = 1 + max((int(Path(f).stem.split("_")[-1]) for f in shard_counts), default=-1)
+        shards = [dict(file=f, count=shard_counts[f]) for f in sorted(keep_shards)]
+        records = list(kept)
+        old_shards = {}
+
+        for start in range(0, len(rows), self.config.params_shard_size):
+            chunk = rows[start:start + self.config.params_shard_size]
+            data = np.empty((len(chunk), *self.config.params_image_size), dtype=np.uint8)
+
+            # Encoded bytes are read again here so only one shard is held in memory
+            encode_slots = [i for i, (kind, _, _) in enumerate(chunk) if kind == "encode"]
+            if encode_slots:
+                data[encode_slots] = self._encode([read_bytes(chunk[i][1]["path"]) for i in encode_slots])
+            for i, (kind, record, _) in enumerate(chunk):
+                if kind == "copy":
+                    if record["shard"] not in old_shards:
+                        old_shards[record["shard"]] = np.load(shard_dir / record["shard"], mmap_mode="r")
+                    data[i] = old_shards[record["shard"]][record["offset"]]
+
+            shard_file = f"shard_{next_id:05d}.npy"
+            next_id += 1
+            tmp_path = shard_dir / f"{shard_file}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, data)
+            os.replace(tmp_path, shard_dir / shard_file)
+
+            shards.append(dict(file=shard_file, count=len(chunk)))
+            records.extend(dict(record, shard=shard_file, offset=i) for i, (_, record, _) in enumerate(chunk))
+
+        save_json(
+            path=Path(self.config.index_file),
+            data=dict(
+                image_size=list(self.config.params_image_size),
+                class_indices=dict(class_indices),
+                shards=shards,
+                records=sorted(records, key=lambda r: (r["label"], r["path"]))
+            )
+        )
+
+        # Remove shards that are no longer referenced by the index
+        old_shards.clear()
+        referenced = {shard["file"] for shard in shards}
+        for shard_file in shard_counts:
+            if shard_file not in referenced and (shard_dir / shard_file).exists():
+                os.remove(shard_dir / shard_file)
+
+        summary = dict(
+            reused=len(kept) + len(to_copy),
+            encoded=len(pending),
+            removed=len(set(previous) - {entry["path"] for entry in entries})
+        )
+        logger.info(f"Data shards written to {shard_dir}: {summary}")
+        return summary
+
+
+def build_shard_dataset(shard_dir, index_file, subset, batch_size,
+                        shuffle=False, repeat=False, seed=None, backbone=None, skip_batches=0,
+                        shard_index=0, num_shards=1, oversampled=False, augment=False):
+    """
+    Streams batches from memory-mapped shards without decoding any image.
+
+    Args:
+        shard_dir (Path): Directory with the .npy shards.
+        index_file (Path): Index sidecar written by DataSharding.build.
+        subset (str): "training" or "validation".
+        batch_size (int): Number of images per batch.
+        shuffle (bool): Reshuffle the samples on every epoch.
+        repeat (bool): Repeat the dataset indefinitely.
+        seed (int, optional): Shuffle seed.
+        backbone (str, optional): Backbone whose preprocessing is applied (rescale=1./255 if None).
+        skip_batches (int): Batches dropped (without being read) from the start of the stream.
+        shard_index (int): Index of the slice of samples this input pipeline reads.
+        num_shards (int): Number of slices (one per training worker).
+        oversampled (bool): Repeat the samples of the smaller classes up to the size of the largest one.
+        augment (bool): Apply the AUGMENTATION_KWARGS transforms to every batch.
+
+    Returns:
+        tuple: (tf.data.Dataset of (images, one-hot labels), number of samples, class_indices)
+    """
+    index = load_json(Path(index_file))
+    records = [record for record in index.records if record.subset == subset][shard_index::num_shards]
+    class_indices = dict(index.class_indices)
+    num_classes = len(class_indices)
+    image_size = list(index.image_size)
+
+    shards = {shard.file: np.load(Path(shard_dir) / shard.file, mmap_mode="r") for shard in index.shards}
+    labels = [record.label for record in records]
+    if oversampled:
+        positions, labels = oversample(list(range(len(records))), labels, seed=seed)
+        records = [records[i] for i in positions]
+    locations = [(shards[record.shard], record.offset) for record in records]
+    one_hot = np.eye(num_classes, dtype=np.float32)[labels]
+
+    def generator():
+        rng = np.random.default_rng(seed)
+        skipped = 0
+        while True:
+            order = rng.permutation(len(records)) if shuffle else np.arange(len(records))
+            for start in range(0, len(order), batch_size):
+                if skipped < skip_batches:
+                    skipped += 1
+                    continue
+                batch = order[start:start + batch_size]
+                images = np.stack([locations[i][0][locations[i][1]] for i in batch])
+                yield images, one_hot[batch]
+            if not repeat:
+                break
+
+    dataset = tf.data.Dataset.from_generator(
+        generator,
+        output_signature=(
+            tf.TensorSpec(shape=(None, *image_size), dtype=tf.uint8),
+            tf.TensorSpec(shape=(None, num_classes), dtype=tf.float32)
+        )
+    )
+    if augment:
+        dataset = augment_dataset(dataset, seed=seed)
+    dataset = dataset.map(
+        lambda images, labels: (normalize_batch(images, backbone), labels),
+        num_parallel_calls=tf.data.AUTOTUNE
+    ).prefetch(tf.data.AUTOTUNE)
+
+    return dataset, len(records), class_indices
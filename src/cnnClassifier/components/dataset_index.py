@@ -0,0 +1,238 @@
+import os
+import csv
+import hashlib
+import zipfile
+import numpy as np
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from cnnClassifier import logger
+from cnnClassifier.constants import WHITE_LIST_FORMATS
+
+# Columns of the dataset index CSV; "path" is relative to the curated data directory and
+# "validation_split" is the VALIDATION_SPLIT the "subset" was assigned with
+INDEX_FIELDS = ("path", "class", "size", "mtime_ns", "sha256", "subset", "validation_split")
+
+SAMPLING_MODES = (None, "oversample", "balanced")
+
+
+def split_for(sha256, validation_split=0.20):
+    """
+    Fixed subset of an image, derived from its content hash.
+
+    The assignment of a file never depends on the other files, so adding or
+    removing images does not move existing ones between subsets, and
+    duplicate images always land in the same subset.
+    """
+    return "validation" if int(sha256[:8], 16) < validation_split * 2**32 else "training"
+
+
+def _sha256(read):
+    sha256 = hashlib.sha256()
+    with read() as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def _write_index(rows, index_file):
+    index_file = Path(index_file)
+    os.makedirs(index_file.parent, exist_ok=True)
+    tmp_path = index_file.with_name(index_file.name + ".tmp")
+    with open(tmp_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=INDEX_FIELDS)
+        writer.writeheader()
+        writer.writerows(sorted(rows, key=lambda row: (row["class"], row["path"])))
+    os.replace(tmp_path, index_file)
+
+    counts = {}
+    for row in rows:
+        key = (row["class"], row["subset"])
+        counts[key] = counts.get(key, 0) + 1
+    logger.info(f"Dataset index with {len(rows)} images written to {index_file}: {counts}")
+
+
+def load_dataset_index(index_file):
+    """
+    Reads the dataset index CSV.
+
+    Returns:
+        list: One dict per image with the INDEX_FIELDS columns.
+    """
+    with open(index_file, newline="") as f:
+        rows = list(csv.DictReader(f))
+    for row in rows:
+        row["size"], row["mtime_ns"] = int(row["size"]), int(row["mtime_ns"])
+        # Indexes written before the column existed have no split, so their subsets get reassigned
+        row["validation_split"] = float(row["validation_split"]) if row.get("validation_split") else None
+    return rows
+
+
+def resplit(rows, validation_split, index_file=None):
+    """
+    Reassigns the subsets of index rows written with another validation split.
+
+    Args:
+        rows (list): Index rows.
+        validation_split (float): The VALIDATION_SPLIT in effect.
+        index_file (Path, optional): Index CSV rewritten when the subsets change.
+
+    Returns:
+        list: The rows, with the subsets of `validation_split`.
+    """
+    if all(row["validation_split"] == validation_split for row in rows):
+        return rows
+    logger.info(f"VALIDATION_SPLIT changed to {validation_split}, reassigning the subsets of the dataset index")
+    rows = [dict(row, subset=split_for(row["sha256"], validation_split), validation_split=validation_split)
+            for row in rows]
+    if index_file is not None:
+        _write_index(rows, index_file)
+    return rows
+
+
+def _is_image(name):
+    return name.lower().endswith(tuple("." + ext for ext in WHITE_LIST_FORMATS))
+
+
+def build_dataset_index(source_dir, index_file, validation_split=0.20, workers=8):
+    """
+    Scans the curated data once and writes the dataset index.
+
+    Files whose size and modification time match the previous index keep
+    their hash, so only new or changed images are read.
+
+    Args:
+        source_dir (Path): Root directory with one sub-directory per class.
+        index_file (Path): CSV file to write.
+        validation_split (float): Fraction of the images assigned to validation.
+        workers (int): Threads hashing the changed files.
+
+    Returns:
+        list: The index rows.
+    """
+    source_dir = Path(source_dir)
+    previous = {}
+    if Path(index_file).exists():
+        previous = {row["path"]: row for row in load_dataset_index(index_file)}
+
+    rows, to_hash = [], []
+    for class_dir in sorted((entry for entry in os.scandir(source_dir) if entry.is_dir()), key=lambda entry: entry.name):
+        for root, _, fnames in os.walk(class_dir.path):
+            for fname in fnames:
+                if not _is_image(fname):
+                    continue
+                full_path = os.path.join(root, fname)
+                stat = os.stat(full_path)
+                row = {
+                    "path": Path(full_path).relative_to(source_dir).as_posix(),
+                    "class": class_dir.name,
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns
+                }
+                old = previous.get(row["path"])
+                if old is not None and (old["size"], old["mtime_ns"]) == (row["size"], row["mtime_ns"]):
+                    row["sha256"] = old["sha256"]
+                else:
+                    to_hash.append(row)
+                rows.append(row)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        digests = executor.map(lambda row: _sha256(lambda: open(source_dir / row["path"], "rb")), to_hash)
+        for row, digest in zip(to_hash, digests):
+            row["sha256"] = digest
+
+    for row in rows:
+        row["subset"] = split_for(row["sha256"], validation_split)
+        row["validation_split"] = validation_split
+    logger.info(f"Hashed {len(to_hash)} of {len(rows)} images ({len(rows) - len(to_hash)} unchanged)")
+    _write_index(rows, index_file)
+    return rows
+
+
+def build_dataset_index_from_zip(zip_file, prefix, index_file, validation_split=0.20):
+    """
+    Writes the dataset index of the images under `prefix` in a zip archive,
+    for datasets that are never extracted (STREAM_TO_SHARDS).
+
+    Returns:
+        list: The index rows, with paths relative to `prefix`.
+    """
+    rows = []
+    with zipfile.ZipFile(zip_file, "r") as zip_ref:
+        for member in zip_ref.infolist():
+            path = member.filename[len(prefix):]
+            if member.is_dir() or not member.filename.startswith(prefix) or "/" not in path or not _is_image(path):
+                continue
+            sha256 = _sha256(lambda: zip_ref.open(member))
+            rows.append({
+                "path": path,
+                "class": path.split("/")[0],
+                "size": member.file_size,
+                "mtime_ns": 0,
+                "sha256": sha256,
+                "subset": split_for(sha256, validation_split),
+                "validation_split": validation_split
+            })
+    _write_index(rows, index_file)
+    return rows
+
+
+def index_image_files(index_file, source_dir, subset=None, validation_split=0.20, rows=None):
+    """
+    Lists image files and labels from the dataset index, without scanning
+    the directory tree.
+
+    The index is built first when it does not exist yet, and its subsets are
+    reassigned when it was written with another `validation_split`. Class
+    indices come from the sorted class names, as with flow_from_directory.
+
+    Args:
+        index_file (Path): Dataset index CSV.
+        source_dir (Path): Curated data directory the index paths are relative to.
+        subset (str, optional): "training", "validation" or None for all files.
+        validation_split (float): Fraction of the images assigned to validation.
+        rows (list, optional): Index rows already in memory, used instead of reading index_file.
+
+    Returns:
+        tuple: (filepaths, labels, class_indices)
+    """
+    if rows is None and not Path(index_file).exists():
+        logger.info(f"No dataset index at {index_file}, building it from {source_dir}")
+        rows = build_dataset_index(source_dir, index_file, validation_split)
+    elif rows is None:
+        rows = resplit(load_dataset_index(index_file), validation_split, index_file)
+    else:
+        rows = resplit(rows, validation_split)
+
+    classes = sorted({row["class"] for row in rows})
+    class_indices = dict(zip(classes, range(len(classes))))
+    rows = sorted(rows, key=lambda row: (row["class"], row["path"]))
+    if subset is not None:
+        rows = [row for row in rows if row["subset"] == subset]
+
+    filepaths = [os.path.join(str(source_dir), row["path"]) for row in rows]
+    labels = [class_indices[row["class"]] for row in rows]
+    return filepaths, labels, class_indices
+
+
+def oversample(filepaths, labels, seed=None):
+    """
+    Repeats the images of the smaller classes until every class is as large as
+    the largest one (whole copies first, then a seeded random remainder).
+
+    Returns:
+        tuple: (filepaths, labels) with equal class counts.
+    """
+    by_class = {}
+    for path, label in zip(filepaths, labels):
+        by_class.setdefault(label, []).append(path)
+    target = max(len(paths) for paths in by_class.values())
+
+    rng = np.random.default_rng(seed)
+    sampled_files, sampled_labels = [], []
+    for label in sorted(by_class):
+        paths = by_class[label]
+        copies, remainder = divmod(target, len(paths))
+        extra = [paths[i] for i in sorted(rng.choice(len(paths), remainder, replace=False))]
+        sampled_files.extend(paths * copies + extra)
+        sampled_labels.extend([label] * target)
+    return sampled_files, sampled_labels
@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+import tensorflow as tf
+from pathlib import Path
+from cnnClassifier import logger
+
+STRATEGIES = (None, "mirrored", "multi_worker_mirrored")
+
+
+def create_strategy(name=None, cpu_devices=0):
+    """
+    Creates the tf.distribute strategy used for training.
+
+    Must be called before TensorFlow runs its first op: splitting the CPU into
+    logical devices and joining a multi-worker cluster both configure the runtime.
+    When an earlier stage of the process already initialized TensorFlow, the
+    "mirrored" strategy uses the existing CPU devices and logs a warning.
+
+    Args:
+        name (str, optional): None (default strategy), "mirrored" or "multi_worker_mirrored".
+        cpu_devices (int): Logical CPU devices (replicas) of the "mirrored" strategy
+            when no GPU is visible; 0 uses the visible devices.
+
+    Returns:
+        tf.distribute.Strategy: The strategy.
+    """
+    if name not in STRATEGIES:
+        raise ValueError(f"Unknown DISTRIBUTION_STRATEGY {name!r}, expected one of {STRATEGIES}")
+
+    if name is None:
+        return tf.distribute.get_strategy()
+
+    if name == "multi_worker_mirrored":
+        strategy = tf.distribute.MultiWorkerMirroredStrategy()
+    else:
+        devices = None
+        if cpu_devices and not tf.config.list_physical_devices("GPU"):
+            cpu = tf.config.list_physical_devices("CPU")[0]
+            try:
+                tf.config.set_logical_device_configuration(
+                    cpu, [tf.config.LogicalDeviceConfiguration() for _ in range(cpu_devices)]
+                )
+            except RuntimeError as e:
+                # An earlier stage of this process already ran TensorFlow (e.g. a main.py run)
+                logger.warning(
+                    f"Could not split the CPU into {cpu_devices} devices, TensorFlow is already initialized ({e}); "
+                    f"training on the existing CPU devices. Run the training stage on its own "
+                    f"(python -m cnnClassifier.pipeline.stage_03_model_trainer) to use DISTRIBUTION_CPU_DEVICES."
+                )
+            devices = [device.name for device in tf.config.list_logical_devices("CPU")]
+        strategy = tf.distribute.MirroredStrategy(devices=devices)
+
+    logger.info(f"Training with {type(strategy).__name__} over {strategy.num_replicas_in_sync} replicas")
+    return strategy
+
+
+def is_chief(strategy):
+    """
+    Whether this process writes the shared artifacts (always True outside multi-worker training).
+    """
+    resolver = getattr(strategy, "cluster_resolver", None)
+    if resolver is None or not resolver.task_type:
+        return True
+    if resolver.task_type == "chief":
+        return True
+    return resolver.task_type == "worker" and resolver.task_id == 0 and "chief" not in resolver.cluster_spec().as_dict()
+
+
+def worker_path(path, strategy):
+    """
+    Path a worker writes `path` to: the path itself on the chief, a temporary
+    copy elsewhere (every worker has to take part in saving, only the chief's
+    copy is kept). Remove it with discard_worker_path.
+    """
+    if is_chief(strategy):
+        return Path(path)
+    return Path(tempfile.mkdtemp(prefix="worker_")) / Path(path).name
+
+
+def discard_worker_path(path, strategy):
+    if not is_chief(strategy):
+        shutil.rmtree(os.path.dirname(path), ignore_errors=True)
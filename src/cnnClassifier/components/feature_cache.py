@@ -0,0 +1,150 @@
+import os
+import json
+import hashlib
+import numpy as np
+import tensorflow as tf
+from pathlib import Path
+from cnnClassifier import logger
+
+
+def split_backbone_head(model):
+    """
+    Splits a transfer-learning model into its convolutional backbone and its head.
+
+    The backbone ends at the last layer with a 4D (feature map) output; the
+    remaining layers form the head and are re-applied to a new input, so the
+    head shares its weights with the full model.
+
+    Args:
+        model (tf.keras.Model): Full model as built by PrepareBaseModel.
+
+    Returns:
+        tuple: (backbone, head) Keras models.
+    """
+    split = max(i for i, layer in enumerate(model.layers) if len(layer.output.shape) == 4)
+    backbone = tf.keras.models.Model(inputs=model.input, outputs=model.layers[split].output)
+
+    inputs = tf.keras.layers.Input(shape=backbone.output.shape[1:])
+    x = inputs
+    for layer in model.layers[split + 1:]:
+        x = layer(x)
+    head = tf.keras.models.Model(inputs=inputs, outputs=x)
+    return backbone, head
+
+
+def weights_digest(model: tf.keras.Model) -> str:
+    """
+    sha256 of the weights of a model in memory, so cached features can be
+    matched to a backbone without reading (or waiting for) its saved file.
+    """
+    sha256 = hashlib.sha256()
+    for weights in model.get_weights():
+        sha256.update(str(weights.shape).encode())
+        sha256.update(np.ascontiguousarray(weights).tobytes())
+    return sha256.hexdigest()
+
+
+class FeatureCache:
+    def __init__(self, cache_dir: Path, backbone: tf.keras.Model):
+        """
+        Stores backbone outputs as float16 .npy files that are read memory-mapped.
+
+        Args:
+            cache_dir (Path): Directory holding the cached features.
+            backbone (tf.keras.Model): Frozen backbone producing the features.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.backbone = backbone
+
+    def _paths(self, name):
+        return (self.cache_dir / f"{name}.npy",
+                self.cache_dir / f"{name}_labels.npy",
+                self.cache_dir / f"{name}.json")
+
+    def load_or_build(self, name, fingerprint, batches, num_samples):
+        """
+        Returns cached features for `name`, computing them first if the fingerprint changed.
+
+        Args:
+            name (str): Cache entry name, e.g. "training_seed0".
+            fingerprint (dict): Everything the features depend on (model, files, seed).
+            batches (iterable): Ordered (images, one-hot labels) batches covering `num_samples` images.
+            num_samples (int): Number of images in the entry.
+
+        Returns:
+            tuple: (features, labels) memory-mapped arrays.
+        """
+        features_path, labels_path, meta_path = self._paths(name)
+        digest = hashlib.sha256(json.dumps(fingerprint, sort_keys=True).encode()).hexdigest()
+
+        if meta_path.exists() and json.loads(meta_path.read_text()).get("fingerprint") == digest:
+            logger.info(f"Using cached backbone features {features_path}")
+        else:
+            self._build(features_path, labels_path, batches, num_samples)
+            meta_path.write_text(json.dumps({"fingerprint": digest, "samples": num_samples}))
+
+        return np.load(features_path, mmap_mode="r"), np.load(labels_path, mmap_mode="r")
+
+    def _build(self, features_path, labels_path, batches, num_samples):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        logger.info(f"Computing backbone features for {num_samples} images into {features_path}")
+
+        tmp_path = features_path.with_suffix(".tmp.npy")
+        features = np.lib.format.open_memmap(
+            tmp_path, mode="w+", dtype=np.float16,
+            shape=(num_samples, *self.backbone.output.shape[1:])
+        )
+        labels = np.empty(num_samples, dtype=np.int16)
+
+        filled = 0
+        iterator = iter(batches)
+        while filled < num_samples:
+            x, y = next(iterator)
+            count = min(int(x.shape[0]), num_samples - filled)
+            features[filled:filled + count] = self.backbone(x[:count], training=False).numpy()
+            labels[filled:filled + count] = np.argmax(y[:count], axis=-1)
+            filled += count
+
+        features.flush()
+        del features
+        os.replace(tmp_path, features_path)
+        np.save(labels_path, labels)
+
+
+def build_feature_dataset(features, labels, num_classes, batch_size,
+                          shuffle=False, repeat=False, seed=None):
+    """
+    Streams float32 batches from memory-mapped float16 features.
+
+    Args:
+        features (np.ndarray): Cached features.
+        labels (np.ndarray): Integer label of every feature.
+        num_classes (int): Number of classes for the one-hot labels.
+        batch_size (int): Number of samples per batch.
+        shuffle (bool): Reshuffle the samples on every epoch.
+        repeat (bool): Repeat the dataset indefinitely.
+        seed (int, optional): Shuffle seed.
+
+    Returns:
+        tf.data.Dataset: Batches of (features, one-hot labels).
+    """
+    one_hot = np.eye(num_classes, dtype=np.float32)
+
+    def generator():
+        rng = np.random.default_rng(seed)
+        while True:
+            order = rng.permutation(len(labels)) if shuffle else np.arange(len(labels))
+            for start in range(0, len(order), batch_size):
+                # Sorted indices keep the memory-mapped reads sequential
+                batch = np.sort(order[start:start + batch_size])
+                yield features[batch].astype(np.float32), one_hot[labels[batch]]
+            if not repeat:
+                break
+
+    return tf.data.Dataset.from_generator(
+        generator,
+        output_signature=(
+            tf.TensorSpec(shape=(None, *features.shape[1:]), dtype=tf.float32),
+            tf.TensorSpec(shape=(None, num_classes), dtype=tf.float32)
+        )
+    ).prefetch(tf.data.AUTOTUNE)
@@ -0,0 +1,144 @@
+import os
+import time
+import tensorflow as tf
+from cnnClassifier import logger
+from cnnClassifier.components.backbones import get_preprocess_fn
+from cnnClassifier.components.augmentation import augment_dataset
+
+# Batches of decoded images the cached pipelines reshuffle on every epoch
+CACHED_SHUFFLE_BATCHES = 8
+
+
+def decode_and_resize(image_bytes, image_size):
+    """
+    Decodes an encoded image and resizes it to the model input size.
+
+    The result is kept as uint8, like the PIL images flow_from_directory works
+    on, so it is cheap to cache and normalization happens per batch.
+    """
+    image = tf.io.decode_image(image_bytes, channels=3, expand_animations=False)
+    image = tf.image.resize(image, image_size[:2], method="bilinear")
+    return tf.saturate_cast(tf.round(image), tf.uint8)
+
+
+def normalize_batch(images, backbone=None):
+    """
+    Applies the backbone's preprocess_input, or rescale=1./255 when no backbone is given.
+    """
+    images = tf.cast(images, tf.float32)
+    if backbone is None:
+        return images / 255.0
+    return get_preprocess_fn(backbone)(images)
+
+
+def build_image_dataset(filepaths, labels, num_classes, image_size, batch_size,
+                        shuffle=False, cache=None, repeat=False, seed=None, backbone=None, skip_batches=0,
+                        balanced=False, augment=False):
+    """
+    Builds a tf.data pipeline with parallel decode/resize, optional cache and prefetch.
+
+    Without a cache the file names are shuffled before decoding, so the shuffle
+    buffer holds paths instead of images and skipped batches are never decoded.
+    With a cache the file names are shuffled once before decoding, and every
+    epoch reshuffles the cached images in a buffer of CACHED_SHUFFLE_BATCHES
+    batches, so a disk cache is never held in memory.
+
+    Args:
+        filepaths (list): Image file paths.
+        labels (list): Integer class index of every file.
+        num_classes (int): Number of classes for the one-hot labels.
+        image_size (list): Model input size, e.g. [224, 224, 3].
+        batch_size (int): Number of images per batch.
+        shuffle (bool): Reshuffle the files on every epoch.
+        cache (str, optional): None, "memory" or a file path for an on-disk cache.
+        repeat (bool): Repeat the dataset indefinitely.
+        seed (int, optional): Shuffle seed.
+        backbone (str, optional): Backbone whose preprocessing is applied (rescale=1./255 if None).
+        skip_batches (int): Batches dropped from the start of the stream, used to
+            resume a seeded, repeated stream where a previous run stopped.
+        balanced (bool): Draw every image from a uniformly chosen class, so batches
+            are class-balanced on average (the stream is infinite).
+        augment (bool): Apply the AUGMENTATION_KWARGS transforms to every batch, after the cache.
+
+    Returns:
+        tf.data.Dataset: Batches of (images, one-hot labels).
+    """
+    def decode(path, label):
+        return decode_and_resize(tf.io.read_file(path), image_size), tf.one_hot(label, num_classes)
+
+    def files_dataset(paths, path_labels, cache_file, repeat):
+        dataset = tf.data.Dataset.from_tensor_slices((list(map(str, paths)), list(path_labels)))
+        buffer_size = len(paths)
+        if cache_file:
+            if shuffle:
+                # The cache replays this order on every epoch, only the bounded buffer below reshuffles it
+                dataset = dataset.shuffle(len(paths), seed=seed, reshuffle_each_iteration=False)
+                buffer_size = min(len(paths), CACHED_SHUFFLE_BATCHES * batch_size)
+            dataset = dataset.map(decode, num_parallel_calls=tf.data.AUTOTUNE)
+            if cache_file == "memory":
+                dataset = dataset.cache()
+            else:
+                os.makedirs(os.path.dirname(str(cache_file)), exist_ok=True)
+                dataset = dataset.cache(str(cache_file))
+
+        if shuffle:
+            dataset = dataset.shuffle(buffer_size, seed=seed, reshuffle_each_iteration=True)
+        if repeat:
+            dataset = dataset.repeat()
+        return dataset
+
+    if balanced:
+        per_class = []
+        for label in sorted(set(labels)):
+            class_files = [path for path, path_label in zip(filepaths, labels) if path_label == label]
+            class_cache = cache if cache in (None, "memory") else f"{cache}_class_{label}"
+            per_class.append(files_dataset(class_files, [label] * len(class_files), class_cache, repeat=True))
+        dataset = tf.data.Dataset.sample_from_datasets(per_class, seed=seed)
+    else:
+        dataset = files_dataset(filepaths, labels, cache, repeat)
+
+    if skip_batches:
+        dataset = dataset.skip(skip_batches * batch_size)
+
+    if not cache:
+        dataset = dataset.map(decode, num_parallel_calls=tf.data.AUTOTUNE)
+    dataset = dataset.batch(batch_size)
+    if augment:
+        dataset = augment_dataset(dataset, seed=seed)
+    dataset = dataset.map(
+        lambda images, one_hot: (normalize_batch(images, backbone), one_hot),
+        num_parallel_calls=tf.data.AUTOTUNE
+    )
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+def benchmark_loader(loader, num_batches=50, warmup_batches=2):
+    """
+    Measures how many images per second a loader can produce.
+
+    Args:
+        loader: A Keras DirectoryIterator, a tf.data.Dataset or any iterable of (x, y) batches.
+        num_batches (int): Number of timed batches.
+        warmup_batches (int): Batches consumed before the timer starts.
+
+    Returns:
+        dict: Images, seconds and images/sec of the timed batches.
+    """
+    iterator = iter(loader)
+    for _ in range(warmup_batches):
+        next(iterator)
+
+    images = 0
+    start = time.perf_counter()
+    for _ in range(num_batches):
+        x, _ = next(iterator)
+        images += int(x.shape[0])
+    elapsed = time.perf_counter() - start
+
+    result = {
+        "images": images,
+        "seconds": round(elapsed, 4),
+        "images_per_sec": round(images / elapsed, 2) if elapsed > 0 else None
+    }
+    logger.info(f"Loader benchmark: {result}")
+    return result
@@ -0,0 +1,84 @@
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from cnnClassifier import logger
+from cnnClassifier.utils.metrics import QUEUE_DEPTH
+
+_STOP = object()
+
+
+class MicroBatcher:
+    def __init__(self, predict_fn, max_batch_size: int, max_wait_ms: float):
+        """
+        Coalesces concurrent single-item requests into batches for one warm model.
+
+        A batch is dispatched as soon as it holds `max_batch_size` items or
+        `max_wait_ms` have passed since its first item arrived.
+
+        Args:
+            predict_fn (callable): Maps a list of items to a list of results in the same order.
+            max_batch_size (int): Largest batch passed to predict_fn.
+            max_wait_ms (float): Longest time the first item of a batch waits for others.
+        """
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = queue.Queue()
+        QUEUE_DEPTH.set_function(self.queue.qsize, queue="micro_batcher")
+        self.worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self.worker.start()
+
+    def submit(self, item) -> Future:
+        """
+        Queues one item and returns a Future resolved with its result.
+        """
+        future = Future()
+        self.queue.put((item, future))
+        return future
+
+    def predict(self, item, timeout=None):
+        """
+        Queues one item and blocks until its result is ready.
+        """
+        return self.submit(item).result(timeout=timeout)
+
+    def close(self):
+        self.queue.put(_STOP)
+        self.worker.join()
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entry = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                self.queue.put(_STOP)
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self.queue.get()
+            if first is _STOP:
+                break
+
+            batch = self._collect(first)
+            items = [item for item, _ in batch]
+            try:
+                results = list(self.predict_fn(items))
+                if len(results) != len(items):
+                    raise ValueError(f"predict_fn returned {len(results)} results for {len(items)} items")
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                logger.exception(e)
+                for _, future in batch:
+                    future.set_exception(e)
@@ -0,0 +1,132 @@
+import os
+import time
+import shutil
+import numpy as np
+import tensorflow as tf
+from pathlib import Path
+from cnnClassifier import logger
+from cnnClassifier.entity.config_entity import ModelQuantizationConfig
+from cnnClassifier.components.input_pipeline import decode_and_resize, normalize_batch
+from cnnClassifier.components.dataset_index import index_image_files
+from cnnClassifier.components.model_runner import KerasModelRunner, TFLiteModelRunner
+from cnnClassifier.utils.common import save_json, get_size
+
+
+class ModelQuantization:
+    def __init__(self, config: ModelQuantizationConfig, model=None, dataset_index: list = None):
+        """
+        Initializes the ModelQuantization class with the provided configuration.
+
+        Args:
+            config (ModelQuantizationConfig): Configuration for the TFLite export.
+            model (tf.keras.Model, optional): The trained model already in memory,
+                read from trained_model_path when None.
+            dataset_index (list, optional): Dataset index rows already in memory.
+        """
+        self.config = config
+        self.model = model
+        self.dataset_index = dataset_index
+
+    def _load_validation_images(self, limit):
+        """
+        Loads up to `limit` validation images, evenly spread over the (class ordered) split.
+        """
+        files, labels, _ = index_image_files(
+            self.config.dataset_index_file, self.config.training_data,
+            subset="validation", validation_split=self.config.params_validation_split, rows=self.dataset_index
+        )
+        if limit and len(files) > limit:
+            picks = np.linspace(0, len(files) - 1, limit).astype(int)
+            files, labels = [files[i] for i in picks], [labels[i] for i in picks]
+
+        images = np.stack([
+            decode_and_resize(tf.io.read_file(str(f)), self.config.params_image_size).numpy() for f in files
+        ])
+        return normalize_batch(images, self.config.params_backbone).numpy(), np.asarray(labels)
+
+    def convert(self, keras_model):
+        """
+        Converts the Keras model to TFLite with the configured QUANTIZATION mode.
+
+        Returns:
+            bytes: The serialized TFLite model.
+        """
+        mode = self.config.params_quantization
+        converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+
+        if mode in ("dynamic_range", "float16", "int8"):
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if mode == "float16":
+            converter.target_spec.supported_types = [tf.float16]
+        if mode == "int8":
+            calibration, _ = self._load_validation_images(self.config.params_calibration_samples)
+
+            def representative_dataset():
+                for image in calibration:
+                    yield [image[np.newaxis]]
+
+            converter.representative_dataset = representative_dataset
+            converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+
+        logger.info(f"Converting {self.config.trained_model_path} to TFLite ({mode})")
+        return converter.convert()
+
+    @staticmethod
+    def evaluate(runner, images, labels, batch_size=32, latency_samples=20):
+        """
+        Measures accuracy over the images and the mean batch-1 latency.
+        """
+        predictions = np.concatenate([
+            runner.predict(images[i:i + batch_size]) for i in range(0, len(images), batch_size)
+        ])
+        accuracy = float(np.mean(np.argmax(predictions, axis=-1) == labels))
+
+        runner.predict(images[:1])  # warm-up
+        timings = []
+        for image in images[:latency_samples]:
+            start = time.perf_counter()
+            runner.predict(image[np.newaxis])
+            timings.append(time.perf_counter() - start)
+
+        return {"accuracy": round(accuracy, 4), "latency_ms": round(1000 * float(np.mean(timings)), 3)}
+
+    def quantize(self):
+        """
+        Converts the trained model, compares it with the Keras model on the
+        validation split and promotes it when the accuracy drop is acceptable.
+
+        Returns:
+            dict: The comparison report.
+        """
+        keras_runner = KerasModelRunner(self.config.trained_model_path, model=self.model)
+        candidate_path = Path(self.config.root_dir) / f"model_{self.config.params_quantization}.tflite"
+        candidate_path.write_bytes(self.convert(keras_runner.model))
+
+        images, labels = self._load_validation_images(self.config.params_eval_samples)
+        keras_metrics = self.evaluate(keras_runner, images, labels)
+        tflite_metrics = self.evaluate(TFLiteModelRunner(candidate_path), images, labels)
+
+        accuracy_drop = keras_metrics["accuracy"] - tflite_metrics["accuracy"]
+        promoted = accuracy_drop <= self.config.params_max_accuracy_drop
+        report = {
+            "quantization": self.config.params_quantization,
+            "eval_samples": int(len(labels)),
+            "keras": dict(keras_metrics, size=get_size(Path(self.config.trained_model_path))),
+            "tflite": dict(tflite_metrics, size=get_size(candidate_path)),
+            "accuracy_drop": round(accuracy_drop, 4),
+            "promoted": promoted
+        }
+
+        if promoted:
+            tmp_path = Path(f"{self.config.tflite_model_path}.tmp")
+            shutil.copyfile(candidate_path, tmp_path)
+            os.replace(tmp_path, self.config.tflite_model_path)
+            logger.info(f"Promoted {candidate_path} to {self.config.tflite_model_path}")
+        else:
+            logger.warning(
+                f"Not promoting {candidate_path}: accuracy drop {accuracy_drop:.4f} "
+                f"exceeds QUANTIZATION_MAX_ACCURACY_DROP {self.config.params_max_accuracy_drop}"
+            )
+
+        save_json(path=Path(self.config.report_file), data=report)
+        return report
@@ -0,0 +1,331 @@
+import os
+import time
+import bisect
+import threading
+import numpy as np
+import tensorflow as tf
+import multiprocessing
+from pathlib import Path
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from cnnClassifier import logger
+from cnnClassifier.components.model_store import load_model
+from cnnClassifier.components.performance import configure_runtime
+
+# How the ModelRunnerPool workers run: threads sharing one model or processes with a model each
+WORKER_MODES = ("thread", "process")
+
+
+class KerasModelRunner:
+    def __init__(self, model_path: Path, model: tf.keras.Model = None):
+        """
+        Runs a Keras model (.h5 / .keras / SavedModel) on preprocessed float32 batches.
+
+        `model` is the same model already in memory, loaded from `model_path` when None.
+        """
+        self.model_path = Path(model_path)
+        self.model = model if model is not None else load_model(self.model_path)
+        self.num_classes = self.model.output.shape[-1]
+
+    def predict(self, batch):
+        return np.asarray(self.model.predict_on_batch(batch))
+
+
+class TFLiteModelRunner:
+    def __init__(self, model_path: Path, num_threads: int = None):
+        """
+        Runs a TFLite model on preprocessed float32 batches.
+
+        The interpreter is not thread-safe, so calls are serialized with a lock.
+        Integer inputs/outputs (full-int8 models) are (de)quantized here.
+        """
+        self.model_path = Path(model_path)
+        self.interpreter = tf.lite.Interpreter(model_path=str(self.model_path), num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self.input_details = self.interpreter.get_input_details()[0]
+        self.output_details = self.interpreter.get_output_details()[0]
+        self.num_classes = int(self.output_details["shape"][-1])
+        self._lock = threading.Lock()
+
+    def predict(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        with self._lock:
+            if tuple(self.input_details["shape"]) != batch.shape:
+                self.interpreter.resize_tensor_input(self.input_details["index"], batch.shape)
+                self.interpreter.allocate_tensors()
+                self.input_details = self.interpreter.get_input_details()[0]
+                self.output_details = self.interpreter.get_output_details()[0]
+
+            if self.input_details["dtype"] in (np.int8, np.uint8):
+                scale, zero_point = self.input_details["quantization"]
+                batch = np.round(batch / scale + zero_point).astype(self.input_details["dtype"])
+
+            self.interpreter.set_tensor(self.input_details["index"], batch)
+            self.interpreter.invoke()
+            output = self.interpreter.get_tensor(self.output_details["index"])
+
+            if self.output_details["dtype"] in (np.int8, np.uint8):
+                scale, zero_point = self.output_details["quantization"]
+                output = (output.astype(np.float32) - zero_point) * scale
+        return output
+
+
+class LatencyTracker:
+    def __init__(self, max_samples: int = 10000):
+        """
+        Keeps the latest `max_samples` call latencies, overall and per batch bucket.
+        """
+        self.samples = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+
+    def record(self, bucket, seconds):
+        with self._lock:
+            self.samples.append((bucket, seconds))
+
+    @staticmethod
+    def _percentiles(seconds):
+        ms = 1000 * np.asarray(seconds)
+        return {
+            "calls": int(len(ms)),
+            "p50_ms": round(float(np.percentile(ms, 50)), 3),
+            "p95_ms": round(float(np.percentile(ms, 95)), 3),
+            "p99_ms": round(float(np.percentile(ms, 99)), 3)
+        }
+
+    def report(self) -> dict:
+        """
+        p50/p95/p99 latency of all recorded calls and of every batch bucket.
+        """
+        with self._lock:
+            samples = list(self.samples)
+        if not samples:
+            return {}
+        report = {"all": self._percentiles([seconds for _, seconds in samples])}
+        for bucket in sorted({bucket for bucket, _ in samples}):
+            report[f"batch_{bucket}"] = self._percentiles([seconds for b, seconds in samples if b == bucket])
+        return report
+
+
+def nearest_bucket(batch_buckets, batch_size):
+    """
+    Smallest of the sorted `batch_buckets` holding `batch_size` images (the largest for bigger batches).
+    """
+    index = bisect.bisect_left(batch_buckets, batch_size)
+    return batch_buckets[min(index, len(batch_buckets) - 1)]
+
+
+class TracedModelRunner:
+    def __init__(self, model_path: Path, image_size, batch_buckets=(1, 4, 8, 16, 32), model: tf.keras.Model = None,
+                 warmup: bool = True):
+        """
+        Serves a Keras model through one tf.function with a fixed input signature.
+
+        Model.predict rebuilds its data adapter and predict function on every
+        call, which dominates small batches. Here the graph is traced once for
+        [None, *IMAGE_SIZE] float32 inputs, every request is zero-padded to the
+        nearest batch bucket (larger ones are split by the largest bucket), and
+        every bucket is run once at startup so the first request does not pay
+        for tracing and kernel setup.
+
+        Args:
+            model_path (Path): Keras model file or SavedModel directory.
+            image_size (list): IMAGE_SIZE, [height, width, channels].
+            batch_buckets (tuple): Batch sizes requests are padded to.
+            model (tf.keras.Model, optional): The same model already in memory.
+            warmup (bool): Run every bucket once now.
+        """
+        self.model_path = Path(model_path)
+        self.model = model if model is not None else load_model(self.model_path)
+        self.num_classes = self.model.output.shape[-1]
+        self.image_size = list(image_size)
+        self.batch_buckets = sorted(set(batch_buckets))
+        self.latency = LatencyTracker()
+        self._serve = tf.function(
+            lambda images: self.model(images, training=False),
+            input_signature=[tf.TensorSpec([None, *self.image_size], tf.float32)]
+        )
+        self.warmup_ms = self.warmup() if warmup else {}
+
+    def bucket(self, batch_size):
+        """
+        Smallest bucket holding `batch_size` images (the largest bucket for bigger batches).
+        """
+        return nearest_bucket(self.batch_buckets, batch_size)
+
+    def warmup(self) -> dict:
+        """
+        Runs every bucket once and returns the time each took in ms.
+        """
+        timings = {}
+        for bucket in self.batch_buckets:
+            start = time.perf_counter()
+            self._serve(tf.zeros([bucket, *self.image_size], tf.float32)).numpy()
+            timings[bucket] = round(1000 * (time.perf_counter() - start), 3)
+        logger.info(f"Warmed up {self.model_path.name} for batch buckets {timings} (ms)")
+        return timings
+
+    def _run(self, batch):
+        count = len(batch)
+        bucket = self.bucket(count)
+        if count < bucket:
+            batch = np.concatenate([batch, np.zeros((bucket - count, *batch.shape[1:]), np.float32)])
+        start = time.perf_counter()
+        output = self._serve(tf.constant(batch)).numpy()[:count]
+        self.latency.record(bucket, time.perf_counter() - start)
+        return output
+
+    def predict(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        largest = self.batch_buckets[-1]
+        if len(batch) <= largest:
+            return self._run(batch)
+        return np.concatenate([self._run(batch[i:i + largest]) for i in range(0, len(batch), largest)])
+
+
+# Runner of a ModelRunnerPool worker process
+_WORKER_RUNNER = None
+
+
+def _init_worker(model_path, image_size, batch_buckets, intra_op_threads, worker_counter):
+    global _WORKER_RUNNER
+    with worker_counter.get_lock():
+        index = worker_counter.value
+        worker_counter.value += 1
+
+    if intra_op_threads and hasattr(os, "sched_setaffinity"):
+        # Every worker gets its own cores, so the workers do not compete for them
+        cpus = sorted(os.sched_getaffinity(0))
+        pinned = {cpus[(index * intra_op_threads + i) % len(cpus)] for i in range(intra_op_threads)}
+        os.sched_setaffinity(0, pinned)
+    configure_runtime(intra_op_threads=intra_op_threads, inter_op_threads=1 if intra_op_threads else 0)
+    _WORKER_RUNNER = TracedModelRunner(model_path, image_size, batch_buckets)
+
+
+def _worker_predict(batch):
+    return _WORKER_RUNNER.predict(batch)
+
+
+class ModelRunnerPool:
+    def __init__(self, model_path: Path, image_size, batch_buckets=(1, 4, 8, 16, 32), workers: int = 2,
+                 mode: str = "thread", intra_op_threads: int = 0):
+        """
+        Runs inference on a pool of workers.
+
+        "thread" workers share one TracedModelRunner (TensorFlow releases the
+        GIL while it computes); "process" workers each load and warm up their
+        own copy with `intra_op_threads` threads pinned to their own cores,
+        which avoids the thread pools of concurrent requests competing.
+
+        predict() splits a batch along the batch buckets and spreads the
+        chunks over the workers; submit() queues one batch and returns a
+        Future, for callers with several batches in flight. Latency is
+        recorded per batch bucket, as by TracedModelRunner.
+
+        Args:
+            model_path (Path): Keras model file or SavedModel directory.
+            image_size (list): IMAGE_SIZE.
+            batch_buckets (tuple): Batch sizes requests are padded to.
+            workers (int): Number of workers.
+            mode (str): One of WORKER_MODES.
+            intra_op_threads (int): Threads per op in every worker (0 lets TensorFlow decide).
+        """
+        if mode not in WORKER_MODES:
+            raise ValueError(f"Unknown worker mode {mode!r}, expected one of {WORKER_MODES}")
+        self.model_path = Path(model_path)
+        self.workers = workers
+        self.mode = mode
+        self.batch_buckets = sorted(set(batch_buckets))
+        self.latency = LatencyTracker()
+
+        if mode == "thread":
+            if intra_op_threads:
+                configure_runtime(intra_op_threads=intra_op_threads)
+            self.runner = TracedModelRunner(model_path, image_size, batch_buckets)
+            self.num_classes = self.runner.num_classes
+            self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="model_runner")
+            self._predict = self.runner.predict
+        else:
+            # Forked children would inherit the parent's TensorFlow runtime
+            context = multiprocessing.get_context("spawn")
+            self.executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(str(model_path), list(image_size), self.batch_buckets, intra_op_threads,
+                          context.Value("i", 0))
+            )
+            self._predict = _worker_predict
+            # Starts and warms up every worker before the first request
+            outputs = list(self.executor.map(
+                _worker_predict, [np.zeros([1, *image_size], np.float32)] * workers
+            ))
+            self.num_classes = outputs[0].shape[-1]
+        logger.info(f"Model runner pool: {workers} {mode} workers for {self.model_path}")
+
+    def bucket(self, batch_size):
+        return nearest_bucket(self.batch_buckets, batch_size)
+
+    def chunk_sizes(self, batch_size):
+        """
+        Splits a batch into bucket-sized chunks for the workers.
+
+        Full largest buckets come first. The rest is split greedily into the
+        largest buckets it fills, into at most `workers` chunks, so e.g. 20
+        images become 16 + 4 instead of two chunks of 10 padded to 16.
+        """
+        largest = self.batch_buckets[-1]
+        sizes = [largest] * (batch_size // largest)
+        rest = batch_size - sum(sizes)
+        while rest:
+            fitting = [bucket for bucket in self.batch_buckets if bucket <= rest]
+            if len(sizes) % self.workers == self.workers - 1 or not fitting:
+                # The last chunk of a round takes the rest, padded to its bucket by the runner
+                sizes.append(rest)
+                break
+            sizes.append(fitting[-1])
+            rest -= fitting[-1]
+        return sizes
+
+    def submit(self, batch):
+        """
+        Queues one batch and returns a Future of its outputs.
+        """
+        batch = np.asarray(batch, dtype=np.float32)
+        bucket = self.bucket(len(batch))
+        start = time.perf_counter()
+        future = self.executor.submit(self._predict, batch)
+        future.add_done_callback(lambda f: self.latency.record(bucket, time.perf_counter() - start))
+        return future
+
+    def predict(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        futures, offset = [], 0
+        for size in self.chunk_sizes(len(batch)):
+            futures.append(self.submit(batch[offset:offset + size]))
+            offset += size
+        return np.concatenate([future.result() for future in futures])
+
+    def close(self):
+        self.executor.shutdown()
+
+
+def load_model_runner(model_path: Path, image_size=None, batch_buckets=None, workers: int = 1,
+                      worker_mode: str = "thread", intra_op_threads: int = 0):
+    """
+    Loads a .tflite artifact with TFLiteModelRunner. Keras artifacts get a
+    TracedModelRunner when `batch_buckets` are given (a ModelRunnerPool with
+    more than one worker) and a KerasModelRunner otherwise.
+    """
+    if Path(model_path).suffix == ".tflite":
+        runner = TFLiteModelRunner(model_path)
+    elif not batch_buckets:
+        runner = KerasModelRunner(model_path)
+    elif workers > 1:
+        runner = ModelRunnerPool(model_path, image_size, batch_buckets, workers=workers, mode=worker_mode,
+                                 intra_op_threads=intra_op_threads)
+    else:
+        if intra_op_threads:
+            configure_runtime(intra_op_threads=intra_op_threads)
+        runner = TracedModelRunner(model_path, image_size, batch_buckets)
+    logger.info(f"Loaded {type(runner).__name__} from {model_path}")
+    return runner
@@ -0,0 +1,180 @@
+import os
+import time
+import shutil
+import threading
+import tensorflow as tf
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from cnnClassifier import logger
+from cnnClassifier.utils.instrumentation import get_recorder
+
+# save_format of each model file suffix; any other path is saved as a SavedModel directory
+SAVE_FORMATS = {".h5": "h5", ".hdf5": "h5", ".keras": "keras_v3"}
+
+_EXECUTOR = None
+# Background saves still running, by resolved path
+_PENDING = {}
+# Models saved by this process: resolved path -> (model, (inode, mtime_ns) of the written file)
+_SAVED = {}
+_LOCK = threading.Lock()
+
+
+def _key(path):
+    return str(Path(path).resolve())
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def save_format(path):
+    """
+    Keras save_format of a model path: "h5" (.h5), "keras_v3" (.keras) or "tf" (SavedModel).
+    """
+    return SAVE_FORMATS.get(Path(path).suffix.lower(), "tf")
+
+
+def _write(model, path, background):
+    """
+    Saves into a temporary sibling and renames it over `path`, so readers
+    never see a partially written model.
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f"{path.stem}.tmp-{os.getpid()}{path.suffix}")
+    start = time.perf_counter()
+    try:
+        _remove(tmp_path)
+        os.makedirs(path.parent, exist_ok=True)
+        model.save(tmp_path, save_format=save_format(path))
+        if path.is_dir() or tmp_path.is_dir():
+            # os.replace cannot overwrite a directory, the old one is moved aside first
+            old_path = path.with_name(f"{path.stem}.old-{os.getpid()}{path.suffix}")
+            if path.exists():
+                os.replace(path, old_path)
+            os.replace(tmp_path, path)
+            _remove(old_path)
+        else:
+            os.replace(tmp_path, path)
+    except Exception:
+        _remove(tmp_path)
+        with _LOCK:
+            _SAVED.pop(_key(path), None)
+        logger.exception(f"Saving the model to {path} failed")
+        raise
+
+    seconds = time.perf_counter() - start
+    with _LOCK:
+        saved = _SAVED.get(_key(path))
+        if saved is not None and saved[0] is model:
+            _SAVED[_key(path)] = (model, _signature(path))
+    get_recorder().record(f"save {path.name}", start, seconds, background=background)
+    logger.info(f"Saved {path} ({save_format(path)}) in {seconds:.2f}s{' in the background' if background else ''}")
+
+
+def save_model(path: Path, model: tf.keras.Model, background: bool = False, share: bool = True):
+    """
+    Saves a model atomically in the format given by the suffix of `path`.
+
+    Args:
+        path (Path): Target file (.h5, .keras) or SavedModel directory.
+        model (tf.keras.Model): Model to save. With `background`, it must not
+            change until the save is done.
+        background (bool): Write on a background thread; wait_for_saves()
+            waits for it and raises its error.
+        share (bool): Hand the in-memory model to the next load_model(path) of
+            this process instead of reading the file back. Pass False when the
+            caller keeps changing the model.
+
+    Returns:
+        Future: The background save, None when saved synchronously.
+    """
+    global _EXECUTOR
+    # One writer per file: an earlier save of the same path finishes first
+    wait_for_saves(path)
+    with _LOCK:
+        if share:
+            _SAVED[_key(path)] = (model, None)
+        else:
+            _SAVED.pop(_key(path), None)
+
+    if not background:
+        _write(model, path, background=False)
+        return None
+
+    with _LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model_store")
+        future = _EXECUTOR.submit(_write, model, path, True)
+        _PENDING[_key(path)] = future
+    return future
+
+
+def is_saving(path: Path) -> bool:
+    """
+    True while a background save of `path` (or of a model inside it) has not been waited for.
+    """
+    key = _key(path)
+    with _LOCK:
+        return any(pending == key or pending.startswith(key + os.sep) for pending in _PENDING)
+
+
+def wait_for_saves(path: Path = None):
+    """
+    Waits for the background save of `path`, or of every model when None,
+    and raises the error of a failed save.
+    """
+    with _LOCK:
+        if path is None:
+            futures = list(_PENDING.values())
+            _PENDING.clear()
+        else:
+            future = _PENDING.pop(_key(path), None)
+            futures = [future] if future is not None else []
+
+    start = time.perf_counter()
+    for future in futures:
+        future.result()
+    if futures:
+        get_recorder().record("wait for model saves", start, time.perf_counter() - start, saves=len(futures))
+
+
+def load_model(path: Path, reuse: bool = True) -> tf.keras.Model:
+    """
+    Loads a model, reusing the one this process saved to `path` when the file
+    is still the one it wrote.
+
+    A reused model is handed over once (the caller may train it), so later
+    loads of the same path read the file. Inside a distribution strategy
+    scope the file is always read, so the variables belong to the strategy.
+
+    Args:
+        path (Path): Model file or SavedModel directory.
+        reuse (bool): Allow handing over the in-memory model.
+
+    Returns:
+        tf.keras.Model: The loaded model.
+    """
+    start = time.perf_counter()
+    # The model cannot be handed over while it is still being written
+    wait_for_saves(path)
+    with _LOCK:
+        saved = _SAVED.pop(_key(path), None)
+
+    if (reuse and saved is not None and saved[1] is not None and not tf.distribute.has_strategy()
+            and os.path.exists(path) and _signature(path) == saved[1]):
+        model, source = saved[0], "memory"
+    else:
+        model, source = tf.keras.models.load_model(path), "disk"
+
+    seconds = time.perf_counter() - start
+    get_recorder().record(f"load {Path(path).name}", start, seconds, source=source)
+    logger.info(f"Loaded {path} from {source} in {seconds:.2f}s")
+    return model
@@ -1,82 +1,647 @@
+import json
+import random
+import shutil
+import hashlib
+import pandas as pd
 import tensorflow as tf
+from cnnClassifier import logger
 from cnnClassifier.entity.config_entity import TrainingConfig
+from cnnClassifier.utils.common import save_json
+from cnnClassifier.components.input_pipeline import build_image_dataset, benchmark_loader
+from cnnClassifier.components.dataset_index import SAMPLING_MODES, index_image_files, load_dataset_index, oversample
+from cnnClassifier.components.data_sharding import build_shard_dataset
+from cnnClassifier.components.feature_cache import (FeatureCache, split_backbone_head, build_feature_dataset,
+                                                    weights_digest)
+from cnnClassifier.components.backbones import get_preprocess_fn
+from cnnClassifier.components.augmentation import AUGMENTATION_KWARGS
+from cnnClassifier.components.performance import configure_runtime, apply_precision_policy
+from cnnClassifier.components.callbacks import (ThroughputCallback, CheckpointCallback, InputWaitCallback,
+                                                ProfilerWindowCallback, MetricsCallback, sync_checkpoint)
+from cnnClassifier.components.distribution import create_strategy, is_chief, worker_path, discard_worker_path
+from cnnClassifier.components import model_store
+from dataclasses import replace
 from pathlib import Path
 
+
 class Training:
-    def __init__(self, config: TrainingConfig):
+    def __init__(self, config: TrainingConfig, dataset_index: list = None):
         self.config = config
+        # Dataset index rows already in memory (read from dataset_index_file when None)
+        self.dataset_index = dataset_index
+        self.trained_model = None
+        self.float32_model = None
+        self.checkpoint_manager = None
+        self.initial_epoch = 0
+        self.initial_step = 0
+        self.data_seed = None
+        self.make_train_data = None
+        self.strategy = tf.distribute.get_strategy()
+        self.batch_size = config.params_batch_size
+
+    def configure_runtime(self):
+        """
+        Applies the threading and oneDNN settings of the performance profile and
+        creates the distribution strategy (call before loading the model).
+
+        BATCH_SIZE is the batch of one replica, so the global batch grows with
+        the number of replicas.
+        """
+        configure_runtime(
+            intra_op_threads=self.config.params_intra_op_threads,
+            inter_op_threads=self.config.params_inter_op_threads,
+            onednn=self.config.params_onednn
+        )
+        self.strategy = create_strategy(
+            self.config.params_distribution_strategy,
+            cpu_devices=self.config.params_distribution_cpu_devices
+        )
+        self.batch_size = self.config.params_batch_size * self.strategy.num_replicas_in_sync
 
     
-    def get_base_model(self):
-        self.model = tf.keras.models.load_model(
-            self.config.updated_base_model_path
+    def get_base_model(self, model: tf.keras.Model = None):
+        """
+        Loads the updated base model, or takes `model` when the previous stage
+        passed it in memory (single replica only, replicated variables have to
+        be created in the strategy scope).
+        """
+        replicas = self.strategy.num_replicas_in_sync
+        with self.strategy.scope():
+            if model is not None and replicas == 1:
+                self.model = model
+            else:
+                self.model = model_store.load_model(self.config.updated_base_model_path)
+
+            if self.config.params_mixed_precision:
+                # Train a mixed precision clone, the float32 model is what gets saved
+                self.float32_model = self.model
+                self.model = apply_precision_policy(self.float32_model, self.config.params_mixed_precision)
+            if self.config.params_mixed_precision or self.config.params_jit_compile or replicas > 1:
+                compiled = self.float32_model if self.float32_model is not None else self.model
+                optimizer_config = compiled.optimizer.get_config()
+                if replicas > 1 and self.config.params_scale_learning_rate:
+                    # Linear scaling rule: the global batch is `replicas` times larger
+                    optimizer_config["learning_rate"] *= replicas
+                    logger.info(f"Learning rate scaled to {optimizer_config['learning_rate']} for {replicas} replicas")
+                self.model.compile(
+                    optimizer=compiled.optimizer.__class__.from_config(optimizer_config),
+                    loss=compiled.loss,
+                    metrics=["accuracy"],
+                    jit_compile=self.config.params_jit_compile
+                )
+
+    def restore_checkpoint(self):
+        """
+        Tracks the training state in a checkpoint and resumes from the latest one.
+
+        The checkpoint holds the weights, the optimizer state, the completed
+        epochs/steps and the shuffle seed, so the data stream continues where
+        the interrupted run stopped. A checkpoint written with another global
+        batch, base model or dataset index is ignored and training starts
+        over. Call after get_base_model and before train_valid_generator.
+        """
+        if not self.config.params_checkpoints_to_keep:
+            return
+
+        self.checkpoint = tf.train.Checkpoint(
+            model=self.model,
+            optimizer=self.model.optimizer,
+            epoch=tf.Variable(0, dtype=tf.int64),
+            step=tf.Variable(0, dtype=tf.int64),
+            data_seed=tf.Variable(random.randrange(2**31), dtype=tf.int64),
+            batch_size=tf.Variable(self.batch_size, dtype=tf.int64),
+            fingerprint=tf.Variable(self._checkpoint_fingerprint(), dtype=tf.string)
+        )
+        self.checkpoint_manager = tf.train.CheckpointManager(
+            self.checkpoint,
+            directory=str(worker_path(self.config.checkpoint_dir, self.strategy)),
+            max_to_keep=self.config.params_checkpoints_to_keep
+        )
+
+        # Every worker resumes from the chief's checkpoints
+        latest = tf.train.latest_checkpoint(str(self.config.checkpoint_dir))
+        if latest is not None:
+            mismatch = self._checkpoint_mismatch(latest)
+            if mismatch:
+                logger.warning(f"Ignoring {latest}: {mismatch}")
+            else:
+                self.checkpoint.restore(latest)
+                self.initial_epoch = int(self.checkpoint.epoch.numpy())
+                self.initial_step = int(self.checkpoint.step.numpy())
+                logger.info(f"Resuming from {latest} at epoch {self.initial_epoch}, step {self.initial_step}")
+
+        self.data_seed = int(self.checkpoint.data_seed.numpy())
+
+    def _checkpoint_fingerprint(self):
+        """
+        Digest of what a run starts from: the weights of the updated base model
+        and the images of the dataset index with their VALIDATION_SPLIT.
+        """
+        if self.dataset_index is None:
+            # Builds the index when it does not exist yet, as train_valid_generator would
+            self._index_files("training")
+        rows = self.dataset_index
+        if rows is None:
+            rows = load_dataset_index(self.config.dataset_index_file)
+
+        base_model = self.model if self.float32_model is None else self.float32_model
+        return hashlib.sha256(json.dumps(dict(
+            base_model=weights_digest(base_model),
+            images=sorted((row["path"], row["class"], row["sha256"]) for row in rows),
+            validation_split=self.config.params_validation_split
+        )).encode()).hexdigest()
+
+    def _checkpoint_mismatch(self, checkpoint_path):
+        """
+        Returns why the checkpoint cannot be resumed by this run, or None.
+        """
+        batch_size = tf.train.load_variable(checkpoint_path, "batch_size/.ATTRIBUTES/VARIABLE_VALUE")
+        if batch_size != self.batch_size:
+            return f"it was written with a global batch of {batch_size}"
+        try:
+            fingerprint = tf.train.load_variable(checkpoint_path, "fingerprint/.ATTRIBUTES/VARIABLE_VALUE")
+        except tf.errors.NotFoundError:
+            return "it has no fingerprint of the base model and dataset index"
+        if fingerprint.decode() != self.checkpoint.fingerprint.numpy().decode():
+            return "it was written from another base model or dataset index"
+        return None
+
+    def _roll_over_completed_epoch(self, steps_per_epoch):
+        """
+        A checkpoint taken after the last step of an epoch resumes at the start
+        of the next one, instead of finishing an epoch with no steps left.
+        """
+        if self.checkpoint_manager is None or self.initial_step < steps_per_epoch:
+            return
+        self.initial_epoch += 1
+        self.initial_step = 0
+        self.checkpoint.epoch.assign(self.initial_epoch)
+        self.checkpoint.step.assign(0)
+        logger.info(f"The checkpoint completed its epoch, resuming at epoch {self.initial_epoch}")
+
+    def _resume_batches(self):
+        """
+        Training batches consumed by the run being resumed.
+        """
+        return self.initial_epoch * (self.train_samples // self.batch_size) + self.initial_step
+
+    def _distributed(self, build, skip_batches=0):
+        """
+        Turns a dataset builder into training data for the strategy.
+
+        `build(skip_batches, batch_size, pipeline_index, num_pipelines)` returns
+        a tf.data.Dataset. With several replicas every input pipeline (one per
+        worker) reads its own slice of the files in per-replica batches, so no
+        image is decoded twice.
+        """
+        if self.strategy.num_replicas_in_sync == 1:
+            return build(skip_batches, self.batch_size, 0, 1)
+
+        def dataset_fn(input_context):
+            # Every step takes one batch per local replica from this pipeline
+            batches_per_step = self.strategy.num_replicas_in_sync // input_context.num_input_pipelines
+            return build(
+                skip_batches * batches_per_step,
+                input_context.get_per_replica_batch_size(self.batch_size),
+                input_context.input_pipeline_id,
+                input_context.num_input_pipelines
+            )
+
+        return tf.keras.utils.experimental.DatasetCreator(dataset_fn)
+
+    def _throughput_callback(self):
+        return ThroughputCallback(
+            batch_size=self.batch_size,
+            report_file=self.config.throughput_report_file if is_chief(self.strategy) else None,
+            profile=dict(
+                intra_op_threads=self.config.params_intra_op_threads,
+                inter_op_threads=self.config.params_inter_op_threads,
+                onednn=self.config.params_onednn,
+                jit_compile=self.config.params_jit_compile,
+                mixed_precision=self.config.params_mixed_precision,
+                training_mode=self.config.params_training_mode,
+                input_pipeline=self.config.params_input_pipeline,
+                augmentation=self.config.params_is_augmentation,
+                backbone=self.config.params_backbone,
+                distribution_strategy=self.config.params_distribution_strategy,
+                replicas=self.strategy.num_replicas_in_sync
+            )
         )
 
+    def _instrumentation_callbacks(self):
+        callbacks = [MetricsCallback(self.batch_size)]
+        if self.config.params_profile_input_wait:
+            callbacks.append(InputWaitCallback())
+        if self.config.params_profiler_trace_steps:
+            start_step, stop_step = self.config.params_profiler_trace_steps
+            callbacks.append(ProfilerWindowCallback(start_step, stop_step, logdir=self.config.profile_dir))
+        return callbacks
+
+    @staticmethod
+    def _timed_input(data, callbacks):
+        """
+        Returns `data` wrapped by the InputWaitCallback among `callbacks`, if any.
+        """
+        for callback in callbacks:
+            if isinstance(callback, InputWaitCallback):
+                return callback.wrap(data)
+        return data
+
+    def _model_to_save(self):
+        """
+        Returns the float32 model holding the trained weights.
+        """
+        if self.float32_model is None:
+            return self.model
+        self.float32_model.set_weights(self.model.get_weights())
+        return self.float32_model
+
     def train_valid_generator(self):
+        input_pipeline = self.config.params_input_pipeline
+        if input_pipeline == "generator" and self.strategy.num_replicas_in_sync > 1:
+            # An ImageDataGenerator flow cannot be sharded, every worker would decode the whole dataset
+            logger.warning("INPUT_PIPELINE: generator cannot shard the data across replicas, using tf_data instead")
+            input_pipeline = "tf_data"
+        if input_pipeline == "shards":
+            return self.train_valid_shards()
+        if input_pipeline == "tf_data":
+            return self.train_valid_dataset()
+
+        valid_files, valid_labels, self.class_indices = self._index_files("validation")
+        train_files, train_labels = self._sampled(*self._index_files("training")[:2])
 
         datagenerator_kwargs = dict(
-            rescale = 1./255,
-            validation_split=0.20
+            preprocessing_function=get_preprocess_fn(self.config.params_backbone)
         )
 
         dataflow_kwargs = dict(
             target_size=self.config.params_image_size[:-1],
-            batch_size=self.config.params_batch_size,
-            interpolation="bilinear"
+            batch_size=self.batch_size,
+            interpolation="bilinear",
+            **self._dataframe_kwargs()
         )
 
         valid_datagenerator = tf.keras.preprocessing.image.ImageDataGenerator(
             **datagenerator_kwargs
         )
 
-        self.valid_generator = valid_datagenerator.flow_from_directory(
-            directory=self.config.training_data,
-            subset="validation",
+        self.valid_generator = valid_datagenerator.flow_from_dataframe(
+            self._dataframe(valid_files, valid_labels),
             shuffle=False,
             **dataflow_kwargs
         )
 
         if self.config.params_is_augmentation:
             train_datagenerator = tf.keras.preprocessing.image.ImageDataGenerator(
-                rotation_range=40,
-                horizontal_flip=True,
-                width_shift_range=0.2,
-                height_shift_range=0.2,
-                shear_range=0.2,
-                zoom_range=0.2,
+                **AUGMENTATION_KWARGS,
                 **datagenerator_kwargs
             )
         else:
             train_datagenerator = valid_datagenerator
 
-        self.train_generator = train_datagenerator.flow_from_directory(
-            directory=self.config.training_data,
-            subset="training",
+        self.train_generator = train_datagenerator.flow_from_dataframe(
+            self._dataframe(train_files, train_labels),
             shuffle=True,
+            seed=self.data_seed,
             **dataflow_kwargs
         )
 
+        self.train_samples = self.train_generator.samples
+        self.valid_samples = self.valid_generator.samples
+
+    def _data_cache(self, subset, files, labels, pipeline_index=0, num_pipelines=1):
+        """
+        Returns the DATA_CACHE of a pipeline; with "disk", a file under data_cache_dir.
+
+        The file name holds a digest of what the decoded images depend on (the
+        files and labels of the pipeline, IMAGE_SIZE, SAMPLING and BACKBONE),
+        so a rebuilt index, a new VALIDATION_SPLIT or a new image size starts a
+        new cache. The caches written with other settings are deleted.
+        """
+        if self.config.params_data_cache != "disk":
+            return self.config.params_data_cache
+
+        name = subset if num_pipelines == 1 else f"{subset}_{pipeline_index}_of_{num_pipelines}"
+        digest = hashlib.sha256(json.dumps(dict(
+            files=list(map(str, files)),
+            labels=list(map(int, labels)),
+            image_size=list(self.config.params_image_size),
+            sampling=self.config.params_sampling,
+            backbone=self.config.params_backbone
+        )).encode()).hexdigest()[:16]
+
+        cache_dir = Path(self.config.data_cache_dir)
+        for stale in cache_dir.glob(f"{name}-*"):
+            if not stale.name.startswith(f"{name}-{digest}"):
+                stale.unlink()
+        return str(cache_dir / f"{name}-{digest}")
+
+    def _index_files(self, subset):
+        """
+        Files, labels and class indices of a subset, read from the dataset index.
+        """
+        return index_image_files(
+            self.config.dataset_index_file, self.config.training_data,
+            subset=subset, validation_split=self.config.params_validation_split, rows=self.dataset_index
+        )
+
+    def _sampling(self, balanced_batches=False):
+        """
+        SAMPLING mode the current pipeline applies: balanced batches are only
+        drawn by the tf_data pipeline, the other pipelines oversample instead.
+        """
+        sampling = self.config.params_sampling
+        if sampling not in SAMPLING_MODES:
+            raise ValueError(f"Unknown SAMPLING {sampling!r}, expected one of {SAMPLING_MODES}")
+        if sampling == "balanced" and not balanced_batches:
+            logger.warning("SAMPLING: balanced needs the tf_data pipeline, oversampling instead")
+            return "oversample"
+        return sampling
+
+    def _sampled(self, files, labels, balanced_batches=False):
+        """
+        Oversamples the training files when SAMPLING asks for it.
+        """
+        if self._sampling(balanced_batches) == "oversample":
+            return oversample(files, labels, seed=self.data_seed)
+        return files, labels
+
+    def _dataframe_kwargs(self):
+        return dict(x_col="filename", y_col="class", classes=list(self.class_indices), validate_filenames=False)
+
+    def _dataframe(self, files, labels):
+        classes = list(self.class_indices)
+        return pd.DataFrame({"filename": files, "class": [classes[label] for label in labels]})
+
+    def train_valid_dataset(self):
+        """
+        Builds tf.data train/validation pipelines from the fixed subsets of the dataset index.
+        """
+        valid_files, valid_labels, self.class_indices = self._index_files("validation")
+        train_files, train_labels = self._sampled(*self._index_files("training")[:2], balanced_batches=True)
+        balanced = self.config.params_sampling == "balanced"
+
+        def builder(files, labels, subset, shuffle):
+            return lambda skip_batches, batch_size, index, count: build_image_dataset(
+                files[index::count], labels[index::count], len(self.class_indices),
+                image_size=self.config.params_image_size,
+                batch_size=batch_size,
+                shuffle=shuffle,
+                cache=self._data_cache(subset, files[index::count], labels[index::count], index, count),
+                repeat=True,
+                seed=self.data_seed if shuffle else None,
+                backbone=self.config.params_backbone,
+                skip_batches=skip_batches,
+                balanced=balanced and subset == "training",
+                augment=self.config.params_is_augmentation and subset == "training"
+            )
+
+        self.valid_generator = self._distributed(builder(valid_files, valid_labels, "validation", shuffle=False))
+        self.make_train_data = lambda skip_batches: self._distributed(
+            builder(train_files, train_labels, "training", shuffle=True), skip_batches
+        )
+
+        self.train_samples = len(train_files)
+        self.valid_samples = len(valid_files)
+        self.train_generator = self.make_train_data(self._resume_batches())
+        logger.info(f"tf.data pipeline: {self.train_samples} training and {self.valid_samples} validation images")
+
     
+    def train_valid_shards(self):
+        """
+        Streams train/validation batches from the memory-mapped shards written
+        by the data sharding stage.
+        """
+        shard_kwargs = dict(
+            shard_dir=self.config.shard_dir,
+            index_file=self.config.shard_index_file,
+            repeat=True,
+            backbone=self.config.params_backbone
+        )
+
+        oversampled = self._sampling() == "oversample"
+
+        def builder(subset, shuffle):
+            return lambda skip_batches, batch_size, index, count: build_shard_dataset(
+                subset=subset,
+                batch_size=batch_size,
+                shuffle=shuffle,
+                seed=self.data_seed if shuffle else None,
+                skip_batches=skip_batches,
+                shard_index=index,
+                num_shards=count,
+                oversampled=oversampled and subset == "training",
+                augment=self.config.params_is_augmentation and subset == "training",
+                **shard_kwargs
+            )[0]
+
+        _, self.valid_samples, self.class_indices = build_shard_dataset(
+            subset="validation", batch_size=self.batch_size, **shard_kwargs
+        )
+        _, self.train_samples, _ = build_shard_dataset(
+            subset="training", batch_size=self.batch_size, oversampled=oversampled,
+            seed=self.data_seed, **shard_kwargs
+        )
+
+        self.valid_generator = self._distributed(builder("validation", shuffle=False))
+        self.make_train_data = lambda skip_batches: self._distributed(builder("training", shuffle=True), skip_batches)
+        self.train_generator = self.make_train_data(self._resume_batches())
+        logger.info(f"Shard pipeline: {self.train_samples} training and {self.valid_samples} validation images")
+
     @staticmethod
-    def save_model(path: Path, model: tf.keras.Model):
-        model.save(path)
+    def save_model(path: Path, model: tf.keras.Model, background: bool = False):
+        return model_store.save_model(path, model, background=background)
 
 
 
     
+    def _feature_caching_enabled(self):
+        if self.config.params_training_mode != "cached_features":
+            return False
+        if self.strategy.num_replicas_in_sync > 1:
+            logger.warning("cached_features runs on a single replica, training the full model")
+            return False
+        if self.config.params_is_augmentation and self.config.params_feature_cache_augment_seeds < 1:
+            logger.warning("AUGMENTATION needs FEATURE_CACHE_AUGMENT_SEEDS > 0 for cached features, training the full model")
+            return False
+        backbone, _ = split_backbone_head(self.model)
+        if backbone.trainable_weights:
+            logger.warning("The backbone has trainable layers, cached features would be stale, training the full model")
+            return False
+        return True
+
+    def _ordered_batches(self, subset, backbone_digest, seed=None):
+        """
+        Returns an unshuffled pass over a subset, augmented with `seed` when given.
+        """
+        files, labels, self.class_indices = self._index_files(subset)
+        batches = build_image_dataset(
+            files, labels, len(self.class_indices),
+            image_size=self.config.params_image_size,
+            batch_size=self.config.params_batch_size,
+            seed=seed,
+            backbone=self.config.params_backbone,
+            augment=seed is not None
+        )
+
+        fingerprint = dict(
+            model=backbone_digest,
+            image_size=list(self.config.params_image_size),
+            backbone=self.config.params_backbone,
+            files=hashlib.sha256("\n".join(files).encode()).hexdigest(),
+            seed=seed,
+            augmentation=AUGMENTATION_KWARGS if seed is not None else None
+        )
+        return batches, len(files), fingerprint
+
+    def train_cached_features(self):
+        """
+        Trains only the classification head on backbone features computed once.
+
+        The head shares its layers with the full model, so the full model is
+        up to date when training finishes.
+        """
+        backbone, head = split_backbone_head(self.model)
+        head.compile(
+            optimizer=self.model.optimizer,
+            loss=self.model.loss,
+            metrics=["accuracy"]
+        )
+        cache = FeatureCache(self.config.feature_cache_dir, backbone)
+        monitoring = [self._throughput_callback()] + self._instrumentation_callbacks()
+        num_classes = self.model.output.shape[-1]
+        batch_size = self.config.params_batch_size
+
+        # The backbone in memory identifies the features, its file may still be being written
+        backbone_digest = weights_digest(backbone)
+        batches, samples, fingerprint = self._ordered_batches("validation", backbone_digest)
+        valid_features, valid_labels = cache.load_or_build("validation", fingerprint, batches, samples)
+
+        if self.config.params_is_augmentation:
+            seeds = list(range(self.config.params_feature_cache_augment_seeds))
+        else:
+            seeds = [None]
+        train_sets = []
+        for seed in seeds:
+            name = "training" if seed is None else f"training_seed{seed}"
+            batches, samples, fingerprint = self._ordered_batches("training", backbone_digest, seed=seed)
+            train_sets.append(cache.load_or_build(name, fingerprint, batches, samples))
+
+        valid_dataset = build_feature_dataset(valid_features, valid_labels, num_classes, batch_size, repeat=True)
+        self._roll_over_completed_epoch(len(train_sets[0][1]) // batch_size)
+        if self.initial_step:
+            logger.info(f"Cached features resume at epoch granularity, restarting epoch {self.initial_epoch}")
+            self.checkpoint.step.assign(0)
+        for epoch in range(self.initial_epoch, self.config.params_epochs):
+            # Every epoch uses the features of the next augmentation seed
+            train_features, train_labels = train_sets[epoch % len(train_sets)]
+            steps_per_epoch = len(train_labels) // batch_size
+            head.fit(
+                self._timed_input(build_feature_dataset(train_features, train_labels, num_classes, batch_size,
+                                                        shuffle=True, repeat=True, seed=epoch), monitoring),
+                initial_epoch=epoch,
+                epochs=epoch + 1,
+                steps_per_epoch=steps_per_epoch,
+                validation_steps=len(valid_labels) // batch_size,
+                validation_data=valid_dataset,
+                callbacks=monitoring + self._checkpoint_callbacks(steps_per_epoch, every_steps=0)
+            )
+
+        self._save_trained_model()
+
+    def _checkpoint_callbacks(self, steps_per_epoch, every_steps):
+        if self.checkpoint_manager is None:
+            return []
+        return [CheckpointCallback(
+            self.checkpoint_manager,
+            epoch=self.checkpoint.epoch,
+            step=self.checkpoint.step,
+            steps_per_epoch=steps_per_epoch,
+            every_steps=every_steps,
+            background=self.config.params_checkpoint_async and self.strategy.num_replicas_in_sync == 1
+        )]
+
+    def _save_trained_model(self):
+        model_path = worker_path(self.config.trained_model_path, self.strategy)
+        self.trained_model = self._model_to_save()
+        # Replicated variables are saved in the foreground, every worker takes part in the save
+        self.save_model(
+            path=model_path,
+            model=self.trained_model,
+            background=self.strategy.num_replicas_in_sync == 1
+        )
+        discard_worker_path(model_path, self.strategy)
+        if not is_chief(self.strategy):
+            if self.checkpoint_manager is not None:
+                discard_worker_path(self.checkpoint_manager.directory, self.strategy)
+            return
+
+        save_json(path=self.config.class_indices_file, data=self.class_indices)
+
+        # The run is complete, the next one starts again from the base model
+        if self.checkpoint_manager is not None:
+            sync_checkpoint(self.checkpoint)
+            shutil.rmtree(self.config.checkpoint_dir, ignore_errors=True)
+
     def train(self):
-        self.steps_per_epoch = self.train_generator.samples // self.train_generator.batch_size
-        self.validation_steps = self.valid_generator.samples // self.valid_generator.batch_size
+        if self._feature_caching_enabled():
+            return self.train_cached_features()
 
-        self.model.fit(
-            self.train_generator,
-            epochs=self.config.params_epochs,
-            steps_per_epoch=self.steps_per_epoch,
+        self.steps_per_epoch = self.train_samples // self.batch_size
+        self.validation_steps = self.valid_samples // self.batch_size
+        self._roll_over_completed_epoch(self.steps_per_epoch)
+        callbacks = [self._throughput_callback()] + self._instrumentation_callbacks() + self._checkpoint_callbacks(
+            self.steps_per_epoch, every_steps=self.config.params_checkpoint_every_steps
+        )
+        fit_kwargs = dict(
             validation_steps=self.validation_steps,
-            validation_data=self.valid_generator
+            validation_data=self.valid_generator,
+            callbacks=callbacks
         )
 
-        self.save_model(
-            path=self.config.trained_model_path,
-            model=self.model
-        )
\ No newline at end of file
+        epoch, train_data = self.initial_epoch, self.train_generator
+        if self.initial_step and self.make_train_data is None:
+            logger.warning(f"The generator pipeline cannot skip batches, restarting epoch {epoch}")
+            self.checkpoint.step.assign(0)
+        elif self.initial_step:
+            # Finish the interrupted epoch, then continue with full epochs
+            self.model.fit(
+                self._timed_input(train_data, callbacks),
+                initial_epoch=epoch,
+                epochs=epoch + 1,
+                steps_per_epoch=self.steps_per_epoch - self.initial_step,
+                **fit_kwargs
+            )
+            epoch += 1
+            train_data = self.make_train_data(epoch * self.steps_per_epoch)
+
+        if epoch < self.config.params_epochs:
+            self.model.fit(
+                self._timed_input(train_data, callbacks),
+                initial_epoch=epoch,
+                epochs=self.config.params_epochs,
+                steps_per_epoch=self.steps_per_epoch,
+                **fit_kwargs
+            )
+
+        self._save_trained_model()
+
+
+def benchmark_loaders(config: TrainingConfig, loaders=("generator", "tf_data"), num_batches=50, augmentation=None):
+    """
+    Compares the images/sec of the training loaders on the ingested data.
+
+    Args:
+        augmentation (bool, optional): Overrides AUGMENTATION, e.g. to compare the
+            ImageDataGenerator transforms with the batched tf.data ones.
+
+    Returns:
+        dict: benchmark_loader result per INPUT_PIPELINE value.
+    """
+    if augmentation is not None:
+        config = replace(config, params_is_augmentation=augmentation)
+    results = {}
+    for loader in loaders:
+        training = Training(config=replace(config, params_input_pipeline=loader))
+        training.train_valid_generator()
+        results[loader] = benchmark_loader(training.train_generator, num_batches=num_batches)
+    return results
@@ -0,0 +1,93 @@
+import os
+import sys
+from cnnClassifier import logger
+
+
+def configure_onednn(onednn=None):
+    """
+    Enables/disables oneDNN kernels (None keeps the default).
+
+    TensorFlow reads the switch when it is imported, so this must run first;
+    this module does not import TensorFlow at load time for that reason.
+    """
+    if onednn is None:
+        return
+    value = "1" if onednn else "0"
+    if os.environ.get("TF_ENABLE_ONEDNN_OPTS") != value and "tensorflow" in sys.modules:
+        logger.warning(
+            f"ONEDNN: {onednn} has no effect once TensorFlow is loaded, "
+            f"export TF_ENABLE_ONEDNN_OPTS={value} before starting the process"
+        )
+    os.environ["TF_ENABLE_ONEDNN_OPTS"] = value
+
+
+def configure_runtime(intra_op_threads=0, inter_op_threads=0, onednn=None):
+    """
+    Applies the CPU threading and oneDNN settings of the performance profile.
+
+    Thread pools can only be sized before TensorFlow runs its first op, and
+    oneDNN is only toggled when TensorFlow is imported, so settings that come
+    too late are logged and skipped instead of failing the run.
+
+    Args:
+        intra_op_threads (int): Threads used inside one op (0 lets TensorFlow decide).
+        inter_op_threads (int): Ops run in parallel (0 lets TensorFlow decide).
+        onednn (bool, optional): Enable/disable oneDNN kernels, None keeps the default.
+    """
+    configure_onednn(onednn)
+    import tensorflow as tf
+
+    try:
+        if intra_op_threads:
+            tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+        if inter_op_threads:
+            tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+    except RuntimeError:
+        pass
+    # Once TensorFlow is initialized the setters either raise or are ignored, so compare what is in effect
+    for name, requested, current in (
+        ("intra_op", intra_op_threads, tf.config.threading.get_intra_op_parallelism_threads()),
+        ("inter_op", inter_op_threads, tf.config.threading.get_inter_op_parallelism_threads())
+    ):
+        if requested and current != requested:
+            logger.warning(
+                f"Could not set {name} threads to {requested}, TensorFlow is already initialized "
+                f"(still {current}); run the stage on its own to apply it"
+            )
+
+    logger.info(
+        f"TensorFlow runtime: intra_op={tf.config.threading.get_intra_op_parallelism_threads()}, "
+        f"inter_op={tf.config.threading.get_inter_op_parallelism_threads()}, "
+        f"oneDNN={os.environ.get('TF_ENABLE_ONEDNN_OPTS', 'default')}, cpus={os.cpu_count()}"
+    )
+
+
+def apply_precision_policy(model, policy):
+    """
+    Rebuilds a model with a mixed precision policy, keeping the output layer in float32.
+
+    The softmax output stays float32 for numerically stable probabilities and
+    loss. Variables are float32 under mixed policies, so the weights of the
+    returned model can be copied back to `model` as they are.
+
+    Args:
+        model (tf.keras.Model): float32 model.
+        policy (str): Keras dtype policy, e.g. "mixed_bfloat16".
+
+    Returns:
+        tf.keras.Model: Clone of the model running in `policy`, with the same weights.
+    """
+    import tensorflow as tf
+
+    output_layer = model.layers[-1]
+
+    def clone_layer(layer):
+        config = layer.get_config()
+        if not isinstance(layer, tf.keras.layers.InputLayer):
+            config["dtype"] = "float32" if layer is output_layer else policy
+        return layer.__class__.from_config(config)
+
+    mixed_model = tf.keras.models.clone_model(model, clone_function=clone_layer)
+    mixed_model.set_weights(model.get_weights())
+    logger.info(f"Training with the {policy} policy, output layer {output_layer.name} kept in float32")
+    return mixed_model
@@ -0,0 +1,218 @@
+import os
+import json
+import time
+import queue
+import atexit
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from cnnClassifier import logger
+from cnnClassifier.utils.metrics import CACHE_LOOKUPS
+
+_FINGERPRINTS = {}
+
+
+def model_fingerprint(model_path: Path) -> str:
+    """
+    Content hash of a model file (or SavedModel directory).
+
+    Hashes are memoized per (path, size, mtime) so a multi-hundred MB model is
+    only read once per process.
+    """
+    model_path = Path(model_path)
+    files = sorted(p for p in model_path.rglob("*") if p.is_file()) if model_path.is_dir() else [model_path]
+    stamp = (str(model_path), tuple((str(p), p.stat().st_size, p.stat().st_mtime_ns) for p in files))
+    if stamp not in _FINGERPRINTS:
+        sha256 = hashlib.sha256()
+        for file in files:
+            sha256.update(file.relative_to(model_path).as_posix().encode() if model_path.is_dir() else b"")
+            with open(file, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    sha256.update(chunk)
+        _FINGERPRINTS[stamp] = sha256.hexdigest()
+    return _FINGERPRINTS[stamp]
+
+
+class PredictionCache:
+    # Rows written between two prunes of the on-disk layer
+    PRUNE_EVERY = 1000
+    # Rows committed together by the disk writer
+    WRITE_BATCH = 256
+
+    def __init__(self, model_path: Path, max_entries: int, ttl_seconds: float, disk_path: Path = None,
+                 max_disk_entries: int = 100000):
+        """
+        Caches model outputs by the hash of the encoded image bytes and of the model file.
+
+        The in-process layer is an LRU bounded by `max_entries` and `ttl_seconds`;
+        the optional SQLite layer at `disk_path` survives restarts. Entries of
+        another model never match, and binding a different model clears them.
+
+        Disk writes are queued and committed in batches by a writer thread, so
+        a miss never waits for SQLite. The writer deletes expired rows and
+        keeps the newest `max_disk_entries` when a model is bound and every
+        PRUNE_EVERY writes.
+
+        Args:
+            model_path (Path): Model file whose outputs are cached.
+            max_entries (int): Maximum number of entries kept in memory.
+            ttl_seconds (float): Age after which an entry is ignored (0 keeps entries forever).
+            disk_path (Path, optional): SQLite file for the on-disk layer.
+            max_disk_entries (int): Maximum number of rows kept on disk (0 for no limit).
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._db = None
+        if disk_path is not None:
+            os.makedirs(Path(disk_path).parent, exist_ok=True)
+            self._db = sqlite3.connect(str(disk_path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS predictions "
+                "(key TEXT PRIMARY KEY, model TEXT, value TEXT, created REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS predictions_created ON predictions (created)")
+            # The connection is shared by the request threads (reads) and the writer thread
+            self._db_lock = threading.Lock()
+            self._writes = queue.SimpleQueue()
+            self._written = 0
+            self._writer = threading.Thread(target=self._write_loop, name="prediction_cache", daemon=True)
+            self._writer.start()
+            atexit.register(self.close)
+
+        self.model_hash = None
+        self.bind_model(model_path)
+
+    def bind_model(self, model_path: Path):
+        """
+        Point the cache at the model that is now serving, dropping entries of any other model.
+        """
+        model_hash = model_fingerprint(model_path)
+        with self._lock:
+            if model_hash == self.model_hash:
+                return
+            self._entries.clear()
+            self.model_hash = model_hash
+        if self._db is not None:
+            self.prune()
+        logger.info(f"Prediction cache bound to {model_path} ({model_hash[:12]})")
+
+    def prune(self):
+        """
+        Deletes the on-disk rows of other models and expired rows, then keeps the newest `max_disk_entries`.
+        """
+        with self._db_lock, self._db:
+            self._db.execute("DELETE FROM predictions WHERE model != ?", (self.model_hash,))
+            if self.ttl_seconds:
+                self._db.execute("DELETE FROM predictions WHERE created < ?", (time.time() - self.ttl_seconds,))
+            if self.max_disk_entries:
+                self._db.execute(
+                    "DELETE FROM predictions WHERE key IN "
+                    "(SELECT key FROM predictions ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,)
+                )
+
+    def key(self, image_bytes: bytes) -> str:
+        return hashlib.sha256(self.model_hash.encode() + hashlib.sha256(image_bytes).digest()).hexdigest()
+
+    def _expired(self, created: float) -> bool:
+        return bool(self.ttl_seconds) and time.time() - created > self.ttl_seconds
+
+    def get(self, image_bytes: bytes):
+        """
+        Returns the cached value for the image, or None.
+        """
+        key = self.key(image_bytes)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._expired(entry[0]):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                CACHE_LOOKUPS.inc(result="hit")
+                return entry[1]
+
+        row = None
+        if self._db is not None:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT value, created FROM predictions WHERE key = ?", (key,)
+                ).fetchone()
+
+        with self._lock:
+            if row is not None and not self._expired(row[1]):
+                value = json.loads(row[0])
+                self._store(key, value, row[1])
+                self.hits += 1
+                CACHE_LOOKUPS.inc(result="hit")
+                return value
+
+            self.misses += 1
+            CACHE_LOOKUPS.inc(result="miss")
+            return None
+
+    def put(self, image_bytes: bytes, value):
+        """
+        Caches a JSON-serializable value for the image.
+        """
+        key = self.key(image_bytes)
+        created = time.time()
+        with self._lock:
+            self._store(key, value, created)
+            model_hash = self.model_hash
+        if self._db is not None:
+            self._writes.put((key, model_hash, json.dumps(value), created))
+
+    def _write_loop(self):
+        while True:
+            batch = [self._writes.get()]
+            while batch[-1] is not None and len(batch) < self.WRITE_BATCH:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            rows = [row for row in batch if row is not None]
+            if rows:
+                try:
+                    with self._db_lock, self._db:
+                        self._db.executemany("INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?)", rows)
+                    self._written += len(rows)
+                    if self._written >= self.PRUNE_EVERY:
+                        self._written = 0
+                        self.prune()
+                except sqlite3.Error as e:
+                    logger.warning(f"Could not write {len(rows)} cached predictions to disk: {e}")
+            if batch[-1] is None:
+                return
+
+    def close(self):
+        """
+        Writes the queued predictions to disk, prunes them and stops the writer thread.
+        """
+        if self._db is not None and self._writer.is_alive():
+            self._writes.put(None)
+            self._writer.join()
+            self.prune()
+
+    def _store(self, key, value, created):
+        self._entries[key] = (created, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "model": self.model_hash
+            }
@@ -1,6 +1,19 @@
+import os
+import time
+import tempfile
+import numpy as np
 import tensorflow as tf
 from pathlib import Path
+from cnnClassifier import logger
 from cnnClassifier.entity.config_entity import PrepareBaseModelConfig
+from cnnClassifier.utils.common import save_json
+from cnnClassifier.components.backbones import build_backbone, count_flops
+from cnnClassifier.components.dataset_index import index_image_files
+from cnnClassifier.components.input_pipeline import build_image_dataset
+from cnnClassifier.components import model_store
+
+# Classification heads that can be put on top of the base model
+HEADS = ("flatten", "global_avg_pool", "global_max_pool", "pooled_mlp")
 
 class PrepareBaseModel:
     def __init__(self, config: PrepareBaseModelConfig):
@@ -14,24 +27,66 @@ class PrepareBaseModel:
 
     def get_base_model(self):
         """
-        Loads the VGG16 model with specified configurations and saves it.
+        Loads the BACKBONE model (VGG16 by default) with specified configurations and saves it.
 
         Actions:
-            - Loads the VGG16 model with specified image size, weights, and top layer inclusion.
+            - Loads the backbone with specified image size, weights, and top layer inclusion,
+              reusing the weights cached under weights_cache_dir when available.
             - Saves the model to the path specified in the configuration.
         """
-        # Load the VGG16 model using specified parameters
-        self.model = tf.keras.applications.VGG16(
+        # Load the backbone using specified parameters
+        self.model = build_backbone(
+            name=self.config.params_backbone,
             input_shape=self.config.params_image_size,
             weights=self.config.params_weights,
-            include_top=self.config.params_include_top
+            include_top=self.config.params_include_top,
+            weights_cache_dir=self.config.weights_cache_dir
         )
 
-        # Save the loaded base model
-        self.save_model(path=self.config.base_model_path, model=self.model)
+        # Save the loaded base model (not shared: update_base_model freezes its layers).
+        # This save stays synchronous: update_base_model freezes the same layers right after,
+        # and a background write would race with it and could store frozen layers. Writing
+        # a clone in the background instead costs more than the write (VGG16 without top:
+        # ~0.4s to clone, ~0.15s to save as .h5).
+        self.save_model(path=self.config.base_model_path, model=self.model, share=False)
 
     @staticmethod
-    def _prepare_full_model(model, classes, freeze_all, freeze_till, learning_rate):
+    def _build_head(features, classes, head, head_units, head_dropout):
+        """
+        Adds the classification head selected by HEAD on top of the backbone features.
+
+        Args:
+            features (tf.Tensor): Output of the base model.
+            classes (int): Number of output classes.
+            head (str): One of HEADS.
+            head_units (int): Hidden units of the "pooled_mlp" head.
+            head_dropout (float): Dropout before the output layer of the "pooled_mlp" head.
+
+        Returns:
+            tf.Tensor: Softmax predictions.
+        """
+        if head == "flatten":
+            x = tf.keras.layers.Flatten()(features)
+        elif head == "global_avg_pool":
+            x = tf.keras.layers.GlobalAveragePooling2D()(features)
+        elif head == "global_max_pool":
+            x = tf.keras.layers.GlobalMaxPooling2D()(features)
+        elif head == "pooled_mlp":
+            x = tf.keras.layers.GlobalAveragePooling2D()(features)
+            x = tf.keras.layers.Dense(units=head_units, activation="relu")(x)
+            if head_dropout:
+                x = tf.keras.layers.Dropout(head_dropout)(x)
+        else:
+            raise ValueError(f"Unknown HEAD {head!r}, expected one of {HEADS}")
+
+        return tf.keras.layers.Dense(
+            units=classes,  # Set to 3 for three classes
+            activation="softmax"
+        )(x)
+
+    @staticmethod
+    def _prepare_full_model(model, classes, freeze_all, freeze_till, learning_rate,
+                            head="flatten", head_units=256, head_dropout=0.0):
         """
         Prepares the full model by adding a classification layer on top of the base model.
 
@@ -41,6 +96,9 @@ class PrepareBaseModel:
             freeze_all (bool): Whether to freeze all layers of the base model.
             freeze_till (int): Number of layers from the end of the model to be unfrozen.
             learning_rate (float): Learning rate for the optimizer.
+            head (str): Classification head, one of HEADS.
+            head_units (int): Hidden units of the "pooled_mlp" head.
+            head_dropout (float): Dropout of the "pooled_mlp" head.
 
         Returns:
             tf.keras.Model: The full model with a classification head.
@@ -53,12 +111,8 @@ class PrepareBaseModel:
             for layer in model.layers[:-freeze_till]:
                 layer.trainable = False
 
-        # Add a new classification layer on top of the base model
-        flatten_in = tf.keras.layers.Flatten()(model.output)
-        prediction = tf.keras.layers.Dense(
-            units=classes,  # Set to 3 for three classes
-            activation="softmax"
-        )(flatten_in)
+        # Add a new classification head on top of the base model
+        prediction = PrepareBaseModel._build_head(model.output, classes, head, head_units, head_dropout)
 
         # Create a new model with the updated top layer
         full_model = tf.keras.models.Model(
@@ -77,10 +131,14 @@ class PrepareBaseModel:
         full_model.summary()
         return full_model
 
-    def update_base_model(self):
+    def update_base_model(self, share: bool = True):
         """
         Updates the base model by preparing it for classification and saving the updated model.
 
+        Args:
+            share (bool): Let a later load of the updated model in this process reuse
+                full_model (pass False when full_model is handed over another way).
+
         Actions:
             - Prepares the full model by adding a classification head.
             - Saves the updated model to the path specified in the configuration.
@@ -91,19 +149,158 @@ class PrepareBaseModel:
             classes=self.config.params_classes,  # Update to 3 for three classes
             freeze_all=True,
             freeze_till=None,
-            learning_rate=self.config.params_learning_rate
+            learning_rate=self.config.params_learning_rate,
+            head=self.config.params_head,
+            head_units=self.config.params_head_units,
+            head_dropout=self.config.params_head_dropout
         )
 
-        # Save the updated model
-        self.save_model(path=self.config.updated_base_model_path, model=self.full_model)
+        # Save the updated model in the background, training reuses it from memory in the same process
+        self.save_model(path=self.config.updated_base_model_path, model=self.full_model, background=True, share=share)
+
+    def benchmark_heads(self, latency_runs=20):
+        """
+        Builds every head on the base model and reports its parameter count,
+        saved model size and batch-1 inference latency.
+
+        Returns:
+            dict: Report per head, also saved to head_report_file.
+        """
+        report = {}
+        batch = np.random.rand(1, *self.config.params_image_size).astype(np.float32)
+        for head in HEADS:
+            model = self._prepare_full_model(
+                model=self.model,
+                classes=self.config.params_classes,
+                freeze_all=True,
+                freeze_till=None,
+                learning_rate=self.config.params_learning_rate,
+                head=head,
+                head_units=self.config.params_head_units,
+                head_dropout=self.config.params_head_dropout
+            )
+
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                model_file = os.path.join(tmp_dir, "model.h5")
+                model.save(model_file)
+                size_mb = os.path.getsize(model_file) / 2**20
+
+            model.predict_on_batch(batch)  # warm-up
+            start = time.perf_counter()
+            for _ in range(latency_runs):
+                model.predict_on_batch(batch)
+            latency_ms = 1000 * (time.perf_counter() - start) / latency_runs
+
+            head_params = model.count_params() - self.model.count_params()
+            report[head] = {
+                "total_params": int(model.count_params()),
+                "head_params": int(head_params),
+                "model_size_mb": round(size_mb, 2),
+                "latency_ms_batch_1": round(latency_ms, 3)
+            }
+            logger.info(f"Head {head}: {report[head]}")
+
+        save_json(path=Path(self.config.head_report_file), data=report)
+        return report
+
+    def _benchmark_accuracy(self, model, backbone):
+        """
+        Trains the head of `model` for BACKBONE_BENCHMARK_ACCURACY_EPOCHS epochs on
+        the training subset of the dataset index and evaluates it on the validation subset.
+
+        Returns:
+            float: Validation accuracy.
+        """
+        def dataset(subset, shuffle):
+            files, labels, class_indices = index_image_files(
+                self.config.dataset_index_file, self.config.training_data,
+                subset=subset, validation_split=self.config.params_validation_split
+            )
+            return build_image_dataset(
+                files, labels, len(class_indices),
+                image_size=self.config.params_image_size,
+                batch_size=self.config.params_batch_size,
+                shuffle=shuffle,
+                seed=0,
+                backbone=backbone
+            )
+
+        model.fit(dataset("training", shuffle=True), epochs=self.config.params_backbone_benchmark_accuracy_epochs,
+                  verbose=0)
+        _, accuracy = model.evaluate(dataset("validation", shuffle=False), verbose=0)
+        return float(accuracy)
+
+    def benchmark_backbones(self, latency_runs=10):
+        """
+        Builds every backbone listed in BACKBONE_BENCHMARK with the configured
+        head and reports FLOPs, parameters, CPU latency per batch size and
+        saved model size.
+
+        With BACKBONE_BENCHMARK_ACCURACY_EPOCHS > 0 the backbones get their
+        WEIGHTS (cached under weights_cache_dir), the head is trained for that
+        many epochs on the training subset and the validation accuracy is
+        reported too. Otherwise random weights are used, so no download or
+        data is needed, and the accuracy is None.
+
+        Returns:
+            dict: Report per backbone, also saved to backbone_report_file.
+        """
+        accuracy_epochs = self.config.params_backbone_benchmark_accuracy_epochs
+        report = {}
+        for name in self.config.params_backbone_benchmark:
+            backbone = build_backbone(
+                name=name,
+                input_shape=self.config.params_image_size,
+                weights=self.config.params_weights if accuracy_epochs else None,
+                include_top=False,
+                weights_cache_dir=self.config.weights_cache_dir
+            )
+            model = self._prepare_full_model(
+                model=backbone,
+                classes=self.config.params_classes,
+                freeze_all=True,
+                freeze_till=None,
+                learning_rate=self.config.params_learning_rate,
+                head=self.config.params_head,
+                head_units=self.config.params_head_units,
+                head_dropout=self.config.params_head_dropout
+            )
+
+            latency = {}
+            for batch_size in self.config.params_backbone_benchmark_batch_sizes:
+                batch = np.random.uniform(0, 255, (batch_size, *self.config.params_image_size)).astype(np.float32)
+                model.predict_on_batch(batch)  # warm-up
+                start = time.perf_counter()
+                for _ in range(latency_runs):
+                    model.predict_on_batch(batch)
+                latency[f"batch_{batch_size}_ms"] = round(1000 * (time.perf_counter() - start) / latency_runs, 3)
+
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                model_file = os.path.join(tmp_dir, "model.h5")
+                model.save(model_file)
+                size_mb = os.path.getsize(model_file) / 2**20
+
+            report[name] = {
+                "gflops": round(count_flops(model, self.config.params_image_size) / 1e9, 3),
+                "params": int(model.count_params()),
+                "latency": latency,
+                "model_size_mb": round(size_mb, 2),
+                "val_accuracy": round(self._benchmark_accuracy(model, name), 4) if accuracy_epochs else None
+            }
+            logger.info(f"Backbone {name}: {report[name]}")
+
+        save_json(path=Path(self.config.backbone_report_file), data=report)
+        return report
 
     @staticmethod
-    def save_model(path: Path, model: tf.keras.Model):
+    def save_model(path: Path, model: tf.keras.Model, background: bool = False, share: bool = True):
         """
-        Saves the model to the specified path.
+        Saves the model atomically to the specified path (.h5, .keras or a SavedModel directory).
 
         Args:
             path (Path): Path to save the model.
             model (tf.keras.Model): Model to be saved.
+            background (bool): Write on a background thread (see model_store.save_model).
+            share (bool): Let a later load in this process reuse the in-memory model.
         """
-        model.save(path)
\ No newline at end of file
+        return model_store.save_model(path, model, background=background, share=share)
\ No newline at end of file
@@ -0,0 +1,79 @@
+import numpy as np
+
+# Rules combining the slice softmax outputs of a study into one prediction
+STUDY_AGGREGATIONS = ("max", "mean", "top_k", "attention")
+
+
+class SliceAggregator:
+    def __init__(self, num_classes: int, method: str = "mean", top_k: int = 5, temperature: float = 0.1):
+        """
+        Combines slice softmax outputs into a study-level distribution as they
+        arrive, keeping O(num_classes) state (O(top_k x num_classes) for
+        "top_k"), so the slices of a study never have to be held together.
+
+        Args:
+            num_classes (int): Length of every softmax output.
+            method (str): One of STUDY_AGGREGATIONS:
+                - "max": highest probability of every class over the slices
+                - "mean": average of the slice outputs
+                - "top_k": average of the `top_k` highest probabilities of every class
+                - "attention": slice outputs weighted by softmax(confidence / temperature),
+                  where the confidence of a slice is 1 - its normalized entropy, so
+                  uninformative slices (e.g. above the lungs) count little
+            top_k (int): Slices averaged per class by "top_k".
+            temperature (float): Sharpness of the "attention" weights.
+        """
+        if method not in STUDY_AGGREGATIONS:
+            raise ValueError(f"Unknown study aggregation {method!r}, expected one of {STUDY_AGGREGATIONS}")
+        self.num_classes = num_classes
+        self.method = method
+        self.top_k = top_k
+        self.temperature = temperature
+        self.count = 0
+        self._sum = np.zeros(num_classes)
+        self._max = np.zeros(num_classes)
+        self._top = np.empty((0, num_classes))
+        self._weight = 0.0
+        self._score_max = -np.inf
+
+    def update(self, probabilities):
+        """
+        Adds a batch of slice outputs, shape [slices, num_classes] (or one slice).
+        """
+        probabilities = np.asarray(probabilities, dtype=np.float64).reshape(-1, self.num_classes)
+        if not len(probabilities):
+            return
+        self.count += len(probabilities)
+
+        if self.method == "mean":
+            self._sum += probabilities.sum(axis=0)
+        elif self.method == "max":
+            self._max = np.maximum(self._max, probabilities.max(axis=0))
+        elif self.method == "top_k":
+            self._top = -np.sort(-np.concatenate([self._top, probabilities]), axis=0)[:self.top_k]
+        else:
+            entropy = -(probabilities * np.log(np.clip(probabilities, 1e-12, 1.0))).sum(axis=1)
+            scores = (1 - entropy / np.log(self.num_classes)) / self.temperature
+            # Running softmax: earlier sums are rescaled to the new largest score
+            score_max = max(self._score_max, float(scores.max()))
+            rescale = np.exp(self._score_max - score_max)
+            weights = np.exp(scores - score_max)
+            self._sum = self._sum * rescale + (weights[:, None] * probabilities).sum(axis=0)
+            self._weight = self._weight * rescale + float(weights.sum())
+            self._score_max = score_max
+
+    def result(self):
+        """
+        Study-level class distribution (sums to 1), None before the first slice.
+        """
+        if not self.count:
+            return None
+        if self.method == "mean":
+            combined = self._sum / self.count
+        elif self.method == "max":
+            combined = self._max
+        elif self.method == "top_k":
+            combined = self._top.mean(axis=0)
+        else:
+            combined = self._sum / self._weight
+        return combined / combined.sum()
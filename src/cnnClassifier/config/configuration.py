@@ -1,9 +1,51 @@
 import os
+import threading
 from cnnClassifier.constants import *
 from cnnClassifier.utils.common import read_yaml, create_directories
 from cnnClassifier.entity.config_entity import (DataIngestionConfig,
+                                                DataShardingConfig,
                                                 PrepareBaseModelConfig,
-                                                TrainingConfig)
+                                                TrainingConfig,
+                                                ModelQuantizationConfig,
+                                                PredictionConfig,
+                                                InstrumentationConfig,
+                                                StageRunnerConfig)
+
+
+# Parsed (config, params) per pair of files, with the modification times they were read at
+_SNAPSHOTS = {}
+_SNAPSHOTS_LOCK = threading.Lock()
+# Directories already created by this process
+_CREATED_DIRECTORIES = set()
+
+
+def load_config_snapshot(config_filepath=CONFIG_FILE_PATH, params_filepath=PARAMS_FILE_PATH):
+    """
+    Returns the parsed config and params files, read once per process.
+
+    Every ConfigurationManager of the process (pipeline stages, the serving
+    app) shares the same frozen ConfigBoxes; they are parsed again only when
+    the modification time of one of the files changes.
+
+    Returns:
+        tuple: (config, params) as immutable ConfigBoxes.
+    """
+    key = (os.path.abspath(config_filepath), os.path.abspath(params_filepath))
+    mtimes = (os.stat(config_filepath).st_mtime_ns, os.stat(params_filepath).st_mtime_ns)
+    with _SNAPSHOTS_LOCK:
+        snapshot = _SNAPSHOTS.get(key)
+        if snapshot is None or snapshot[0] != mtimes:
+            snapshot = (mtimes, read_yaml(Path(config_filepath), frozen=True), read_yaml(Path(params_filepath), frozen=True))
+            _SNAPSHOTS[key] = snapshot
+    return snapshot[1], snapshot[2]
+
+
+def _create_directories(paths):
+    # Skips the directories this process already created (and that still exist)
+    missing = [path for path in paths if path not in _CREATED_DIRECTORIES or not os.path.isdir(path)]
+    if missing:
+        create_directories(missing)
+        _CREATED_DIRECTORIES.update(missing)
 
 
 class ConfigurationManager:
@@ -12,31 +54,61 @@ class ConfigurationManager:
         config_filepath=CONFIG_FILE_PATH,
         params_filepath=PARAMS_FILE_PATH):
         
-        # Initialize the ConfigurationManager with file paths for config and parameters
-        # Read the configuration and parameters from the specified file paths
-        self.config = read_yaml(config_filepath)
-        self.params = read_yaml(params_filepath)
+        # Share the process-wide snapshot of the configuration and parameters files
+        self.config, self.params = load_config_snapshot(config_filepath, params_filepath)
         
         # Create the root directory specified in the configuration
-        create_directories([self.config.artifacts_root])
+        _create_directories([self.config.artifacts_root])
     
     def get_data_ingestion_config(self) -> DataIngestionConfig:
         # Extract the data ingestion configuration from the loaded config
         config = self.config.data_ingestion
         
         # Create the directory specified in the data ingestion config
-        create_directories([config.root_dir])
+        _create_directories([config.root_dir])
         
         # Create and return a DataIngestionConfig object using the extracted data
         data_ingestion_config = DataIngestionConfig(
             root_dir=config.root_dir,
             source_URL=config.source_URL,
             local_data_file=config.local_data_file,
-            unzip_dir=config.unzip_dir
+            unzip_dir=config.unzip_dir,
+            manifest_file=config.manifest_file,
+            curated_data_dir=Path(os.path.join(config.unzip_dir, "curated_data/curated_data")),
+            index_file=Path(config.index_file),
+            params_validation_split=self.params.VALIDATION_SPLIT,
+            params_workers=self.params.INGESTION_WORKERS,
+            params_verify_crc=self.params.INGESTION_VERIFY_CRC,
+            params_stream_to_shards=self.params.STREAM_TO_SHARDS
         )
         
         return data_ingestion_config
     
+    def get_data_sharding_config(self) -> DataShardingConfig:
+        """
+        Retrieves the configuration for converting the curated data into tensor shards.
+
+        Returns:
+            DataShardingConfig: An instance of DataShardingConfig populated with data from the configuration and parameters files.
+        """
+        config = self.config.data_sharding
+        source_dir = os.path.join(self.config.data_ingestion.unzip_dir, "curated_data/curated_data")
+
+        _create_directories([config.root_dir, config.shard_dir])
+
+        data_sharding_config = DataShardingConfig(
+            root_dir=Path(config.root_dir),
+            source_dir=Path(source_dir),
+            shard_dir=Path(config.shard_dir),
+            index_file=Path(config.index_file),
+            dataset_index_file=Path(self.config.data_ingestion.index_file),
+            params_validation_split=self.params.VALIDATION_SPLIT,
+            params_image_size=self.params.IMAGE_SIZE,
+            params_shard_size=self.params.SHARD_SIZE
+        )
+
+        return data_sharding_config
+
     def get_prepare_base_model_config(self) -> PrepareBaseModelConfig:
         """
         Retrieves the configuration for preparing the base model.
@@ -48,7 +120,7 @@ class ConfigurationManager:
         config = self.config.prepare_base_model
         
         # Create the directory specified for the base model
-        create_directories([config.root_dir])
+        _create_directories([config.root_dir])
 
         # Instantiate and return the PrepareBaseModelConfig with values from the configuration and parameters
         prepare_base_model_config = PrepareBaseModelConfig(
@@ -59,7 +131,22 @@ class ConfigurationManager:
             params_learning_rate=self.params.LEARNING_RATE,
             params_include_top=self.params.INCLUDE_TOP,
             params_weights=self.params.WEIGHTS,
-            params_classes=self.params.CLASSES
+            params_classes=self.params.CLASSES,
+            head_report_file=Path(config.head_report_file),
+            params_head=self.params.HEAD,
+            params_head_units=self.params.HEAD_UNITS,
+            params_head_dropout=self.params.HEAD_DROPOUT,
+            params_head_benchmark=self.params.HEAD_BENCHMARK,
+            params_backbone=self.params.BACKBONE,
+            weights_cache_dir=Path(config.weights_cache_dir),
+            backbone_report_file=Path(config.backbone_report_file),
+            params_backbone_benchmark=self.params.BACKBONE_BENCHMARK,
+            params_backbone_benchmark_batch_sizes=self.params.BACKBONE_BENCHMARK_BATCH_SIZES,
+            params_backbone_benchmark_accuracy_epochs=self.params.BACKBONE_BENCHMARK_ACCURACY_EPOCHS,
+            training_data=Path(os.path.join(self.config.data_ingestion.unzip_dir, "curated_data/curated_data")),
+            dataset_index_file=Path(self.config.data_ingestion.index_file),
+            params_validation_split=self.params.VALIDATION_SPLIT,
+            params_batch_size=self.params.BATCH_SIZE
         )
 
         return prepare_base_model_config
@@ -67,9 +154,10 @@ class ConfigurationManager:
     def get_training_config(self) -> TrainingConfig:
         training = self.config.training
         prepare_base_model = self.config.prepare_base_model
+        data_sharding = self.config.data_sharding
         params = self.params
         training_data = os.path.join(self.config.data_ingestion.unzip_dir, "curated_data/curated_data")
-        create_directories([
+        _create_directories([
             Path(training.root_dir)
         ])
 
@@ -81,7 +169,136 @@ class ConfigurationManager:
             params_epochs=params.EPOCHS,
             params_batch_size=params.BATCH_SIZE,
             params_is_augmentation=params.AUGMENTATION,
-            params_image_size=params.IMAGE_SIZE
+            params_image_size=params.IMAGE_SIZE,
+            params_input_pipeline=params.INPUT_PIPELINE,
+            params_data_cache=params.DATA_CACHE,
+            data_cache_dir=Path(training.data_cache_dir),
+            shard_dir=Path(data_sharding.shard_dir),
+            shard_index_file=Path(data_sharding.index_file),
+            feature_cache_dir=Path(training.feature_cache_dir),
+            params_training_mode=params.TRAINING_MODE,
+            params_feature_cache_augment_seeds=params.FEATURE_CACHE_AUGMENT_SEEDS,
+            class_indices_file=Path(training.class_indices_file),
+            params_backbone=params.BACKBONE,
+            throughput_report_file=Path(training.throughput_report_file),
+            params_intra_op_threads=params.INTRA_OP_THREADS,
+            params_inter_op_threads=params.INTER_OP_THREADS,
+            params_onednn=params.ONEDNN,
+            params_jit_compile=params.JIT_COMPILE,
+            params_mixed_precision=params.MIXED_PRECISION,
+            checkpoint_dir=Path(training.checkpoint_dir),
+            params_checkpoint_every_steps=params.CHECKPOINT_EVERY_STEPS,
+            params_checkpoints_to_keep=params.CHECKPOINTS_TO_KEEP,
+            params_checkpoint_async=params.CHECKPOINT_ASYNC,
+            params_distribution_strategy=params.DISTRIBUTION_STRATEGY,
+            params_distribution_cpu_devices=params.DISTRIBUTION_CPU_DEVICES,
+            params_scale_learning_rate=params.SCALE_LEARNING_RATE,
+            params_distributed_workers=params.DISTRIBUTED_WORKERS,
+            profile_dir=Path(self.config.instrumentation.profile_dir),
+            params_profile_input_wait=params.PROFILE_INPUT_WAIT,
+            params_profiler_trace_steps=params.PROFILER_TRACE_STEPS,
+            dataset_index_file=Path(self.config.data_ingestion.index_file),
+            params_validation_split=params.VALIDATION_SPLIT,
+            params_sampling=params.SAMPLING
+        )
+
+        return training_config
+
+    def get_model_quantization_config(self) -> ModelQuantizationConfig:
+        model_quantization = self.config.model_quantization
+        training_data = os.path.join(self.config.data_ingestion.unzip_dir, "curated_data/curated_data")
+        _create_directories([
+            Path(model_quantization.root_dir)
+        ])
+
+        model_quantization_config = ModelQuantizationConfig(
+            root_dir=Path(model_quantization.root_dir),
+            trained_model_path=Path(self.config.training.trained_model_path),
+            tflite_model_path=Path(model_quantization.tflite_model_path),
+            report_file=Path(model_quantization.report_file),
+            training_data=Path(training_data),
+            params_image_size=self.params.IMAGE_SIZE,
+            params_quantization=self.params.QUANTIZATION,
+            params_calibration_samples=self.params.QUANTIZATION_CALIBRATION_SAMPLES,
+            params_eval_samples=self.params.QUANTIZATION_EVAL_SAMPLES,
+            params_max_accuracy_drop=self.params.QUANTIZATION_MAX_ACCURACY_DROP,
+            params_backbone=self.params.BACKBONE,
+            dataset_index_file=Path(self.config.data_ingestion.index_file),
+            params_validation_split=self.params.VALIDATION_SPLIT
+        )
+
+        return model_quantization_config
+
+    def get_prediction_config(self) -> PredictionConfig:
+        prediction = self.config.prediction
+        training = self.config.training
+        _create_directories([
+            Path(prediction.root_dir)
+        ])
+
+        if self.params.PREDICTION_MODEL_FORMAT == "tflite":
+            model_path = self.config.model_quantization.tflite_model_path
+        else:
+            model_path = training.trained_model_path
+
+        prediction_config = PredictionConfig(
+            root_dir=Path(prediction.root_dir),
+            trained_model_path=Path(training.trained_model_path),
+            model_path=Path(model_path),
+            class_indices_file=Path(training.class_indices_file),
+            output_file=Path(prediction.output_file),
+            params_image_size=self.params.IMAGE_SIZE,
+            params_batch_size=self.params.PREDICTION_BATCH_SIZE,
+            params_workers=self.params.PREDICTION_WORKERS,
+            params_max_batch_size=self.params.SERVING_MAX_BATCH_SIZE,
+            params_max_wait_ms=self.params.SERVING_MAX_WAIT_MS,
+            params_batch_buckets=self.params.SERVING_BATCH_BUCKETS,
+            params_serving_workers=self.params.SERVING_WORKERS,
+            params_worker_mode=self.params.SERVING_WORKER_MODE,
+            params_intra_op_threads=self.params.SERVING_INTRA_OP_THREADS,
+            cache_file=Path(prediction.cache_file),
+            params_cache_size=self.params.PREDICTION_CACHE_SIZE,
+            params_cache_ttl=self.params.PREDICTION_CACHE_TTL,
+            params_cache_on_disk=self.params.PREDICTION_CACHE_ON_DISK,
+            params_cache_disk_size=self.params.PREDICTION_CACHE_DISK_SIZE,
+            params_backbone=self.params.BACKBONE,
+            params_study_aggregation=self.params.STUDY_AGGREGATION,
+            params_study_top_k=self.params.STUDY_TOP_K,
+            params_study_attention_temperature=self.params.STUDY_ATTENTION_TEMPERATURE,
+            params_study_confidence_threshold=self.params.STUDY_CONFIDENCE_THRESHOLD,
+            params_study_min_slices=self.params.STUDY_MIN_SLICES
+        )
+
+        return prediction_config
+
+    def get_instrumentation_config(self) -> InstrumentationConfig:
+        instrumentation = self.config.instrumentation
+        _create_directories([
+            Path(instrumentation.root_dir),
+            Path(instrumentation.report_dir)
+        ])
+
+        instrumentation_config = InstrumentationConfig(
+            root_dir=Path(instrumentation.root_dir),
+            report_dir=Path(instrumentation.report_dir),
+            profile_dir=Path(instrumentation.profile_dir),
+            params_metrics_port=self.params.METRICS_PORT,
+            params_metrics_host=self.params.METRICS_HOST
+        )
+
+        return instrumentation_config
+
+    def get_stage_runner_config(self) -> StageRunnerConfig:
+        stage_runner = self.config.stage_runner
+        _create_directories([
+            Path(stage_runner.root_dir),
+            Path(stage_runner.manifest_dir)
+        ])
+
+        stage_runner_config = StageRunnerConfig(
+            root_dir=Path(stage_runner.root_dir),
+            state_file=Path(stage_runner.state_file),
+            manifest_dir=Path(stage_runner.manifest_dir)
         )
 
-        return training_config
\ No newline at end of file
+        return stage_runner_config
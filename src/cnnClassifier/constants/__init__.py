@@ -4,4 +4,7 @@ from pathlib import Path
 CONFIG_FILE_PATH = Path("config/config.yaml")
 
 # Define the path to the parameters file
-PARAMS_FILE_PATH = Path("params.yaml")
\ No newline at end of file
+PARAMS_FILE_PATH = Path("params.yaml")
+
+# Image extensions accepted by the loaders (same as ImageDataGenerator.flow_from_directory)
+WHITE_LIST_FORMATS = ("png", "jpg", "jpeg", "bmp", "ppm", "tif", "tiff")
\ No newline at end of file
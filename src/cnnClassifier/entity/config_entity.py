@@ -16,6 +16,53 @@ class DataIngestionConfig:
     # The directory where the data file will be unzipped or extracted
     unzip_dir: Path
 
+    # JSON manifest with the checksum of the last downloaded archive
+    manifest_file: Path
+
+    # Curated image directory (one sub-directory per class)
+    curated_data_dir: Path
+
+    # CSV index with the path, class, size, content hash and fixed subset of every image
+    index_file: Path
+
+    # Fraction of the images assigned to the validation subset
+    params_validation_split: float
+
+    # Number of threads extracting zip members in parallel
+    params_workers: int
+
+    # Whether already extracted files are also checked against the zip CRC (not only their size)
+    params_verify_crc: bool
+
+    # Whether images are decoded straight from the archive into shards instead of being extracted
+    params_stream_to_shards: bool
+
+@dataclass(frozen=True)
+class DataShardingConfig:
+    # Directory where the shards and their index are stored
+    root_dir: Path
+
+    # Curated image directory the shards are built from
+    source_dir: Path
+
+    # Directory holding the uint8 .npy shards
+    shard_dir: Path
+
+    # JSON sidecar with the label, subset, content hash and shard slot of every image
+    index_file: Path
+
+    # Dataset index the images, labels and subsets are taken from
+    dataset_index_file: Path
+
+    # Fraction of the images assigned to the validation subset (when the dataset index is built)
+    params_validation_split: float
+
+    # List defining the size of the stored images (e.g., [224, 224, 3])
+    params_image_size: list
+
+    # Maximum number of images per shard
+    params_shard_size: int
+
 @dataclass(frozen=True)
 class PrepareBaseModelConfig:
     # Directory where the base model and other related files are stored
@@ -42,6 +89,45 @@ class PrepareBaseModelConfig:
     # Number of output classes for the classification task (e.g., 2 for binary classification)
     params_classes: int
 
+    # Path of the JSON report comparing the classification heads
+    head_report_file: Path
+
+    # Classification head put on top of the base model (e.g., 'flatten', 'global_avg_pool')
+    params_head: str
+
+    # Hidden units of the 'pooled_mlp' head
+    params_head_units: int
+
+    # Dropout rate of the 'pooled_mlp' head
+    params_head_dropout: float
+
+    # Whether every head is built and benchmarked when preparing the base model
+    params_head_benchmark: bool
+
+    # Backbone architecture from the registry in components/backbones.py (e.g., 'VGG16')
+    params_backbone: str
+
+    # Directory where pre-trained backbone weights are cached for offline use
+    weights_cache_dir: Path
+
+    # Path of the JSON report comparing the backbones
+    backbone_report_file: Path
+
+    # Backbones built and benchmarked when preparing the base model (empty to skip)
+    params_backbone_benchmark: list
+
+    # Batch sizes the backbone latency is measured at (e.g., [1, 16, 64])
+    params_backbone_benchmark_batch_sizes: list
+
+    # Epochs the head of a benchmarked backbone is trained before its validation accuracy is measured (0 to skip)
+    params_backbone_benchmark_accuracy_epochs: int
+
+    # Curated data, dataset index, split and batch size of the accuracy measurement
+    training_data: Path
+    dataset_index_file: Path
+    params_validation_split: float
+    params_batch_size: int
+
 @dataclass(frozen=True)
 class TrainingConfig:
     root_dir: Path
@@ -51,4 +137,92 @@ class TrainingConfig:
     params_epochs: int
     params_batch_size: int
     params_is_augmentation: bool
-    params_image_size: list
\ No newline at end of file
+    params_image_size: list
+    params_input_pipeline: str
+    params_data_cache: str
+    data_cache_dir: Path
+    shard_dir: Path
+    shard_index_file: Path
+    feature_cache_dir: Path
+    params_training_mode: str
+    params_feature_cache_augment_seeds: int
+    class_indices_file: Path
+    params_backbone: str
+    throughput_report_file: Path
+    params_intra_op_threads: int
+    params_inter_op_threads: int
+    params_onednn: bool
+    params_jit_compile: bool
+    params_mixed_precision: str
+    checkpoint_dir: Path
+    params_checkpoint_every_steps: int
+    params_checkpoints_to_keep: int
+    params_checkpoint_async: bool
+    params_distribution_strategy: str
+    params_distribution_cpu_devices: int
+    params_scale_learning_rate: bool
+    params_distributed_workers: int
+    profile_dir: Path
+    params_profile_input_wait: bool
+    params_profiler_trace_steps: list
+    dataset_index_file: Path
+    params_validation_split: float
+    params_sampling: str
+
+@dataclass(frozen=True)
+class ModelQuantizationConfig:
+    root_dir: Path
+    trained_model_path: Path
+    tflite_model_path: Path
+    report_file: Path
+    training_data: Path
+    params_image_size: list
+    params_quantization: str
+    params_calibration_samples: int
+    params_eval_samples: int
+    params_max_accuracy_drop: float
+    params_backbone: str
+    dataset_index_file: Path
+    params_validation_split: float
+
+@dataclass(frozen=True)
+class PredictionConfig:
+    root_dir: Path
+    trained_model_path: Path
+    model_path: Path
+    class_indices_file: Path
+    output_file: Path
+    params_image_size: list
+    params_batch_size: int
+    params_workers: int
+    params_max_batch_size: int
+    params_max_wait_ms: float
+    params_batch_buckets: list
+    params_serving_workers: int
+    params_worker_mode: str
+    params_intra_op_threads: int
+    cache_file: Path
+    params_cache_size: int
+    params_cache_ttl: float
+    params_cache_on_disk: bool
+    params_cache_disk_size: int
+    params_backbone: str
+    params_study_aggregation: str
+    params_study_top_k: int
+    params_study_attention_temperature: float
+    params_study_confidence_threshold: float
+    params_study_min_slices: int
+
+@dataclass(frozen=True)
+class InstrumentationConfig:
+    root_dir: Path
+    report_dir: Path
+    profile_dir: Path
+    params_metrics_port: int
+    params_metrics_host: str
+
+@dataclass(frozen=True)
+class StageRunnerConfig:
+    root_dir: Path
+    state_file: Path
+    manifest_dir: Path
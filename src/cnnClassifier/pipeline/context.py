@@ -0,0 +1,40 @@
+from pathlib import Path
+from dataclasses import dataclass, field
+from cnnClassifier.config.configuration import ConfigurationManager
+
+
+@dataclass
+class PipelineContext:
+    """
+    State the stages of one in-process run hand to each other, so a stage
+    does not read back what the previous one has just written.
+
+    Every stage still writes its artifacts (models in the background), so a
+    run with a context leaves the same files as the standalone stage scripts,
+    which run without one and read everything from disk.
+
+    Attributes:
+        config (ConfigurationManager): Configuration shared by the stages.
+        dataset_index (list): Dataset index rows built by the data ingestion stage.
+        models (dict): Models built or trained by an earlier stage, by artifact path.
+    """
+    config: ConfigurationManager = field(default_factory=ConfigurationManager)
+    dataset_index: list = None
+    models: dict = field(default_factory=dict)
+
+    def put_model(self, path: Path, model):
+        self.models[str(path)] = model
+
+    def take_model(self, path: Path):
+        """
+        Hands over the model of `path` once (the caller may train it), None when no stage left one.
+
+        Waits for the background save of `path` first: the model must not
+        change while it is being written, and the caller may read the file.
+        """
+        model = self.models.pop(str(path), None)
+        if model is not None:
+            # Imported here so importing the context does not load TensorFlow
+            from cnnClassifier.components.model_store import wait_for_saves
+            wait_for_saves(path)
+        return model
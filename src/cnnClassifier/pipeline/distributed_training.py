@@ -0,0 +1,101 @@
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import subprocess
+from cnnClassifier.config.configuration import ConfigurationManager
+from cnnClassifier import logger
+
+
+STAGE_NAME = "Distributed Training"
+
+
+def free_ports(count):
+    """
+    Reserves `count` free localhost ports (released right before the workers bind them).
+    """
+    sockets = [socket.socket() for _ in range(count)]
+    for s in sockets:
+        s.bind(("localhost", 0))
+    ports = [s.getsockname()[1] for s in sockets]
+    for s in sockets:
+        s.close()
+    return ports
+
+
+def launch_workers(num_workers, module="cnnClassifier.pipeline.stage_03_model_trainer", poll_interval=0.5):
+    """
+    Runs the training stage in `num_workers` local processes forming one
+    MultiWorkerMirroredStrategy cluster (worker 0 is the chief).
+
+    All workers are polled together: as soon as one exits with an error the
+    others are terminated, since they would block forever in their next
+    collective waiting for it.
+
+    Returns:
+        int: 0 when every worker succeeded, otherwise the first failing exit code.
+    """
+    cluster = {"worker": [f"localhost:{port}" for port in free_ports(num_workers)]}
+    workers = []
+    for index in range(num_workers):
+        env = dict(os.environ, TF_CONFIG=json.dumps({"cluster": cluster, "task": {"type": "worker", "index": index}}))
+        workers.append(subprocess.Popen([sys.executable, "-m", module], env=env))
+    logger.info(f"Started {num_workers} workers: {cluster['worker']}")
+
+    try:
+        running = dict(enumerate(workers))
+        while running:
+            for index, worker in list(running.items()):
+                code = worker.poll()
+                if code is None:
+                    continue
+                del running[index]
+                if code != 0:
+                    logger.error(f"Worker {index} exited with {code}, stopping the others")
+                    return code
+            if running:
+                time.sleep(poll_interval)
+        return 0
+    finally:
+        _stop_workers(workers)
+
+
+def _stop_workers(workers, timeout=10):
+    """
+    Terminates the workers still running, killing those that ignore it for `timeout` seconds.
+    """
+    for worker in workers:
+        if worker.poll() is None:
+            worker.terminate()
+    for worker in workers:
+        try:
+            worker.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            worker.kill()
+            worker.wait()
+
+
+def main(argv=None):
+    training_config = ConfigurationManager().get_training_config()
+    parser = argparse.ArgumentParser(description="Train on several local worker processes")
+    parser.add_argument("--num-workers", type=int, default=training_config.params_distributed_workers,
+                        help="Worker processes (defaults to DISTRIBUTED_WORKERS)")
+    args = parser.parse_args(argv)
+
+    if training_config.params_distribution_strategy != "multi_worker_mirrored":
+        raise ValueError("Set DISTRIBUTION_STRATEGY: multi_worker_mirrored in params.yaml to train on several workers")
+    return launch_workers(args.num_workers)
+
+
+if __name__ == '__main__':
+    try:
+        logger.info(f"*******************")
+        logger.info(f">>>>>> stage {STAGE_NAME} started <<<<<<")
+        exit_code = main()
+        logger.info(f">>>>>> stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
+        sys.exit(exit_code)
+    except Exception as e:
+        logger.exception(e)
+        raise e
@@ -0,0 +1,357 @@
+import os
+import csv
+import json
+import time
+import zipfile
+import argparse
+import numpy as np
+from pathlib import Path
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from cnnClassifier import logger
+from cnnClassifier.config.configuration import ConfigurationManager
+from cnnClassifier.entity.config_entity import PredictionConfig
+from cnnClassifier.constants import WHITE_LIST_FORMATS
+from cnnClassifier.components.prediction_cache import PredictionCache
+from cnnClassifier.components.study_aggregation import SliceAggregator, STUDY_AGGREGATIONS
+from cnnClassifier.utils.metrics import IMAGES, INFERENCE_LATENCY, QUEUE_DEPTH, start_metrics_server
+
+
+
+class PredictionPipeline:
+    def __init__(self, config: PredictionConfig = None):
+        """
+        Loads the configured model artifact (Keras or TFLite) once and keeps it
+        in memory for every call. Keras models are traced and warmed up for the
+        SERVING_BATCH_BUCKETS batch sizes, on SERVING_WORKERS workers.
+
+        Args:
+            config (PredictionConfig, optional): Defaults to the one from ConfigurationManager.
+        """
+        # TensorFlow is only loaded once a pipeline is created, not when this module is imported
+        from cnnClassifier.components.model_runner import load_model_runner
+
+        self.config = config or ConfigurationManager().get_prediction_config()
+        self.model = load_model_runner(
+            self.config.model_path,
+            image_size=self.config.params_image_size,
+            batch_buckets=self.config.params_batch_buckets,
+            workers=self.config.params_serving_workers,
+            worker_mode=self.config.params_worker_mode,
+            intra_op_threads=self.config.params_intra_op_threads
+        )
+
+        self.cache = None
+        if self.config.params_cache_size > 0:
+            self.cache = PredictionCache(
+                model_path=self.config.model_path,
+                max_entries=self.config.params_cache_size,
+                ttl_seconds=self.config.params_cache_ttl,
+                disk_path=self.config.cache_file if self.config.params_cache_on_disk else None,
+                max_disk_entries=self.config.params_cache_disk_size
+            )
+
+        num_classes = self.model.num_classes
+        if Path(self.config.class_indices_file).exists():
+            with open(self.config.class_indices_file) as f:
+                class_indices = json.load(f)
+            self.class_names = sorted(class_indices, key=class_indices.get)
+        else:
+            self.class_names = [str(i) for i in range(num_classes)]
+
+    @staticmethod
+    def collect_inputs(inputs):
+        """
+        Expands image files, directories (recursively) and lists of both into image paths.
+        """
+        if isinstance(inputs, (str, Path)):
+            inputs = [inputs]
+
+        paths = []
+        extensions = tuple("." + ext for ext in WHITE_LIST_FORMATS)
+        for item in inputs:
+            if os.path.isdir(item):
+                for root, _, fnames in sorted(os.walk(item), key=lambda x: x[0]):
+                    paths.extend(os.path.join(root, f) for f in sorted(fnames) if f.lower().endswith(extensions))
+            else:
+                paths.append(str(item))
+        return paths
+
+    def _decode(self, source):
+        """
+        Reads a path or encoded image bytes and either returns its cached
+        probabilities or decodes it into a uint8 array at IMAGE_SIZE.
+
+        Returns:
+            tuple: (encoded bytes, image or None, cached probabilities or None)
+        """
+        if isinstance(source, bytes):
+            blob = source
+        else:
+            with open(source, "rb") as f:
+                blob = f.read()
+        if self.cache is not None:
+            cached = self.cache.get(blob)
+            if cached is not None:
+                return blob, None, cached
+        from cnnClassifier.components.input_pipeline import decode_and_resize
+
+        return blob, decode_and_resize(blob, self.config.params_image_size).numpy(), None
+
+    def _decoded(self, items, workers):
+        """
+        Yields (name, decoded, error) in input order while a pool of threads decodes ahead.
+
+        At most a few batches are decoded ahead of the model, so memory stays
+        bounded however many images are scored.
+        """
+        window = max(self.config.params_batch_size * 2, workers)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for name, source in items:
+                pending.append((name, executor.submit(self._decode, source)))
+                QUEUE_DEPTH.set(len(pending), queue="decode")
+                if len(pending) >= window:
+                    yield self._result(*pending.popleft())
+            while pending:
+                yield self._result(*pending.popleft())
+                QUEUE_DEPTH.set(len(pending), queue="decode")
+
+    @staticmethod
+    def _result(name, future):
+        try:
+            return name, future.result(), None
+        except Exception as e:
+            return name, None, e
+
+    def predict_batch(self, images):
+        """
+        Runs one batch of uint8 images through the model and returns the softmax outputs.
+        """
+        from cnnClassifier.components.input_pipeline import normalize_batch
+
+        batch = normalize_batch(np.stack(images), self.config.params_backbone)
+        start = time.perf_counter()
+        probabilities = self.model.predict(batch)
+        INFERENCE_LATENCY.observe(time.perf_counter() - start, batch_size=len(images))
+        IMAGES.inc(len(images), phase="predict")
+        return probabilities
+
+    def _format(self, name, probabilities):
+        best = int(np.argmax(probabilities))
+        return {
+            "source": name,
+            "prediction": self.class_names[best],
+            "confidence": float(probabilities[best]),
+            "probabilities": {c: float(p) for c, p in zip(self.class_names, probabilities)}
+        }
+
+    def iter_predict(self, sources, names=None, batch_size=None, workers=None):
+        """
+        Scores images in batches and yields one result dict per image, in input order.
+
+        Args:
+            sources (iterable): Image paths or encoded image bytes.
+            names (iterable, optional): Names reported for each source. Defaults to the paths.
+            batch_size (int, optional): Images per forward pass. Defaults to PREDICTION_BATCH_SIZE.
+            workers (int, optional): Decode threads. Defaults to PREDICTION_WORKERS.
+        """
+        batch_size = batch_size or self.config.params_batch_size
+        workers = workers or self.config.params_workers
+        if names is None:
+            items = ((f"<bytes {i}>" if isinstance(s, bytes) else str(s), s) for i, s in enumerate(sources))
+        else:
+            items = zip(names, sources)
+
+        # Results behind a pending miss wait for its batch; a batch is also scored early once
+        # that many results wait, so a stream of mostly cache hits keeps its memory bounded
+        max_waiting = 4 * batch_size
+        batch, batch_names, blobs, waiting = [], [], [], []
+        for name, decoded, error in self._decoded(items, workers):
+            if error is not None:
+                logger.error(f"Failed to decode {name}: {error}")
+                result = {"source": name, "error": str(error)}
+            else:
+                blob, image, cached = decoded
+                result = self._format(name, cached) if cached is not None else None
+                if result is None:
+                    batch.append(image)
+                    batch_names.append(name)
+                    blobs.append(blob)
+
+            if result is not None and not batch:
+                # No earlier image is still waiting for the model
+                yield result
+                continue
+            waiting.append(result)
+
+            if len(batch) == batch_size or len(waiting) >= max_waiting:
+                yield from self._flush(batch, batch_names, blobs, waiting)
+                batch, batch_names, blobs, waiting = [], [], [], []
+
+        yield from self._flush(batch, batch_names, blobs, waiting)
+
+    def _flush(self, batch, batch_names, blobs, waiting):
+        probabilities = self.predict_batch(batch) if batch else []
+        if self.cache is not None:
+            for blob, p in zip(blobs, probabilities):
+                self.cache.put(blob, [float(v) for v in p])
+
+        probabilities, names = iter(probabilities), iter(batch_names)
+        for result in waiting:
+            yield result if result is not None else self._format(next(names), next(probabilities))
+
+    def predict(self, inputs, batch_size=None, workers=None):
+        """
+        Scores a single image, a list of images or whole directories.
+
+        Returns:
+            list: One result dict per image.
+        """
+        return list(self.iter_predict(self.collect_inputs(inputs), batch_size=batch_size, workers=workers))
+
+    def predict_bytes(self, blobs, batch_size=None):
+        """
+        Scores encoded images held in memory.
+        """
+        return list(self.iter_predict(blobs, batch_size=batch_size))
+
+    @staticmethod
+    def iter_study_slices(study):
+        """
+        Yields (name, path or encoded bytes) for the slices of a study, in name order.
+
+        A study is a directory of slice images or a zip archive of them; zip
+        members are read one at a time as the generator is consumed.
+        """
+        if os.path.isfile(study) and zipfile.is_zipfile(study):
+            extensions = tuple("." + ext for ext in WHITE_LIST_FORMATS)
+            with zipfile.ZipFile(study) as zip_ref:
+                members = [m for m in zip_ref.infolist() if not m.is_dir() and m.filename.lower().endswith(extensions)]
+                for member in sorted(members, key=lambda m: m.filename):
+                    yield member.filename, zip_ref.read(member)
+        else:
+            for path in PredictionPipeline.collect_inputs(study):
+                yield path, path
+
+    def predict_study(self, study, aggregation=None, confidence_threshold=None, min_slices=None,
+                      batch_size=None, workers=None):
+        """
+        Scores a whole study and combines its slice outputs into one prediction.
+
+        Slices stream from the directory or zip through iter_predict, so memory
+        is bounded by the batch size and decode window whatever the number of
+        slices. Scoring stops early once `min_slices` slices are scored and the
+        study confidence reaches `confidence_threshold`.
+
+        Args:
+            study (str): Directory or zip file of slices.
+            aggregation (str, optional): One of STUDY_AGGREGATIONS. Defaults to STUDY_AGGREGATION.
+            confidence_threshold (float, optional): Defaults to STUDY_CONFIDENCE_THRESHOLD (None never stops early).
+            min_slices (int, optional): Defaults to STUDY_MIN_SLICES.
+            batch_size (int, optional): Slices per forward pass. Defaults to PREDICTION_BATCH_SIZE.
+            workers (int, optional): Decode threads. Defaults to PREDICTION_WORKERS.
+
+        Returns:
+            dict: The study result, like a slice result plus the aggregation, the
+            number of scored and failed slices and whether it stopped early.
+        """
+        if confidence_threshold is None:
+            confidence_threshold = self.config.params_study_confidence_threshold
+        min_slices = self.config.params_study_min_slices if min_slices is None else min_slices
+        aggregator = SliceAggregator(
+            len(self.class_names),
+            method=aggregation or self.config.params_study_aggregation,
+            top_k=self.config.params_study_top_k,
+            temperature=self.config.params_study_attention_temperature
+        )
+
+        errors, early_exit = 0, False
+        slices = self.iter_study_slices(study)
+        results = self.iter_predict((source for _, source in slices), batch_size=batch_size, workers=workers)
+        try:
+            for result in results:
+                if "error" in result:
+                    errors += 1
+                    continue
+                aggregator.update([result["probabilities"][c] for c in self.class_names])
+                if confidence_threshold is not None and aggregator.count >= min_slices \
+                        and aggregator.result().max() >= confidence_threshold:
+                    early_exit = True
+                    break
+        finally:
+            # Stops the decode threads and closes the zip file
+            results.close()
+            slices.close()
+
+        probabilities = aggregator.result()
+        if probabilities is None:
+            return {"source": str(study), "error": "no slice could be scored", "slice_errors": errors}
+        return {
+            **self._format(str(study), probabilities),
+            "aggregation": aggregator.method,
+            "slices": aggregator.count,
+            "slice_errors": errors,
+            "early_exit": early_exit
+        }
+
+    @staticmethod
+    def write_results(results, path):
+        """
+        Writes results as JSON lines (.jsonl) or CSV (any other suffix).
+        """
+        path = Path(path)
+        os.makedirs(path.parent, exist_ok=True)
+        if path.suffix == ".jsonl":
+            with open(path, "w") as f:
+                for result in results:
+                    f.write(json.dumps(result) + "\n")
+        else:
+            class_names = sorted({c for r in results for c in r.get("probabilities", {})})
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["source", "prediction", "confidence", *class_names, "error"])
+                for r in results:
+                    probabilities = r.get("probabilities", {})
+                    writer.writerow([r["source"], r.get("prediction", ""), r.get("confidence", ""),
+                                     *[probabilities.get(c, "") for c in class_names], r.get("error", "")])
+        logger.info(f"Wrote {len(results)} predictions to {path}")
+
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score CT slices with the trained model")
+    parser.add_argument("inputs", nargs="+", help="Image files or directories (studies with --study)")
+    parser.add_argument("--output", help="CSV or .jsonl output file (defaults to prediction.output_file)")
+    parser.add_argument("--batch-size", type=int, help="Images per forward pass")
+    parser.add_argument("--workers", type=int, help="Decode threads")
+    parser.add_argument("--study", action="store_true",
+                        help="Treat every input (directory or zip of slices) as one study and predict per study")
+    parser.add_argument("--aggregation", choices=STUDY_AGGREGATIONS, help="Study aggregation (defaults to STUDY_AGGREGATION)")
+    parser.add_argument("--confidence-threshold", type=float,
+                        help="Stop scoring a study at this confidence (defaults to STUDY_CONFIDENCE_THRESHOLD)")
+    parser.add_argument("--min-slices", type=int, help="Slices scored before a study can stop early (defaults to STUDY_MIN_SLICES)")
+    args = parser.parse_args(argv)
+
+    instrumentation_config = ConfigurationManager().get_instrumentation_config()
+    if instrumentation_config.params_metrics_port:
+        start_metrics_server(instrumentation_config.params_metrics_port, instrumentation_config.params_metrics_host)
+
+    pipeline = PredictionPipeline()
+    if args.study:
+        results = [
+            pipeline.predict_study(study, aggregation=args.aggregation, confidence_threshold=args.confidence_threshold,
+                                   min_slices=args.min_slices, batch_size=args.batch_size, workers=args.workers)
+            for study in args.inputs
+        ]
+    else:
+        results = pipeline.predict(args.inputs, batch_size=args.batch_size, workers=args.workers)
+    pipeline.write_results(results, args.output or pipeline.config.output_file)
+    if pipeline.cache is not None:
+        logger.info(f"Prediction cache: {pipeline.cache.stats()}")
+    if hasattr(pipeline.model, "latency"):
+        logger.info(f"Inference latency: {pipeline.model.latency.report()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,6 @@
 # Import necessary modules from the project and standard libraries
 from cnnClassifier.config.configuration import ConfigurationManager
-from cnnClassifier.components.data_ingestion import DataIngestion
+from cnnClassifier.utils.instrumentation import span, write_run_report
 from cnnClassifier import logger
 
 # Define a constant for the stage name
@@ -11,18 +11,24 @@ class DataIngestionTrainingPipeline:
     Class to handle the data ingestion pipeline for training.
     """
 
-    def __init__(self):
+    def __init__(self, context=None):
         """
         Initialize the DataIngestionTrainingPipeline class.
+
+        Args:
+            context (PipelineContext, optional): State shared with the next stages of an in-process run.
         """
-        pass
+        self.context = context
 
     def main(self):
         """
         Main method to execute the data ingestion pipeline.
         """
-        # Create an instance of ConfigurationManager to access configuration settings
-        config = ConfigurationManager()
+        # Components are imported here so importing the stage module stays fast
+        from cnnClassifier.components.data_ingestion import DataIngestion
+
+        # Use the configuration of the run, or create an instance of ConfigurationManager
+        config = self.context.config if self.context else ConfigurationManager()
         
         # Retrieve data ingestion configuration
         data_ingestion_config = config.get_data_ingestion_config()
@@ -31,10 +37,26 @@ class DataIngestionTrainingPipeline:
         data_ingestion = DataIngestion(config=data_ingestion_config)
         
         # Download the dataset from the specified source
-        data_ingestion.download_file()
+        with span("download"):
+            data_ingestion.download_file()
         
-        # Extract the downloaded dataset from the zip file
-        data_ingestion.extract_zip_file()
+        if data_ingestion_config.params_stream_to_shards:
+            # Decode the dataset straight from the zip file into tensor shards (loads TensorFlow)
+            from cnnClassifier.components.data_sharding import DataSharding
+            with span("stream to shards"):
+                rows = data_ingestion.stream_to_shards(DataSharding(config=config.get_data_sharding_config()))
+        else:
+            # Extract the downloaded dataset from the zip file
+            with span("extract"):
+                data_ingestion.extract_zip_file()
+
+            # Record path, class, size, content hash and fixed subset of every image
+            with span("index"):
+                rows = data_ingestion.build_index()
+
+        # Later stages of the run take the index from memory instead of the CSV
+        if self.context:
+            self.context.dataset_index = rows
 
 # Check if the script is being executed directly
 if __name__ == '__main__':
@@ -46,7 +68,11 @@ if __name__ == '__main__':
         obj = DataIngestionTrainingPipeline()
         
         # Run the main method of the DataIngestionTrainingPipeline class
-        obj.main()
+        with span(STAGE_NAME):
+            obj.main()
+        
+        # Write the timing spans and peak memory of this run
+        write_run_report(ConfigurationManager().get_instrumentation_config().report_dir, "data_ingestion")
         
         # Log the completion of the data ingestion stage
         logger.info(f">>>>>> stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
@@ -0,0 +1,47 @@
+from cnnClassifier.config.configuration import ConfigurationManager
+from cnnClassifier.utils.instrumentation import span, write_run_report
+from cnnClassifier import logger
+
+
+
+STAGE_NAME = "Data Sharding stage"
+
+
+class DataShardingTrainingPipeline:
+    def __init__(self, context=None):
+        # PipelineContext shared with the other stages of an in-process run
+        self.context = context
+
+    def main(self):
+        # Imported here so importing the stage module does not load TensorFlow
+        from cnnClassifier.components.data_sharding import DataSharding
+
+        config = self.context.config if self.context else ConfigurationManager()
+        if config.params.INPUT_PIPELINE != "shards":
+            logger.info(f"INPUT_PIPELINE is {config.params.INPUT_PIPELINE}, no shards needed")
+            return
+        if config.params.STREAM_TO_SHARDS:
+            logger.info("STREAM_TO_SHARDS is set, the shards were written by the data ingestion stage")
+            return
+        data_sharding_config = config.get_data_sharding_config()
+        data_sharding = DataSharding(
+            config=data_sharding_config,
+            dataset_index=self.context.dataset_index if self.context else None
+        )
+        with span("build shards"):
+            data_sharding.build()
+
+
+
+if __name__ == '__main__':
+    try:
+        logger.info(f"*******************")
+        logger.info(f">>>>>> stage {STAGE_NAME} started <<<<<<")
+        obj = DataShardingTrainingPipeline()
+        with span(STAGE_NAME):
+            obj.main()
+        write_run_report(ConfigurationManager().get_instrumentation_config().report_dir, "data_sharding")
+        logger.info(f">>>>>> stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
+    except Exception as e:
+        logger.exception(e)
+        raise e
@@ -1,5 +1,5 @@
 from cnnClassifier.config.configuration import ConfigurationManager
-from cnnClassifier.components.prepare_base_model import PrepareBaseModel
+from cnnClassifier.utils.instrumentation import span, write_run_report
 from cnnClassifier import logger
 
 
@@ -8,15 +8,36 @@ STAGE_NAME = "Prepare base model"
 
 
 class PrepareBaseModelTrainingPipeline:
-    def __init__(self):
-        pass
+    def __init__(self, context=None):
+        # PipelineContext shared with the other stages of an in-process run
+        self.context = context
 
     def main(self):
-        config = ConfigurationManager()
+        # Imported here so importing the stage module does not load TensorFlow
+        from cnnClassifier.components.prepare_base_model import PrepareBaseModel
+        from cnnClassifier.components.model_store import wait_for_saves
+
+        config = self.context.config if self.context else ConfigurationManager()
         prepare_base_model_config = config.get_prepare_base_model_config()
         prepare_base_model = PrepareBaseModel(config=prepare_base_model_config)
-        prepare_base_model.get_base_model()
-        prepare_base_model.update_base_model()
+        with span("build backbone"):
+            prepare_base_model.get_base_model()
+        with span("update base model"):
+            # With a context the model is handed to training directly, the file is written in the background
+            prepare_base_model.update_base_model(share=not self.context)
+        if self.context:
+            self.context.put_model(prepare_base_model_config.updated_base_model_path, prepare_base_model.full_model)
+        if prepare_base_model_config.params_head_benchmark:
+            with span("benchmark heads"):
+                prepare_base_model.benchmark_heads()
+        if prepare_base_model_config.params_backbone_benchmark:
+            with span("benchmark backbones"):
+                prepare_base_model.benchmark_backbones()
+        # Run alone, the stage outputs are complete once the background model saves are done;
+        # in a pipeline run the next stages start meanwhile and the runner waits at the end
+        if not self.context:
+            with span("wait for model saves"):
+                wait_for_saves()
 
 
 
@@ -25,7 +46,9 @@ if __name__ == '__main__':
         logger.info(f"*******************")
         logger.info(f">>>>>> stage {STAGE_NAME} started <<<<<<")
         obj = PrepareBaseModelTrainingPipeline()
-        obj.main()
+        with span(STAGE_NAME):
+            obj.main()
+        write_run_report(ConfigurationManager().get_instrumentation_config().report_dir, "prepare_base_model")
         logger.info(f">>>>>> stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
     except Exception as e:
         logger.exception(e)
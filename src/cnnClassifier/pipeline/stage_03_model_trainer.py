@@ -1,5 +1,6 @@
 from cnnClassifier.config.configuration import ConfigurationManager
-from cnnClassifier.components.model_trainer import Training
+from cnnClassifier.utils.instrumentation import span, write_run_report
+from cnnClassifier.components.performance import configure_onednn
 from cnnClassifier import logger
 
 
@@ -9,16 +10,47 @@ STAGE_NAME = "Training"
 
 
 class ModelTrainingPipeline:
-    def __init__(self):
-        pass
+    def __init__(self, context=None):
+        # PipelineContext shared with the other stages of an in-process run
+        self.context = context
 
     def main(self):
-        config = ConfigurationManager()
+        config = self.context.config if self.context else ConfigurationManager()
         training_config = config.get_training_config()
-        training = Training(config=training_config)
-        training.get_base_model()
-        training.train_valid_generator()
-        training.train()
+        # oneDNN can only be switched before TensorFlow is loaded by the trainer import
+        configure_onednn(training_config.params_onednn)
+
+        from cnnClassifier.components.model_trainer import Training
+        from cnnClassifier.components.model_store import wait_for_saves
+        from cnnClassifier.utils.metrics import start_metrics_server
+
+        instrumentation_config = config.get_instrumentation_config()
+        if instrumentation_config.params_metrics_port:
+            start_metrics_server(instrumentation_config.params_metrics_port, instrumentation_config.params_metrics_host)
+
+        training = Training(
+            config=training_config,
+            dataset_index=self.context.dataset_index if self.context else None
+        )
+        with span("configure runtime"):
+            training.configure_runtime()
+        with span("load model"):
+            training.get_base_model(
+                model=self.context.take_model(training_config.updated_base_model_path) if self.context else None
+            )
+        with span("restore checkpoint"):
+            training.restore_checkpoint()
+        with span("build input pipeline"):
+            training.train_valid_generator()
+        with span("train"):
+            training.train()
+        if self.context and training.trained_model is not None:
+            self.context.put_model(training_config.trained_model_path, training.trained_model)
+        # Run alone, the stage outputs are complete once the background model saves are done;
+        # in a pipeline run the next stages start meanwhile and the runner waits at the end
+        if not self.context:
+            with span("wait for model saves"):
+                wait_for_saves()
 
 
 
@@ -27,9 +59,10 @@ if __name__ == '__main__':
         logger.info(f"*******************")
         logger.info(f">>>>>> stage {STAGE_NAME} started <<<<<<")
         obj = ModelTrainingPipeline()
-        obj.main()
+        with span(STAGE_NAME):
+            obj.main()
+        write_run_report(ConfigurationManager().get_instrumentation_config().report_dir, "training")
         logger.info(f">>>>>> stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
     except Exception as e:
         logger.exception(e)
         raise e
-        
\ No newline at end of file
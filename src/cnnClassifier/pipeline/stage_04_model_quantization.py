@@ -0,0 +1,46 @@
+from cnnClassifier.config.configuration import ConfigurationManager
+from cnnClassifier.utils.instrumentation import span, write_run_report
+from cnnClassifier import logger
+
+
+
+STAGE_NAME = "Model quantization"
+
+
+
+class ModelQuantizationPipeline:
+    def __init__(self, context=None):
+        # PipelineContext shared with the other stages of an in-process run
+        self.context = context
+
+    def main(self):
+        # Imported here so importing the stage module does not load TensorFlow
+        from cnnClassifier.components.model_quantization import ModelQuantization
+
+        config = self.context.config if self.context else ConfigurationManager()
+        model_quantization_config = config.get_model_quantization_config()
+        if model_quantization_config.params_quantization is None:
+            logger.info("QUANTIZATION is not set, skipping the TFLite export")
+            return
+        model_quantization = ModelQuantization(
+            config=model_quantization_config,
+            model=self.context.take_model(model_quantization_config.trained_model_path) if self.context else None,
+            dataset_index=self.context.dataset_index if self.context else None
+        )
+        with span("quantize"):
+            model_quantization.quantize()
+
+
+
+if __name__ == '__main__':
+    try:
+        logger.info(f"*******************")
+        logger.info(f">>>>>> stage {STAGE_NAME} started <<<<<<")
+        obj = ModelQuantizationPipeline()
+        with span(STAGE_NAME):
+            obj.main()
+        write_run_report(ConfigurationManager().get_instrumentation_config().report_dir, "model_quantization")
+        logger.info(f">>>>>> stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
+    except Exception as e:
+        logger.exception(e)
+        raise e
@@ -0,0 +1,295 @@
+import sys
+import json
+import time
+import hashlib
+import argparse
+import importlib
+import subprocess
+from pathlib import Path
+from dataclasses import dataclass, field
+from cnnClassifier.config.configuration import ConfigurationManager
+from cnnClassifier.pipeline.context import PipelineContext
+from cnnClassifier.utils.common import save_json
+from cnnClassifier.utils.instrumentation import span, write_run_report
+from cnnClassifier import logger
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    # "module:Class" of the stage pipeline, imported only when the stage runs
+    pipeline: str
+    # config.yaml sections and params.yaml keys the stage reads
+    config_keys: list
+    params_keys: list
+    # Dotted config.yaml keys of the artifacts the stage reads and writes
+    deps: list = field(default_factory=list)
+    outs: list = field(default_factory=list)
+    # Source files (relative to the cnnClassifier package) whose changes invalidate the stage
+    code: list = field(default_factory=list)
+
+
+STAGES = [
+    Stage(
+        name="Data Ingestion stage",
+        pipeline="cnnClassifier.pipeline.stage_01_data_ingestion:DataIngestionTrainingPipeline",
+        config_keys=["data_ingestion", "data_sharding"],
+        params_keys=["INGESTION_WORKERS", "INGESTION_VERIFY_CRC", "STREAM_TO_SHARDS", "SHARD_SIZE", "IMAGE_SIZE",
+                     "VALIDATION_SPLIT"],
+        outs=["data_ingestion.unzip_dir"],
+        code=["pipeline/stage_01_data_ingestion.py", "components/data_ingestion.py", "components/dataset_index.py"]
+    ),
+    Stage(
+        name="Data Sharding stage",
+        pipeline="cnnClassifier.pipeline.stage_01b_data_sharding:DataShardingTrainingPipeline",
+        config_keys=["data_sharding"],
+        params_keys=["INPUT_PIPELINE", "STREAM_TO_SHARDS", "SHARD_SIZE", "IMAGE_SIZE", "VALIDATION_SPLIT"],
+        deps=["data_ingestion.unzip_dir"],
+        outs=["data_sharding.shard_dir", "data_sharding.index_file"],
+        code=["pipeline/stage_01b_data_sharding.py", "components/data_sharding.py"]
+    ),
+    Stage(
+        name="Prepare base model",
+        pipeline="cnnClassifier.pipeline.stage_02_prepare_base_model:PrepareBaseModelTrainingPipeline",
+        config_keys=["prepare_base_model"],
+        params_keys=["IMAGE_SIZE", "BACKBONE", "INCLUDE_TOP", "WEIGHTS", "CLASSES", "LEARNING_RATE",
+                     "HEAD", "HEAD_UNITS", "HEAD_DROPOUT", "HEAD_BENCHMARK",
+                     "BACKBONE_BENCHMARK", "BACKBONE_BENCHMARK_BATCH_SIZES", "BACKBONE_BENCHMARK_ACCURACY_EPOCHS"],
+        outs=["prepare_base_model.base_model_path", "prepare_base_model.updated_base_model_path"],
+        code=["pipeline/stage_02_prepare_base_model.py", "components/prepare_base_model.py", "components/backbones.py",
+              "components/model_store.py"]
+    ),
+    Stage(
+        name="Training",
+        pipeline="cnnClassifier.pipeline.stage_03_model_trainer:ModelTrainingPipeline",
+        config_keys=["training"],
+        params_keys=["AUGMENTATION", "IMAGE_SIZE", "BACKBONE", "BATCH_SIZE", "EPOCHS", "INPUT_PIPELINE",
+                     "DATA_CACHE", "TRAINING_MODE", "FEATURE_CACHE_AUGMENT_SEEDS", "JIT_COMPILE",
+                     "MIXED_PRECISION", "DISTRIBUTION_STRATEGY", "DISTRIBUTION_CPU_DEVICES", "SCALE_LEARNING_RATE",
+                     "VALIDATION_SPLIT", "SAMPLING"],
+        deps=["data_ingestion.unzip_dir", "data_sharding.index_file", "prepare_base_model.updated_base_model_path"],
+        outs=["training.trained_model_path", "training.class_indices_file"],
+        code=["pipeline/stage_03_model_trainer.py", "components/model_trainer.py", "components/input_pipeline.py",
+              "components/feature_cache.py", "components/performance.py", "components/callbacks.py",
+              "components/distribution.py", "components/dataset_index.py", "components/augmentation.py",
+              "components/model_store.py", "components/data_sharding.py", "components/backbones.py"]
+    ),
+    Stage(
+        name="Model quantization",
+        pipeline="cnnClassifier.pipeline.stage_04_model_quantization:ModelQuantizationPipeline",
+        config_keys=["model_quantization"],
+        params_keys=["QUANTIZATION", "QUANTIZATION_CALIBRATION_SAMPLES", "QUANTIZATION_EVAL_SAMPLES",
+                     "QUANTIZATION_MAX_ACCURACY_DROP", "IMAGE_SIZE", "BACKBONE", "VALIDATION_SPLIT"],
+        deps=["data_ingestion.unzip_dir", "training.trained_model_path"],
+        outs=["model_quantization.tflite_model_path", "model_quantization.report_file"],
+        code=["pipeline/stage_04_model_quantization.py", "components/model_quantization.py",
+              "components/model_runner.py", "components/model_store.py"]
+    ),
+]
+
+PACKAGE_DIR = Path(__file__).resolve().parents[1]
+
+
+class FileHasher:
+    def __init__(self, known: dict = None):
+        """
+        Content hashes of files and directories, memoized by (size, mtime).
+
+        `known` maps a file path to [size, mtime_ns, sha256] from a previous
+        run, so unchanged artifacts are only stat'ed, never re-read.
+        """
+        self.known = dict(known or {})
+
+    def file(self, path: Path) -> str:
+        stat = path.stat()
+        entry = self.known.get(str(path))
+        if entry is not None and entry[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return entry[2]
+
+        sha256 = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                sha256.update(chunk)
+        self.known[str(path)] = [stat.st_size, stat.st_mtime_ns, sha256.hexdigest()]
+        return sha256.hexdigest()
+
+    def path(self, path: Path):
+        """
+        Hash of a file or a directory tree, None when it does not exist.
+        """
+        path = Path(path)
+        if path.is_file():
+            return self.file(path)
+        if not path.is_dir():
+            return None
+        sha256 = hashlib.sha256()
+        for file in sorted(p for p in path.rglob("*") if p.is_file()):
+            sha256.update(file.relative_to(path).as_posix().encode())
+            sha256.update(self.file(file).encode())
+        return sha256.hexdigest()
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class StageRunner:
+    def __init__(self, stages=STAGES):
+        """
+        Runs the pipeline stages, skipping the ones whose outputs are up to date.
+
+        A stage's fingerprint covers the config.yaml sections and params.yaml
+        keys it reads, the hashes of its upstream artifacts and its source
+        code. The state file keeps the fingerprint and output hashes of the
+        last successful run of every stage, and every run writes a manifest.
+        """
+        self.stages = stages
+        self.config_manager = ConfigurationManager()
+        self.config = self.config_manager.get_stage_runner_config()
+
+        self.state = {"stages": {}, "files": {}}
+        if self.config.state_file.exists():
+            self.state = json.loads(self.config.state_file.read_text())
+        self.hasher = FileHasher(self.state["files"])
+
+    def _lookup(self, dotted_key):
+        value = self.config_manager.config
+        for key in dotted_key.split("."):
+            value = value[key]
+        return value
+
+    def fingerprint(self, stage: Stage) -> str:
+        inputs = {
+            "config": {key: self.config_manager.config.get(key) for key in stage.config_keys},
+            "params": {key: self.config_manager.params.get(key) for key in stage.params_keys},
+            "deps": {dep: self.hasher.path(self._lookup(dep)) for dep in stage.deps},
+            "code": {file: self.hasher.path(PACKAGE_DIR / file) for file in stage.code}
+        }
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _outputs(self, stage: Stage) -> dict:
+        return {out: self.hasher.path(self._lookup(out)) for out in stage.outs}
+
+    def is_up_to_date(self, stage: Stage, fingerprint: str) -> bool:
+        """
+        True when the stage last ran with this fingerprint and its outputs are unchanged since.
+        """
+        previous = self.state["stages"].get(stage.name)
+        if previous is None or previous["fingerprint"] != fingerprint:
+            return False
+        return self._outputs(stage) == previous["outputs"]
+
+    def _being_saved(self, stage: Stage) -> bool:
+        """
+        True while a model among the stage's deps or outputs is still being written in the background.
+        """
+        # Only the stages that use TensorFlow load the model store, no save can be pending without it
+        model_store = sys.modules.get("cnnClassifier.components.model_store")
+        return model_store is not None and any(
+            model_store.is_saving(self._lookup(key)) for key in stage.deps + stage.outs
+        )
+
+    def _finish_saves(self):
+        model_store = sys.modules.get("cnnClassifier.components.model_store")
+        if model_store is not None:
+            with span("wait for model saves"):
+                model_store.wait_for_saves()
+
+    def _record(self, stages):
+        """
+        Waits for the background model saves, then records the fingerprints and outputs of `stages`.
+        """
+        self._finish_saves()
+        for stage in stages:
+            self.state["stages"][stage.name] = {"fingerprint": self.fingerprint(stage), "outputs": self._outputs(stage)}
+        self._save_state()
+
+    def _save_state(self):
+        self.state["files"] = self.hasher.known
+        save_json(path=self.config.state_file, data=self.state)
+
+    def run(self, force=False, only=None):
+        """
+        Runs the stages in order.
+
+        Args:
+            force (bool): Run every selected stage even when it is up to date.
+            only (list, optional): Names of the stages to consider, all when None.
+
+        Returns:
+            dict: The run manifest.
+        """
+        run_id = time.strftime("%Y%m%d-%H%M%S")
+        manifest = {"run_id": run_id, "git_commit": git_commit(), "python": sys.version.split()[0], "stages": []}
+        # The stages pass the dataset index and models on in memory
+        context = PipelineContext(config=self.config_manager)
+
+        # Stages that ran while models they read or wrote were still being saved:
+        # their fingerprints and output hashes are recorded once the saves are done
+        unrecorded = []
+        try:
+            for stage in self.stages:
+                if only and stage.name not in only:
+                    continue
+                start = time.perf_counter()
+                # A dep still being written comes from a stage that just ran, so this one is out of date too
+                deps_pending = self._being_saved(stage)
+                fingerprint = None if deps_pending else self.fingerprint(stage)
+
+                if not force and not deps_pending and self.is_up_to_date(stage, fingerprint):
+                    status = "skipped"
+                    logger.info(f">>>>>> stage {stage.name} is up to date, skipped <<<<<<")
+                else:
+                    status = "ran"
+                    logger.info(f"*******************")
+                    logger.info(f">>>>>> stage {stage.name} started <<<<<<")
+                    module, cls = stage.pipeline.split(":")
+                    with span(stage.name):
+                        getattr(importlib.import_module(module), cls)(context=context).main()
+                    logger.info(f">>>>>> stage {stage.name} completed <<<<<<\n\nx==========x")
+                    if deps_pending or self._being_saved(stage):
+                        unrecorded.append(stage)
+                    else:
+                        self.state["stages"][stage.name] = {
+                            "fingerprint": fingerprint, "outputs": self._outputs(stage)
+                        }
+                        self._save_state()
+
+                manifest["stages"].append({
+                    "name": stage.name,
+                    "status": status,
+                    "seconds": round(time.perf_counter() - start, 3)
+                })
+        except Exception:
+            # Keep the stages that completed before the failure
+            self._record(unrecorded)
+            raise
+
+        # Writing the models to disk overlapped the later stages, the run is complete once they are saved
+        self._record(unrecorded)
+        for entry in manifest["stages"]:
+            entry.update(self.state["stages"][entry["name"]])
+        save_json(path=Path(self.config.manifest_dir) / f"run_{run_id}.json", data=manifest)
+        write_run_report(self.config_manager.get_instrumentation_config().report_dir, "pipeline")
+        return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the pipeline stages that are out of date")
+    parser.add_argument("--force", action="store_true", help="Run every stage even when it is up to date")
+    parser.add_argument("--stages", nargs="+", help="Names of the stages to consider (all by default)")
+    args = parser.parse_args(argv)
+    StageRunner().run(force=args.force, only=args.stages)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except Exception as e:
+        logger.exception(e)
+        raise e
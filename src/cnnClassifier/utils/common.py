@@ -1,22 +1,36 @@
 import os  # Import the os module for interacting with the operating system
-from box.exceptions import BoxValueError  # Import BoxValueError exception from the box library
 import yaml  # Import the yaml module for working with YAML files
 from cnnClassifier import logger  # Import the logger from the cnnClassifier module
 import json  # Import the json module for working with JSON data
-import joblib  # Import the joblib module for serialization
-from ensure import ensure_annotations  # Import the ensure_annotations decorator for type checking
-from box import ConfigBox  # Import ConfigBox from the box library for better dictionary handling
 from pathlib import Path  # Import Path from the pathlib module for path manipulations
-from typing import Any  # Import Any type for type annotations
+from typing import Any, get_type_hints  # Import Any type for type annotations and the hint resolver
 import base64  # Import base64 module for encoding and decoding
 
-@ensure_annotations
-def read_yaml(path_to_yaml: Path) -> ConfigBox:
+# Check the helpers' type annotations on every call only in debug mode (CNNCLASSIFIER_DEBUG=1):
+# the reflective checks of ensure_annotations are too slow for the serving paths
+DEBUG = os.environ.get("CNNCLASSIFIER_DEBUG", "0").lower() not in ("", "0", "false")
+
+def debug_annotations(func):
+    """
+    Applies ensure_annotations to `func` in debug mode, returns it unchanged otherwise.
+    """
+    if not DEBUG:
+        return func
+    from box import ConfigBox
+    from ensure import ensure_annotations
+
+    # box is imported on first use, so the helpers name ConfigBox in string annotations
+    func.__annotations__ = get_type_hints(func, localns={"ConfigBox": ConfigBox})
+    return ensure_annotations(func)
+
+@debug_annotations
+def read_yaml(path_to_yaml: Path, frozen: bool = False) -> "ConfigBox":
     """
     Reads a YAML file and returns its content as a ConfigBox.
 
     Args:
         path_to_yaml (Path): Path to the YAML file.
+        frozen (bool, optional): Return an immutable ConfigBox (lists become tuples). Defaults to False.
 
     Raises:
         ValueError: If the YAML file is empty.
@@ -25,17 +39,21 @@ def read_yaml(path_to_yaml: Path) -> ConfigBox:
     Returns:
         ConfigBox: Content of the YAML file as a ConfigBox.
     """
+    # Imported on first use, box is slow to load and the CLI does not always read a YAML file
+    from box import ConfigBox
+    from box.exceptions import BoxValueError
+
     try:
         with open(path_to_yaml) as yaml_file:
             content = yaml.safe_load(yaml_file)
             logger.info(f"YAML file: {path_to_yaml} loaded successfully")
-            return ConfigBox(content)
+            return ConfigBox(content, frozen_box=frozen)
     except BoxValueError:
         raise ValueError("YAML file is empty")
     except Exception as e:
         raise e
 
-@ensure_annotations
+@debug_annotations
 def create_directories(path_to_directories: list, verbose=True):
     """
     Create a list of directories.
@@ -49,7 +67,7 @@ def create_directories(path_to_directories: list, verbose=True):
         if verbose:
             logger.info(f"Created directory at: {path}")
 
-@ensure_annotations
+@debug_annotations
 def save_json(path: Path, data: dict):
     """
     Save data to a JSON file.
@@ -62,8 +80,8 @@ def save_json(path: Path, data: dict):
         json.dump(data, f, indent=4)
     logger.info(f"JSON file saved at: {path}")
 
-@ensure_annotations
-def load_json(path: Path) -> ConfigBox:
+@debug_annotations
+def load_json(path: Path) -> "ConfigBox":
     """
     Load data from a JSON file.
 
@@ -73,12 +91,14 @@ def load_json(path: Path) -> ConfigBox:
     Returns:
         ConfigBox: Data loaded from the JSON file as a ConfigBox.
     """
+    from box import ConfigBox  # Imported on first use, it is slow to load
+
     with open(path) as f:
         content = json.load(f)
     logger.info(f"JSON file loaded successfully from: {path}")
     return ConfigBox(content)
 
-@ensure_annotations
+@debug_annotations
 def save_bin(data: Any, path: Path):
     """
     Save data to a binary file.
@@ -87,10 +107,12 @@ def save_bin(data: Any, path: Path):
         data (Any): Data to be saved as binary.
         path (Path): Path to the binary file.
     """
+    import joblib  # Imported on first use, it is slow to load
+
     joblib.dump(value=data, filename=path)
     logger.info(f"Binary file saved at: {path}")
 
-@ensure_annotations
+@debug_annotations
 def load_bin(path: Path) -> Any:
     """
     Load data from a binary file.
@@ -101,22 +123,28 @@ def load_bin(path: Path) -> Any:
     Returns:
         Any: Object stored in the file.
     """
+    import joblib  # Imported on first use, it is slow to load
+
     data = joblib.load(path)
     logger.info(f"Binary file loaded from: {path}")
     return data
 
-@ensure_annotations
+@debug_annotations
 def get_size(path: Path) -> str:
     """
-    Get the size of a file in KB.
+    Get the size of a file, or of all files in a directory (e.g. a SavedModel), in KB.
 
     Args:
-        path (Path): Path of the file.
+        path (Path): Path of the file or directory.
 
     Returns:
         str: Size in KB.
     """
-    size_in_kb = round(os.path.getsize(path) / 1024)
+    if os.path.isdir(path):
+        size = sum(file.stat().st_size for file in Path(path).rglob("*") if file.is_file())
+    else:
+        size = os.path.getsize(path)
+    size_in_kb = round(size / 1024)
     return f"~ {size_in_kb} KB"
 
 def decodeImage(imgstring: str, fileName: str):
@@ -127,10 +155,22 @@ def decodeImage(imgstring: str, fileName: str):
         imgstring (str): Base64-encoded image string.
         fileName (str): Name of the file to save the decoded image.
     """
-    imgdata = base64.b64decode(imgstring)
+    imgdata = decodeImageBytes(imgstring)
     with open(fileName, 'wb') as f:
         f.write(imgdata)
 
+def decodeImageBytes(imgstring: str) -> bytes:
+    """
+    Decode a base64-encoded image in memory, without writing it to disk.
+
+    Args:
+        imgstring (str): Base64-encoded image string.
+
+    Returns:
+        bytes: Encoded image bytes (PNG, JPEG, ...).
+    """
+    return base64.b64decode(imgstring)
+
 def encodeImageIntoBase64(croppedImagePath: str) -> str:
     """
     Encode an image file into a base64 string.
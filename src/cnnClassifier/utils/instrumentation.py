@@ -0,0 +1,125 @@
+import os
+import sys
+import time
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from cnnClassifier import logger
+from cnnClassifier.utils.common import save_json
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    """
+    Peak resident memory of the process so far, in MB (None where it is not available).
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return round(peak / 2**20 if sys.platform == "darwin" else peak / 2**10, 1)
+
+
+def current_rss_mb():
+    """
+    Current resident memory of the process in MB (Linux only, None elsewhere).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / 2**20, 1)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class RunRecorder:
+    def __init__(self):
+        """
+        Collects timing spans and named sections of one process run.
+
+        Spans nest per thread: a span opened inside another one is recorded
+        as "outer/inner".
+        """
+        self.started = time.strftime("%Y-%m-%d %H:%M:%S")
+        self.spans = []
+        self.sections = {}
+        self._t0 = time.perf_counter()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def record(self, name, start, seconds, **attrs):
+        """
+        Adds a span measured elsewhere (e.g. by a Keras callback) under the current span.
+        """
+        span = {
+            "name": "/".join(self._stack() + [name]),
+            "start": round(start - self._t0, 4),
+            "seconds": round(seconds, 4),
+            "rss_mb": current_rss_mb(),
+            "peak_rss_mb": peak_rss_mb(),
+            **attrs
+        }
+        with self._lock:
+            self.spans.append(span)
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """
+        Times the enclosed block.
+        """
+        stack = self._stack()
+        start = time.perf_counter()
+        stack.append(name)
+        try:
+            yield
+        finally:
+            stack.pop()
+            self.record(name, start, time.perf_counter() - start, **attrs)
+
+    def add_section(self, name, data):
+        with self._lock:
+            self.sections[name] = data
+
+    def report(self) -> dict:
+        with self._lock:
+            return {
+                "started": self.started,
+                "seconds": round(time.perf_counter() - self._t0, 4),
+                "peak_rss_mb": peak_rss_mb(),
+                "spans": list(self.spans),
+                **self.sections
+            }
+
+
+_RECORDER = RunRecorder()
+
+
+def get_recorder() -> RunRecorder:
+    return _RECORDER
+
+
+def span(name, **attrs):
+    """
+    Times a block in the process-wide recorder: `with span("download"): ...`
+    """
+    return _RECORDER.span(name, **attrs)
+
+
+def write_run_report(report_dir: Path, name: str) -> Path:
+    """
+    Writes the process-wide recorder to `report_dir/<name>_<timestamp>.json`.
+    """
+    path = Path(report_dir) / f"{name}_{time.strftime('%Y%m%d-%H%M%S')}.json"
+    report = _RECORDER.report()
+    save_json(path=path, data=report)
+    logger.info(f"Run report: {report['seconds']}s, peak RSS {report['peak_rss_mb']} MB")
+    return path
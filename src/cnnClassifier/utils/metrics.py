@@ -0,0 +1,213 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from cnnClassifier import logger
+from cnnClassifier.utils.instrumentation import current_rss_mb
+
+# Prometheus text exposition format, so any Prometheus server can scrape /metrics
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+STEP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+EPOCH_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Registry:
+    def __init__(self):
+        """
+        Metrics rendered together on /metrics.
+        """
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self.metrics[metric.name] = metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes the labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key, extra=()):
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{self._labels(key)} {_format_value(value)}" for key, value in sorted(values.items())]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function, **labels):
+        """
+        Reads the value from `function()` at every scrape (e.g. a queue size).
+        """
+        self.set(function, **labels)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        lines = []
+        for key, value in sorted(values.items()):
+            if callable(value):
+                try:
+                    value = value()
+                except Exception as e:
+                    logger.warning(f"Could not read {self.name}: {e}")
+                    continue
+            if value is not None:
+                lines.append(f"{self.name}{self._labels(key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=STEP_BUCKETS, registry=REGISTRY):
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    def samples(self):
+        with self._lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+        lines = []
+        for key, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{self._labels(key, [('le', _format_value(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{self._labels(key)} {cumulative}")
+        return lines
+
+
+# Metrics of the training and prediction paths
+IMAGES = Counter("cnnclassifier_images_total", "Images processed by the model", ["phase"])
+INPUT_WAIT = Histogram("cnnclassifier_input_wait_seconds", "Time a training step waited for its batch")
+TRAIN_STEP = Histogram("cnnclassifier_train_step_seconds", "Duration of a training step")
+EPOCH_DURATION = Histogram("cnnclassifier_epoch_duration_seconds", "Duration of a training epoch",
+                           buckets=EPOCH_BUCKETS)
+INFERENCE_LATENCY = Histogram("cnnclassifier_inference_latency_seconds", "Model latency of a prediction batch",
+                              ["batch_size"], buckets=LATENCY_BUCKETS)
+QUEUE_DEPTH = Gauge("cnnclassifier_queue_depth", "Items waiting in a queue", ["queue"])
+CACHE_LOOKUPS = Counter("cnnclassifier_prediction_cache_lookups_total", "Prediction cache lookups", ["result"])
+CACHE_HIT_RATE = Gauge("cnnclassifier_prediction_cache_hit_rate", "Prediction cache hits per lookup since the start")
+RESIDENT_MEMORY = Gauge("cnnclassifier_process_resident_memory_bytes", "Resident memory of the process")
+
+
+def _hit_rate():
+    hits, misses = CACHE_LOOKUPS.value(result="hit"), CACHE_LOOKUPS.value(result="miss")
+    return hits / (hits + misses) if hits + misses else None
+
+
+def _resident_memory():
+    rss_mb = current_rss_mb()
+    return rss_mb * 2**20 if rss_mb is not None else None
+
+
+CACHE_HIT_RATE.set_function(_hit_rate)
+RESIDENT_MEMORY.set_function(_resident_memory)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Every scrape would otherwise be written to the log
+        pass
+
+
+_SERVER = None
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1"):
+    """
+    Serves the metrics on http://host:port/metrics from a daemon thread
+    (once per process; later calls return the running server).
+    """
+    global _SERVER
+    if _SERVER is None:
+        _SERVER = ThreadingHTTPServer((host, port), _MetricsHandler)
+        _SERVER.daemon_threads = True
+        threading.Thread(target=_SERVER.serve_forever, name="metrics-server", daemon=True).start()
+        logger.info(f"Serving metrics on http://{host}:{_SERVER.server_port}/metrics")
+    return _SERVER
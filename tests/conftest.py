@@ -0,0 +1,82 @@
+"""
+Shared fixtures: a temporary project directory holding copies of
+config/config.yaml and params.yaml, and tiny images to index and train on.
+"""
+import os
+import sys
+import zlib
+import struct
+import shutil
+from pathlib import Path
+import yaml
+import pytest
+
+REPO_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_DIR / "src"))
+
+
+def write_png(path, seed, size=8):
+    """
+    Writes a size x size RGB PNG whose pixels depend on `seed`, so every seed
+    gives a different content hash.
+    """
+    rows = b"".join(
+        b"\x00" + bytes((seed * 37 + x * 11 + y * 5 + channel * 3) % 256
+                        for x in range(size) for channel in range(3))
+        for y in range(size)
+    )
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0))
+                     + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b""))
+    return path
+
+
+def write_images(source_dir, counts, start=0):
+    """
+    Writes `counts[class_name]` PNG images per class under source_dir/<class_name>.
+
+    Returns:
+        list: The written paths.
+    """
+    paths = []
+    seed = start
+    for class_name, count in counts.items():
+        for _ in range(count):
+            paths.append(write_png(Path(source_dir) / class_name / f"image_{seed}.png", seed))
+            seed += 1
+    return paths
+
+
+@pytest.fixture
+def project_dir(tmp_path, monkeypatch):
+    """
+    Runs the test in a temporary directory with copies of the config and params
+    files, so the artifacts paths of config.yaml point under tmp_path.
+    """
+    (tmp_path / "config").mkdir()
+    shutil.copy(REPO_DIR / "config" / "config.yaml", tmp_path / "config" / "config.yaml")
+    shutil.copy(REPO_DIR / "params.yaml", tmp_path / "params.yaml")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def set_params(project_dir):
+    """
+    Returns a function overriding keys of the temporary params.yaml.
+    """
+    def set_params(**overrides):
+        params_file = project_dir / "params.yaml"
+        params = yaml.safe_load(params_file.read_text())
+        params.update(overrides)
+        params_file.write_text(yaml.safe_dump(params))
+        # The config snapshot is keyed by modification time, make every write visible
+        stat = os.stat(params_file)
+        os.utime(params_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    return set_params
@@ -0,0 +1,66 @@
+import numpy as np
+import tensorflow as tf
+from cnnClassifier.components.augmentation import random_affine_transforms, augment_batch
+
+# Non-square, so a mix-up of the x (width) and y (height) axes cannot cancel out
+HEIGHT, WIDTH = 8, 16
+SEED = tf.constant([3, 7], tf.int64)
+
+
+def point_image(row, column):
+    image = np.zeros((1, HEIGHT, WIDTH, 1), np.float32)
+    image[0, row, column, 0] = 1.0
+    return tf.constant(image)
+
+
+def center_of_mass(image):
+    image = np.asarray(image)[0, :, :, 0]
+    rows, columns = np.indices(image.shape)
+    return (rows * image).sum() / image.sum(), (columns * image).sum() / image.sum()
+
+
+def transform(**ranges):
+    return random_affine_transforms(SEED, 4, HEIGHT, WIDTH, **ranges).numpy()
+
+
+def test_width_shift_moves_images_horizontally():
+    transforms = transform(width_shift_range=0.2)
+    tx = transforms[:, 2]
+    np.testing.assert_allclose(transforms[:, [0, 1, 3, 4, 5]], [[1, 0, 0, 1, 0]] * 4, atol=1e-6)
+    assert np.abs(tx).max() <= 0.2 * WIDTH
+
+    # The transform maps output to input pixels: the content moves by -tx along the columns only
+    shifted = augment_batch(point_image(3, 8), SEED, width_shift_range=0.2)
+    affine_seed = tf.random.experimental.stateless_split(SEED, num=2)[0]
+    tx = random_affine_transforms(affine_seed, 1, HEIGHT, WIDTH, width_shift_range=0.2).numpy()[0, 2]
+    row, column = center_of_mass(shifted)
+    assert abs(tx) > 0.5
+    np.testing.assert_allclose([row, column], [3, 8 - tx], atol=1e-4)
+
+
+def test_height_shift_moves_images_vertically():
+    transforms = transform(height_shift_range=0.2)
+    np.testing.assert_allclose(transforms[:, [0, 1, 2, 3, 4]], [[1, 0, 0, 0, 1]] * 4, atol=1e-6)
+    assert np.abs(transforms[:, 5]).max() <= 0.2 * HEIGHT
+
+    shifted = augment_batch(point_image(4, 5), SEED, height_shift_range=0.2)
+    affine_seed = tf.random.experimental.stateless_split(SEED, num=2)[0]
+    ty = random_affine_transforms(affine_seed, 1, HEIGHT, WIDTH, height_shift_range=0.2).numpy()[0, 5]
+    np.testing.assert_allclose(center_of_mass(shifted), [4 - ty, 5], atol=1e-4)
+
+
+def test_rotation_and_zoom_keep_the_image_center():
+    center = np.array([WIDTH / 2 - 0.5, HEIGHT / 2 - 0.5, 1.0])
+    for ranges in (dict(rotation_range=40), dict(zoom_range=0.2), dict(shear_range=0.2)):
+        for row in transform(**ranges):
+            matrix = np.append(row[:6], [0, 0, 1]).reshape(3, 3)
+            np.testing.assert_allclose(matrix @ center, center, atol=1e-4)
+
+
+def test_horizontal_flip_reverses_the_columns():
+    image = point_image(2, 1)
+    flipped = np.asarray(augment_batch(tf.repeat(image, 16, axis=0), SEED, horizontal_flip=True))
+    original, mirrored = np.asarray(image)[0], np.asarray(image)[0, :, ::-1]
+    is_flipped = [np.array_equal(result, mirrored) for result in flipped]
+    assert all(is_flipped[i] or np.array_equal(result, original) for i, result in enumerate(flipped))
+    assert 0 < sum(is_flipped) < 16
@@ -0,0 +1,58 @@
+import os
+import sys
+import shutil
+import subprocess
+import pytest
+from box.exceptions import BoxError
+from conftest import REPO_DIR
+from cnnClassifier.config.configuration import ConfigurationManager
+from cnnClassifier.utils.common import read_yaml
+
+
+def test_managers_share_one_frozen_snapshot(project_dir):
+    first, second = ConfigurationManager(), ConfigurationManager()
+    assert first.config is second.config and first.params is second.params
+    with pytest.raises(BoxError):
+        first.params.EPOCHS = 100
+
+
+def test_snapshot_is_read_again_when_a_file_changes(project_dir, set_params):
+    before = ConfigurationManager().params
+    set_params(EPOCHS=7)
+    after = ConfigurationManager().params
+    assert after is not before and after.EPOCHS == 7
+    assert ConfigurationManager().params is after
+
+
+def test_removed_directories_are_created_again(project_dir):
+    config = ConfigurationManager().get_data_ingestion_config()
+    shutil.rmtree(config.root_dir)
+    assert ConfigurationManager().get_data_ingestion_config().root_dir == config.root_dir
+    assert os.path.isdir(config.root_dir)
+
+
+# read_yaml is annotated with a Path argument
+DEBUG_PROBE = """
+from cnnClassifier.utils.common import read_yaml
+try:
+    read_yaml("params.yaml")
+    print("unchecked")
+except Exception as e:
+    print(type(e).__name__)
+"""
+
+
+@pytest.mark.parametrize("debug, expected", [("1", "EnsureError"), ("0", "unchecked")])
+def test_annotations_are_only_checked_in_debug_mode(tmp_path, debug, expected):
+    shutil.copy(REPO_DIR / "params.yaml", tmp_path / "params.yaml")
+    env = dict(os.environ, CNNCLASSIFIER_DEBUG=debug, PYTHONPATH=str(REPO_DIR / "src"))
+    output = subprocess.run([sys.executable, "-c", DEBUG_PROBE], cwd=tmp_path, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    assert output.strip().splitlines()[-1] == expected
+
+
+def test_read_yaml_rejects_an_empty_file(tmp_path):
+    empty = tmp_path / "empty.yaml"
+    empty.write_text("")
+    with pytest.raises(ValueError, match="empty"):
+        read_yaml(empty)
@@ -0,0 +1,54 @@
+import dataclasses
+import shutil
+import zipfile
+from pathlib import Path
+import pytest
+from cnnClassifier.config.configuration import ConfigurationManager
+from cnnClassifier.components.data_ingestion import DataIngestion
+
+
+def nested_zip(path, directories=20, files=5):
+    """
+    Archive with many small files spread over fresh nested directories, and no directory entries.
+    """
+    members = {}
+    with zipfile.ZipFile(path, "w") as zip_ref:
+        for d in range(directories):
+            for f in range(files):
+                name = f"curated_data/curated_data/class{d % 3}/part{d}/deep/{f}.bin"
+                members[name] = bytes([d, f]) * 64
+                zip_ref.writestr(name, members[name])
+    return members
+
+
+@pytest.fixture
+def ingestion(project_dir, set_params):
+    set_params(INGESTION_WORKERS=8)
+    config = ConfigurationManager().get_data_ingestion_config()
+    archive = project_dir / "source.zip"
+    members = nested_zip(archive)
+    config = dataclasses.replace(config, source_URL=f"file://{archive}")
+    return DataIngestion(config), members
+
+
+@pytest.mark.parametrize("attempt", range(5))
+def test_parallel_extraction_into_fresh_directories(ingestion, attempt):
+    data_ingestion, members = ingestion
+    data_ingestion.download_file()
+    data_ingestion.extract_zip_file()
+
+    unzip_dir = Path(data_ingestion.config.unzip_dir)
+    for name, content in members.items():
+        assert (unzip_dir / name).read_bytes() == content
+
+
+def test_extracted_files_are_skipped_and_missing_ones_restored(ingestion):
+    data_ingestion, members = ingestion
+    data_ingestion.download_file()
+    data_ingestion.extract_zip_file()
+
+    unzip_dir = Path(data_ingestion.config.unzip_dir)
+    removed = next(iter(members))
+    shutil.rmtree((unzip_dir / removed).parent.parent)
+    data_ingestion.extract_zip_file()
+    assert (unzip_dir / removed).read_bytes() == members[removed]
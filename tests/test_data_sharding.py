@@ -0,0 +1,115 @@
+import json
+import numpy as np
+import pytest
+from conftest import write_images, write_png
+from cnnClassifier.config.configuration import ConfigurationManager
+from cnnClassifier.components.data_sharding import DataSharding
+from cnnClassifier.components.dataset_index import build_dataset_index
+from cnnClassifier.components.input_pipeline import decode_and_resize
+
+
+@pytest.fixture
+def config(project_dir, set_params):
+    set_params(IMAGE_SIZE=[8, 8, 3], SHARD_SIZE=4)
+    return ConfigurationManager().get_data_sharding_config()
+
+
+def build(config):
+    # The data ingestion stage rescans the curated data before the shards are built
+    build_dataset_index(config.source_dir, config.dataset_index_file, config.params_validation_split)
+    return DataSharding(config).build()
+
+
+def load_index(config):
+    return json.loads(config.index_file.read_text())
+
+
+def records_by_shard(index):
+    shards = {}
+    for record in index["records"]:
+        shards.setdefault(record["shard"], []).append(record["path"])
+    return shards
+
+
+def assert_rows_match_files(config):
+    for record in load_index(config)["records"]:
+        shard = np.load(config.shard_dir / record["shard"])
+        expected = decode_and_resize((config.source_dir / record["path"]).read_bytes(), [8, 8, 3]).numpy()
+        np.testing.assert_array_equal(shard[record["offset"]], expected)
+
+
+def shard_files(config):
+    return sorted(path.name for path in config.shard_dir.glob("*.npy"))
+
+
+def test_first_build_encodes_every_image(config):
+    write_images(config.source_dir, {"a": 4, "b": 4})
+    assert build(config) == dict(reused=0, encoded=8, removed=0)
+    assert shard_files(config) == ["shard_00000.npy", "shard_00001.npy"]
+    assert load_index(config)["class_indices"] == {"a": 0, "b": 1}
+    assert_rows_match_files(config)
+
+    # Nothing changed: every row stays in its slot
+    assert build(config) == dict(reused=8, encoded=0, removed=0)
+    assert shard_files(config) == ["shard_00000.npy", "shard_00001.npy"]
+
+
+def test_added_and_changed_files_are_the_only_ones_encoded(config):
+    paths = write_images(config.source_dir, {"a": 4, "b": 4})
+    build(config)
+    before = records_by_shard(load_index(config))
+
+    write_images(config.source_dir, {"b": 1}, start=100)
+    assert build(config) == dict(reused=8, encoded=1, removed=0)
+    after = records_by_shard(load_index(config))
+    assert {shard: after[shard] for shard in before} == before
+    assert shard_files(config) == ["shard_00000.npy", "shard_00001.npy", "shard_00002.npy"]
+
+    write_png(paths[0], seed=500)
+    assert build(config) == dict(reused=8, encoded=1, removed=0)
+    assert_rows_match_files(config)
+
+
+def test_removed_file_keeps_a_mostly_alive_shard(config):
+    paths = write_images(config.source_dir, {"a": 4, "b": 4})
+    build(config)
+    shard, members = next(iter(records_by_shard(load_index(config)).items()))
+
+    (config.source_dir / members[0]).unlink()
+    assert build(config) == dict(reused=7, encoded=0, removed=1)
+    # 3 of 4 rows alive: the shard is kept as it is, with its dead row
+    index = load_index(config)
+    assert records_by_shard(index)[shard] == members[1:]
+    assert {s["file"]: s["count"] for s in index["shards"]}[shard] == 4
+    assert_rows_match_files(config)
+
+
+def test_shard_below_half_alive_is_repacked(config):
+    write_images(config.source_dir, {"a": 4, "b": 4})
+    build(config)
+    shard, members = next(iter(records_by_shard(load_index(config)).items()))
+
+    # Exactly half alive is still kept
+    (config.source_dir / members[0]).unlink()
+    (config.source_dir / members[1]).unlink()
+    assert build(config) == dict(reused=6, encoded=0, removed=2)
+    assert shard in shard_files(config)
+
+    (config.source_dir / members[2]).unlink()
+    assert build(config) == dict(reused=5, encoded=0, removed=1)
+    index = load_index(config)
+    assert shard not in shard_files(config)
+    assert shard not in records_by_shard(index)
+    # The survivor was copied into a new shard without decoding
+    survivor = next(record for record in index["records"] if record["path"] == members[3])
+    assert survivor["shard"] == "shard_00002.npy"
+    assert_rows_match_files(config)
+
+
+def test_new_image_size_rebuilds_every_shard(config, set_params):
+    write_images(config.source_dir, {"a": 4, "b": 4})
+    build(config)
+    set_params(IMAGE_SIZE=[4, 4, 3])
+    config = ConfigurationManager().get_data_sharding_config()
+    assert build(config) == dict(reused=0, encoded=8, removed=0)
+    assert np.load(config.shard_dir / shard_files(config)[0]).shape == (4, 4, 4, 3)
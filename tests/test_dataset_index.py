@@ -0,0 +1,96 @@
+import os
+from conftest import write_images, write_png
+from cnnClassifier.components import dataset_index
+from cnnClassifier.components.dataset_index import (build_dataset_index, load_dataset_index, index_image_files,
+                                                    oversample, resplit, split_for)
+
+
+def subsets(rows):
+    return {row["path"]: row["subset"] for row in rows}
+
+
+def test_split_depends_only_on_the_hash():
+    sha256 = "%08x" % int(0.1 * 2**32) + "0" * 56
+    assert split_for(sha256, 0.2) == "validation"
+    assert split_for(sha256, 0.05) == "training"
+    assert split_for("f" * 64, 0.99) == "training"
+    assert split_for("0" * 64, 0.01) == "validation"
+
+
+def test_adding_files_keeps_existing_assignments(tmp_path):
+    source_dir, index_file = tmp_path / "data", tmp_path / "index.csv"
+    write_images(source_dir, {"a": 20, "b": 20})
+    before = subsets(build_dataset_index(source_dir, index_file, validation_split=0.3))
+    assert set(before.values()) == {"training", "validation"}
+
+    write_images(source_dir, {"a": 5, "c": 5}, start=100)
+    after = subsets(build_dataset_index(source_dir, index_file, validation_split=0.3))
+    assert len(after) == 50
+    assert {path: after[path] for path in before} == before
+
+
+def test_unchanged_files_are_not_hashed_again(tmp_path, monkeypatch):
+    source_dir, index_file = tmp_path / "data", tmp_path / "index.csv"
+    paths = write_images(source_dir, {"a": 3, "b": 3})
+    first = {row["path"]: row["sha256"] for row in build_dataset_index(source_dir, index_file)}
+
+    hashed = []
+    real_sha256 = dataset_index._sha256
+    monkeypatch.setattr(dataset_index, "_sha256", lambda read: hashed.append(read) or real_sha256(read))
+
+    assert {row["path"]: row["sha256"] for row in build_dataset_index(source_dir, index_file)} == first
+    assert hashed == []
+
+    # A rewritten file has a new size or mtime, so only it is hashed again, and its new content counts
+    changed = paths[0]
+    write_png(changed, seed=999)
+    stat = os.stat(changed)
+    os.utime(changed, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    rows = {row["path"]: row["sha256"] for row in build_dataset_index(source_dir, index_file)}
+    assert len(hashed) == 1
+    changed_path = changed.relative_to(source_dir).as_posix()
+    assert rows[changed_path] != first[changed_path]
+    assert {path: sha for path, sha in rows.items() if path != changed_path} == \
+        {path: sha for path, sha in first.items() if path != changed_path}
+
+
+def test_resplit_moves_rows_only_when_the_split_changes(tmp_path):
+    source_dir, index_file = tmp_path / "data", tmp_path / "index.csv"
+    write_images(source_dir, {"a": 20, "b": 20})
+    rows = build_dataset_index(source_dir, index_file, validation_split=0.2)
+
+    assert resplit(rows, 0.2) is rows
+
+    moved = resplit(rows, 0.5)
+    assert all(row["validation_split"] == 0.5 for row in moved)
+    assert subsets(moved) == {row["path"]: split_for(row["sha256"], 0.5) for row in rows}
+    # A larger split only moves training rows to validation
+    assert all(subsets(moved)[path] == "validation" for path, subset in subsets(rows).items() if subset == "validation")
+    assert sum(subset == "validation" for subset in subsets(moved).values()) > \
+        sum(subset == "validation" for subset in subsets(rows).values())
+
+
+def test_index_image_files_rewrites_an_index_of_another_split(tmp_path):
+    source_dir, index_file = tmp_path / "data", tmp_path / "index.csv"
+    write_images(source_dir, {"a": 20, "b": 20})
+    build_dataset_index(source_dir, index_file, validation_split=0.2)
+
+    files, labels, class_indices = index_image_files(index_file, source_dir, subset="validation",
+                                                     validation_split=0.5)
+    assert class_indices == {"a": 0, "b": 1}
+    rows = load_dataset_index(index_file)
+    assert all(row["validation_split"] == 0.5 for row in rows)
+    assert len(files) == len(labels) == sum(row["subset"] == "validation" for row in rows)
+
+
+def test_oversample_balances_the_classes():
+    files = [f"a{i}" for i in range(5)] + ["b0", "b1"]
+    labels = [0] * 5 + [1] * 2
+    sampled_files, sampled_labels = oversample(files, labels, seed=0)
+
+    assert sampled_labels.count(0) == sampled_labels.count(1) == 5
+    assert sampled_files[:5] == files[:5]
+    # Whole copies of the smaller class first, then a seeded remainder without repeats
+    b_files = sampled_files[5:]
+    assert b_files[:4] == ["b0", "b1", "b0", "b1"] and b_files[4] in ("b0", "b1")
+    assert oversample(files, labels, seed=0) == (sampled_files, sampled_labels)
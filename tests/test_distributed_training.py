@@ -0,0 +1,37 @@
+import time
+import pytest
+from cnnClassifier.pipeline.distributed_training import launch_workers
+
+# Every worker exits with its code from `codes`, None stands for a worker blocked in a collective
+WORKER = """
+import json, os, sys, time
+index = json.loads(os.environ["TF_CONFIG"])["task"]["index"]
+codes = {codes}
+if codes[index] is None:
+    time.sleep(60)
+time.sleep(0.2)
+sys.exit(codes[index])
+"""
+
+
+@pytest.fixture
+def worker_module(tmp_path, monkeypatch):
+    def write(codes):
+        (tmp_path / "fake_worker.py").write_text(WORKER.format(codes=codes))
+        return "fake_worker"
+    monkeypatch.setenv("PYTHONPATH", str(tmp_path))
+    return write
+
+
+def test_a_failing_worker_stops_the_blocked_ones(worker_module):
+    start = time.monotonic()
+    assert launch_workers(2, module=worker_module([None, 3]), poll_interval=0.05) == 3
+    assert time.monotonic() - start < 30
+
+
+def test_every_worker_succeeding_returns_zero(worker_module):
+    assert launch_workers(3, module=worker_module([0, 0, 0]), poll_interval=0.05) == 0
+
+
+def test_the_first_failure_is_reported(worker_module):
+    assert launch_workers(2, module=worker_module([5, None]), poll_interval=0.05) == 5
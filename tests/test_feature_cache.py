@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+import tensorflow as tf
+from conftest import write_images
+from cnnClassifier.config.configuration import ConfigurationManager
+from cnnClassifier.components.model_trainer import Training
+from cnnClassifier.components.feature_cache import FeatureCache, split_backbone_head, build_feature_dataset
+from cnnClassifier.components import model_store
+
+
+def transfer_model():
+    """
+    Frozen convolutional backbone followed by a trainable head, as built by PrepareBaseModel.
+    """
+    tf.keras.utils.set_random_seed(0)
+    inputs = tf.keras.layers.Input(shape=(8, 8, 3))
+    x = tf.keras.layers.Conv2D(4, 3, trainable=False)(inputs)
+    x = tf.keras.layers.Flatten()(x)
+    outputs = tf.keras.layers.Dense(2, activation="softmax")(x)
+    model = tf.keras.models.Model(inputs, outputs)
+    model.compile(optimizer=tf.keras.optimizers.SGD(learning_rate=0.1), loss="categorical_crossentropy",
+                  metrics=["accuracy"])
+    return model
+
+
+def test_backbone_and_head_compose_to_the_full_model():
+    model = transfer_model()
+    backbone, head = split_backbone_head(model)
+    assert len(backbone.output.shape) == 4
+    images = np.random.default_rng(0).random((3, 8, 8, 3), dtype=np.float32)
+    np.testing.assert_allclose(head(backbone(images)), model(images), rtol=1e-5)
+    # The head reuses the layers of the full model
+    assert head.layers[-1] is model.layers[-1]
+
+
+def test_features_are_built_once_per_fingerprint(tmp_path):
+    backbone, _ = split_backbone_head(transfer_model())
+    cache = FeatureCache(tmp_path, backbone)
+    images = np.random.default_rng(0).random((5, 8, 8, 3), dtype=np.float32)
+    labels = np.eye(2, dtype=np.float32)[[0, 1, 1, 0, 1]]
+    reads = []
+
+    def batches():
+        reads.append(1)
+        for start in range(0, 5, 2):
+            yield images[start:start + 2], labels[start:start + 2]
+
+    features, cached_labels = cache.load_or_build("training", {"model": "a"}, batches(), 5)
+    np.testing.assert_allclose(features, backbone(images).numpy(), rtol=1e-2, atol=1e-3)
+    np.testing.assert_array_equal(cached_labels, [0, 1, 1, 0, 1])
+    assert features.dtype == np.float16 and isinstance(features, np.memmap)
+
+    cache.load_or_build("training", {"model": "a"}, batches(), 5)
+    assert len(reads) == 1
+    cache.load_or_build("training", {"model": "b"}, batches(), 5)
+    assert len(reads) == 2
+
+
+def test_feature_dataset_streams_every_sample_once_per_epoch():
+    features = np.arange(10, dtype=np.float16).reshape(5, 2)
+    labels = np.array([0, 1, 1, 0, 1])
+    ordered = list(build_feature_dataset(features, labels, 2, batch_size=2))
+    np.testing.assert_array_equal(np.concatenate([x for x, _ in ordered]), features.astype(np.float32))
+    np.testing.assert_array_equal(np.concatenate([y for _, y in ordered]).argmax(axis=1), labels)
+
+    shuffled = build_feature_dataset(features, labels, 2, batch_size=2, shuffle=True, repeat=True, seed=0)
+    epoch = np.concatenate([x for x, _ in shuffled.take(3)])
+    assert sorted(epoch[:, 0]) == sorted(features[:, 0].astype(np.float32))
+
+
+@pytest.fixture
+def cached_training(project_dir, set_params):
+    set_params(TRAINING_MODE="cached_features", IMAGE_SIZE=[8, 8, 3], BATCH_SIZE=2, EPOCHS=2,
+               VALIDATION_SPLIT=0.2, AUGMENTATION=False, CHECKPOINTS_TO_KEEP=0)
+    config = ConfigurationManager().get_training_config()
+    write_images(config.training_data, {"a": 6, "b": 6})
+    transfer_model().save(config.updated_base_model_path)
+    yield config
+    model_store.wait_for_saves()
+
+
+def train(config):
+    training = Training(config=config)
+    training.get_base_model()
+    training.restore_checkpoint()
+    training.train_valid_generator()
+    training.train()
+    model_store.wait_for_saves()
+    return training
+
+
+def test_cached_features_train_only_the_head(cached_training):
+    base = transfer_model()
+    training = train(cached_training)
+    trained = training.trained_model
+
+    np.testing.assert_array_equal(trained.layers[1].get_weights()[0], base.layers[1].get_weights()[0])
+    assert not np.allclose(trained.layers[-1].get_weights()[0], base.layers[-1].get_weights()[0])
+    assert sorted(path.name for path in cached_training.feature_cache_dir.glob("*.npy")) == \
+        ["training.npy", "training_labels.npy", "validation.npy", "validation_labels.npy"]
+    assert cached_training.trained_model_path.exists()
+
+
+def test_trainable_backbone_falls_back_to_full_training(cached_training):
+    model = transfer_model()
+    model.layers[1].trainable = True
+    model.compile(optimizer="sgd", loss="categorical_crossentropy", metrics=["accuracy"])
+    model.save(cached_training.updated_base_model_path)
+
+    training = train(cached_training)
+    assert not cached_training.feature_cache_dir.exists() or not list(cached_training.feature_cache_dir.iterdir())
+    assert not np.allclose(training.trained_model.layers[1].get_weights()[0], model.layers[1].get_weights()[0])
@@ -0,0 +1,98 @@
+"""
+Import-time regression tests: the CLI, the stage modules and the package
+itself must import without loading TensorFlow or the other heavy modules,
+which are imported only when a stage actually runs.
+
+Every module also has a wall-clock budget (seconds per module, cold import
+in a fresh interpreter). The default is generous, far above the ~0.1s these
+imports take without TensorFlow, so it only catches a heavy import creeping
+back in; the IMPORT_TIME_BUDGET environment variable overrides it.
+"""
+import os
+import sys
+import json
+import zipfile
+import subprocess
+from pathlib import Path
+import yaml
+import pytest
+from conftest import write_images
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+BUDGET_SECONDS = float(os.environ.get("IMPORT_TIME_BUDGET") or 2.0)
+
+# Modules that must only be imported on first use
+HEAVY_MODULES = ["tensorflow", "box", "pandas", "numpy", "joblib", "ensure"]
+
+MODULES = [
+    "cnnClassifier",
+    "cnnClassifier.cli",
+    "cnnClassifier.pipeline.stage_runner",
+    "cnnClassifier.pipeline.stage_01_data_ingestion",
+    "cnnClassifier.pipeline.stage_01b_data_sharding",
+    "cnnClassifier.pipeline.stage_02_prepare_base_model",
+    "cnnClassifier.pipeline.stage_03_model_trainer",
+    "cnnClassifier.pipeline.stage_04_model_quantization",
+    "cnnClassifier.pipeline.prediction",
+]
+
+# Heavy modules a module may load: the serving path aggregates slice probabilities with numpy
+ALLOWED_MODULES = {"cnnClassifier.pipeline.prediction": ["numpy"]}
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+print(json.dumps({{"seconds": time.perf_counter() - start, "loaded": [m for m in {heavy} if m in sys.modules]}}))
+"""
+
+
+# Runs the data ingestion stage without STREAM_TO_SHARDS
+INGESTION_PROBE = """
+import sys, json
+from cnnClassifier.pipeline.stage_01_data_ingestion import DataIngestionTrainingPipeline
+DataIngestionTrainingPipeline().main()
+print(json.dumps({{"loaded": [m for m in {heavy} if m in sys.modules]}}))
+"""
+
+
+def run_probe(code, cwd):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(SRC_DIR), os.environ.get("PYTHONPATH")])))
+    output = subprocess.run([sys.executable, "-c", code], cwd=cwd, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def cold_import(module, cwd):
+    return run_probe(PROBE.format(module=module, heavy=HEAVY_MODULES), cwd)
+
+
+@pytest.mark.parametrize("module", MODULES)
+def test_import_time(module, tmp_path):
+    # The imports run in tmp_path because importing the package creates logs/ in the working directory
+    run = cold_import(module, tmp_path)
+    loaded = [name for name in run["loaded"] if name not in ALLOWED_MODULES.get(module, [])]
+    assert loaded == [], f"importing {module} loads {loaded}"
+    # Best of a few runs, to keep disk cache noise out of the check
+    seconds = run["seconds"]
+    for _ in range(2):
+        if seconds <= BUDGET_SECONDS:
+            break
+        seconds = min(seconds, cold_import(module, tmp_path)["seconds"])
+    assert seconds <= BUDGET_SECONDS, f"importing {module} took {seconds:.3f}s, budget {BUDGET_SECONDS}s"
+
+
+def test_data_ingestion_without_shards_does_not_load_tensorflow(project_dir, set_params):
+    set_params(STREAM_TO_SHARDS=False)
+    paths = write_images(project_dir / "source" / "curated_data" / "curated_data", {"a": 2, "b": 2})
+    archive = project_dir / "source.zip"
+    with zipfile.ZipFile(archive, "w") as zip_ref:
+        for path in paths:
+            zip_ref.write(path, path.relative_to(project_dir / "source").as_posix())
+    config = yaml.safe_load((project_dir / "config" / "config.yaml").read_text())
+    config["data_ingestion"]["source_URL"] = f"file://{archive}"
+    (project_dir / "config" / "config.yaml").write_text(yaml.safe_dump(config))
+
+    run = run_probe(INGESTION_PROBE.format(heavy=HEAVY_MODULES), project_dir)
+    assert "tensorflow" not in run["loaded"]
+    assert (project_dir / "artifacts" / "data_ingestion" / "dataset_index.csv").exists()
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+import tensorflow as tf
+from conftest import write_images
+from cnnClassifier.components import input_pipeline
+from cnnClassifier.components.input_pipeline import build_image_dataset
+
+
+@pytest.fixture
+def shuffle_buffers(monkeypatch):
+    buffers = []
+    shuffle = tf.data.Dataset.shuffle
+
+    def recording_shuffle(self, buffer_size, *args, **kwargs):
+        buffers.append(buffer_size)
+        return shuffle(self, buffer_size, *args, **kwargs)
+
+    monkeypatch.setattr(tf.data.Dataset, "shuffle", recording_shuffle)
+    return buffers
+
+
+def epochs(dataset, count, steps):
+    iterator = iter(dataset)
+    return [[next(iterator)[0].numpy().tobytes() for _ in range(steps)] for _ in range(count)]
+
+
+@pytest.mark.parametrize("cache", ["memory", "disk"])
+def test_cached_images_are_reshuffled_in_a_bounded_buffer(tmp_path, shuffle_buffers, monkeypatch, cache):
+    monkeypatch.setattr(input_pipeline, "CACHED_SHUFFLE_BATCHES", 2)
+    paths = write_images(tmp_path / "data", {"a": 20, "b": 20})
+    labels = [0 if path.parent.name == "a" else 1 for path in paths]
+    dataset = build_image_dataset(
+        paths, labels, 2, image_size=[8, 8, 3], batch_size=1, shuffle=True, repeat=True, seed=0,
+        cache="memory" if cache == "memory" else str(tmp_path / "cache" / "training")
+    )
+
+    # The paths are shuffled once in full, the decoded images only in 2 batches
+    assert shuffle_buffers == [40, 2]
+    first, second = epochs(dataset, count=2, steps=40)
+    assert sorted(first) == sorted(second) and len(set(first)) == 40
+    assert first != second
+
+
+def test_uncached_paths_are_shuffled_in_full(tmp_path, shuffle_buffers):
+    paths = write_images(tmp_path / "data", {"a": 5, "b": 5})
+    dataset = build_image_dataset(paths, [0] * 5 + [1] * 5, 2, image_size=[8, 8, 3], batch_size=2,
+                                  shuffle=True, seed=0)
+    assert shuffle_buffers == [10]
+    assert sum(int(images.shape[0]) for images, _ in dataset) == 10
+    np.testing.assert_array_equal(
+        np.concatenate([labels.numpy() for _, labels in dataset]).sum(axis=0), [5, 5]
+    )
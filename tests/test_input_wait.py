@@ -0,0 +1,54 @@
+import time
+import numpy as np
+import pytest
+import tensorflow as tf
+from cnnClassifier.components.callbacks import InputWaitCallback
+
+DELAY = 0.05
+STEPS = 4
+
+
+class SlowBatches:
+    """
+    Keras-style iterator taking DELAY seconds to produce every batch.
+    """
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        time.sleep(DELAY)
+        return np.ones((2, 4), np.float32), np.zeros((2, 1), np.float32)
+
+
+def slow_dataset():
+    def slow(x):
+        time.sleep(DELAY)
+        return x
+    dataset = tf.data.Dataset.from_tensors((tf.ones((2, 4)), tf.zeros((2, 1)))).repeat()
+    return dataset.map(lambda x, y: (tf.numpy_function(slow, [x], tf.float32, stateful=True), y))
+
+
+@pytest.mark.parametrize("make_data", [SlowBatches, slow_dataset])
+def test_slow_input_is_reported_as_wait(make_data):
+    model = tf.keras.Sequential([tf.keras.layers.Dense(1, input_shape=(4,))])
+    model.compile(optimizer="sgd", loss="mse")
+    train_function = model.make_train_function()
+    callback = InputWaitCallback()
+
+    model.fit(callback.wrap(make_data()), epochs=2, steps_per_epoch=STEPS, callbacks=[callback], verbose=0)
+
+    # Keras' own train function is left in place
+    assert model.train_function is train_function
+    assert [epoch["epoch"] for epoch in callback.epochs] == [1, 2]
+    for epoch in callback.epochs:
+        assert epoch["input_wait_seconds"] >= 0.9 * STEPS * DELAY
+    # The first epoch also traces the train function
+    assert callback.epochs[-1]["input_bound_fraction"] > 0.5
+
+
+def test_unwrapped_training_is_not_reported():
+    model = tf.keras.Sequential([tf.keras.layers.Dense(1, input_shape=(4,))])
+    model.compile(optimizer="sgd", loss="mse")
+    callback = InputWaitCallback()
+    model.fit(np.ones((8, 4)), np.zeros((8, 1)), batch_size=2, callbacks=[callback], verbose=0)
+    assert callback.epochs == []
@@ -0,0 +1,94 @@
+import re
+import urllib.request
+import pytest
+from cnnClassifier.utils.metrics import (Registry, Counter, Gauge, Histogram, CONTENT_TYPE, REGISTRY, IMAGES,
+                                         start_metrics_server)
+
+# One sample line of the text exposition format: name, optional {label="value",...}, value
+SAMPLE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{([a-zA-Z_][a-zA-Z0-9_]*="([^"\\]|\\.)*",?)*\})? '
+                    r'(-?[0-9.e+-]+|\+Inf|-Inf|NaN)$')
+
+
+def assert_exposition_format(text):
+    assert text.endswith("\n")
+    families = []
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            families.append(line.split()[2])
+        elif line.startswith("# TYPE "):
+            assert line.split()[2] == families[-1]
+            assert line.split()[3] in ("counter", "gauge", "histogram")
+        else:
+            assert SAMPLE.match(line), line
+            assert line.split("{")[0].split(" ")[0].startswith(families[-1])
+    assert len(families) == len(set(families))
+
+
+def test_rendered_output_follows_the_exposition_format():
+    registry = Registry()
+    images = Counter("test_images_total", "Images", ["phase"], registry=registry)
+    depth = Gauge("test_queue_depth", "Queue depth", ["queue"], registry=registry)
+    latency = Histogram("test_latency_seconds", "Latency", buckets=(0.1, 1.0), registry=registry)
+
+    images.inc(3, phase="train")
+    images.inc(phase="predict")
+    depth.set(2, queue='decode "fast"')
+    depth.set_function(lambda: 5, queue="batcher")
+    for value in (0.05, 0.5, 0.5, 3.0):
+        latency.observe(value)
+
+    text = registry.render()
+    assert text == "\n".join([
+        "# HELP test_images_total Images",
+        "# TYPE test_images_total counter",
+        'test_images_total{phase="predict"} 1.0',
+        'test_images_total{phase="train"} 3.0',
+        "# HELP test_queue_depth Queue depth",
+        "# TYPE test_queue_depth gauge",
+        'test_queue_depth{queue="batcher"} 5.0',
+        'test_queue_depth{queue="decode \\"fast\\""} 2.0',
+        "# HELP test_latency_seconds Latency",
+        "# TYPE test_latency_seconds histogram",
+        # Buckets are cumulative and end with +Inf, which equals _count
+        'test_latency_seconds_bucket{le="0.1"} 1',
+        'test_latency_seconds_bucket{le="1.0"} 3',
+        'test_latency_seconds_bucket{le="+Inf"} 4',
+        "test_latency_seconds_sum 4.05",
+        "test_latency_seconds_count 4",
+    ]) + "\n"
+    assert_exposition_format(text)
+
+
+def test_labelled_histograms_and_failing_gauges():
+    registry = Registry()
+    latency = Histogram("test_batch_latency_seconds", "Latency", ["batch_size"], buckets=(1.0,), registry=registry)
+    broken = Gauge("test_broken", "Raises on read", registry=registry)
+    latency.observe(0.5, batch_size=8)
+    broken.set_function(lambda: 1 / 0)
+
+    lines = registry.render().splitlines()
+    assert 'test_batch_latency_seconds_bucket{batch_size="8",le="1.0"} 1' in lines
+    assert 'test_batch_latency_seconds_count{batch_size="8"} 1' in lines
+    # A gauge that cannot be read is left out of the scrape
+    assert not any(line.startswith("test_broken") for line in lines)
+
+
+def test_metrics_reject_wrong_labels_and_duplicate_names():
+    registry = Registry()
+    images = Counter("test_images_total", "Images", ["phase"], registry=registry)
+    with pytest.raises(ValueError):
+        images.inc(queue="decode")
+    with pytest.raises(ValueError):
+        Counter("test_images_total", "Images again", registry=registry)
+
+
+def test_metrics_endpoint_serves_the_registry():
+    server = start_metrics_server(0)
+    IMAGES.inc(phase="test")
+    url = f"http://127.0.0.1:{server.server_port}"
+    with urllib.request.urlopen(f"{url}/metrics") as response:
+        assert response.headers["Content-Type"] == CONTENT_TYPE
+        text = response.read().decode()
+    assert 'cnnclassifier_images_total{phase="test"}' in text
+    assert_exposition_format(text)
+    assert set(REGISTRY.metrics) <= {line.split()[2] for line in text.splitlines() if line.startswith("# TYPE")}
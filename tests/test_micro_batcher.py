@@ -0,0 +1,85 @@
+import time
+import threading
+import pytest
+from cnnClassifier.components.micro_batcher import MicroBatcher
+
+
+class RecordingModel:
+    def __init__(self, fail_on=None):
+        self.batches = []
+        self.fail_on = fail_on
+
+    def __call__(self, items):
+        self.batches.append(list(items))
+        if self.fail_on is not None and self.fail_on in items:
+            raise RuntimeError(f"cannot score {self.fail_on}")
+        return [item * 10 for item in items]
+
+
+@pytest.fixture
+def make_batcher():
+    batchers = []
+
+    def make_batcher(predict_fn, **kwargs):
+        batchers.append(MicroBatcher(predict_fn, **kwargs))
+        return batchers[-1]
+
+    yield make_batcher
+    for batcher in batchers:
+        batcher.close()
+
+
+def test_full_batches_are_dispatched_without_waiting(make_batcher):
+    model = RecordingModel()
+    batcher = make_batcher(model, max_batch_size=4, max_wait_ms=5000)
+    start = time.monotonic()
+    futures = [batcher.submit(i) for i in range(8)]
+    assert [future.result(timeout=2) for future in futures] == [i * 10 for i in range(8)]
+    assert time.monotonic() - start < 2
+    assert model.batches == [[0, 1, 2, 3], [4, 5, 6, 7]]
+
+
+def test_partial_batch_is_dispatched_after_max_wait(make_batcher):
+    model = RecordingModel()
+    batcher = make_batcher(model, max_batch_size=32, max_wait_ms=100)
+    start = time.monotonic()
+    futures = [batcher.submit(i) for i in range(3)]
+    assert [future.result(timeout=2) for future in futures] == [0, 10, 20]
+    assert time.monotonic() - start >= 0.09
+    # An item arriving after the deadline starts the next batch
+    assert batcher.predict(3, timeout=2) == 30
+    assert model.batches == [[0, 1, 2], [3]]
+
+
+def test_concurrent_callers_share_a_batch(make_batcher):
+    model = RecordingModel()
+    batcher = make_batcher(model, max_batch_size=8, max_wait_ms=200)
+    results = {}
+    threads = [threading.Thread(target=lambda i=i: results.update({i: batcher.predict(i, timeout=2)}))
+               for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {i: i * 10 for i in range(8)}
+    assert len(model.batches) == 1
+
+
+def test_exceptions_reach_every_future_of_the_batch(make_batcher):
+    model = RecordingModel(fail_on=2)
+    batcher = make_batcher(model, max_batch_size=4, max_wait_ms=5000)
+    futures = [batcher.submit(i) for i in range(4)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="cannot score 2"):
+            future.result(timeout=2)
+    # The batcher keeps serving the next batches
+    futures = [batcher.submit(i) for i in (4, 5, 6, 7)]
+    assert [future.result(timeout=2) for future in futures] == [40, 50, 60, 70]
+
+
+def test_a_missing_result_fails_every_future(make_batcher):
+    batcher = make_batcher(lambda items: items[:-1], max_batch_size=2, max_wait_ms=5000)
+    futures = [batcher.submit(i) for i in range(2)]
+    for future in futures:
+        with pytest.raises(ValueError, match="1 results for 2 items"):
+            future.result(timeout=2)
@@ -0,0 +1,62 @@
+import json
+import numpy as np
+import pytest
+import tensorflow as tf
+from conftest import write_images
+from cnnClassifier.config.configuration import ConfigurationManager
+from cnnClassifier.components.model_quantization import ModelQuantization
+from cnnClassifier.components.model_runner import TFLiteModelRunner, load_model_runner
+from cnnClassifier.pipeline.stage_04_model_quantization import ModelQuantizationPipeline
+
+
+@pytest.fixture
+def trained(project_dir, set_params):
+    set_params(IMAGE_SIZE=[8, 8, 3], VALIDATION_SPLIT=0.5, QUANTIZATION_CALIBRATION_SAMPLES=8,
+               QUANTIZATION_EVAL_SAMPLES=8)
+    config = ConfigurationManager().get_model_quantization_config()
+    write_images(config.training_data, {"a": 8, "b": 8})
+    tf.keras.utils.set_random_seed(0)
+    model = tf.keras.Sequential([
+        tf.keras.layers.Flatten(input_shape=(8, 8, 3)),
+        tf.keras.layers.Dense(2, activation="softmax")
+    ])
+    config.trained_model_path.parent.mkdir(parents=True, exist_ok=True)
+    model.save(config.trained_model_path)
+    return model
+
+
+def quantize(set_params, **params):
+    set_params(**params)
+    ModelQuantizationPipeline().main()
+    config = ConfigurationManager().get_model_quantization_config()
+    report = json.loads(config.report_file.read_text()) if config.report_file.exists() else None
+    return config, report
+
+
+def test_stage_is_skipped_without_quantization(trained, set_params):
+    config, report = quantize(set_params, QUANTIZATION=None)
+    assert report is None and not config.tflite_model_path.exists()
+
+
+@pytest.mark.parametrize("mode, atol", [("none", 1e-5), ("dynamic_range", 0.05), ("float16", 0.01), ("int8", 0.1)])
+def test_quantized_model_is_promoted_and_matches_keras(trained, set_params, mode, atol):
+    config, report = quantize(set_params, QUANTIZATION=mode, QUANTIZATION_MAX_ACCURACY_DROP=1.0)
+    assert report["quantization"] == mode and report["promoted"]
+    assert report["eval_samples"] == 8
+
+    # Preprocessed validation images, in the range int8 was calibrated on
+    images, _ = ModelQuantization(config)._load_validation_images(8)
+    runner = TFLiteModelRunner(config.tflite_model_path)
+    np.testing.assert_allclose(runner.predict(images), trained.predict(images, verbose=0), atol=atol)
+
+
+def test_accuracy_drop_above_the_limit_is_not_promoted(trained, set_params):
+    config, report = quantize(set_params, QUANTIZATION="none", QUANTIZATION_MAX_ACCURACY_DROP=-1.0)
+    assert not report["promoted"]
+    assert not config.tflite_model_path.exists()
+    assert (config.root_dir / "model_none.tflite").exists()
+
+
+def test_tflite_artifacts_get_the_tflite_runner(trained, set_params):
+    config, _ = quantize(set_params, QUANTIZATION="none", QUANTIZATION_MAX_ACCURACY_DROP=1.0)
+    assert isinstance(load_model_runner(config.tflite_model_path), TFLiteModelRunner)
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+import tensorflow as tf
+from cnnClassifier.components.model_runner import TracedModelRunner, ModelRunnerPool
+
+IMAGE_SIZE = [4, 4, 3]
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    tf.keras.utils.set_random_seed(0)
+    model = tf.keras.Sequential([
+        tf.keras.layers.Flatten(input_shape=IMAGE_SIZE),
+        tf.keras.layers.Dense(3, activation="softmax")
+    ])
+    path = tmp_path / "model.h5"
+    model.save(path)
+    return path
+
+
+def images(count):
+    return np.random.default_rng(count).random((count, *IMAGE_SIZE), dtype=np.float32)
+
+
+def unchunked(model_path, batch):
+    return tf.keras.models.load_model(model_path).predict(batch, batch_size=len(batch), verbose=0)
+
+
+@pytest.mark.parametrize("count", [1, 3, 8, 19])
+def test_traced_runner_matches_an_unchunked_predict(model_path, count):
+    runner = TracedModelRunner(model_path, IMAGE_SIZE, batch_buckets=(1, 4, 8))
+    batch = images(count)
+    np.testing.assert_allclose(runner.predict(batch), unchunked(model_path, batch), rtol=1e-5, atol=1e-6)
+    # 19 images run as 8 + 8 + 3 padded to 4
+    if count == 19:
+        assert runner.latency.report()["all"]["calls"] == 3
+        assert set(runner.latency.report()) == {"all", "batch_4", "batch_8"}
+
+
+@pytest.mark.parametrize("count", [5, 20, 37])
+def test_thread_pool_matches_an_unchunked_predict(model_path, count):
+    pool = ModelRunnerPool(model_path, IMAGE_SIZE, batch_buckets=(1, 4, 8, 16), workers=2)
+    try:
+        batch = images(count)
+        np.testing.assert_allclose(pool.predict(batch), unchunked(model_path, batch), rtol=1e-5, atol=1e-6)
+        assert sum(pool.chunk_sizes(count)) == count
+    finally:
+        pool.close()
+
+
+def test_chunk_sizes_fill_the_largest_buckets_first(model_path):
+    pool = ModelRunnerPool(model_path, IMAGE_SIZE, batch_buckets=(1, 4, 8, 16), workers=2)
+    try:
+        assert pool.chunk_sizes(20) == [16, 4]
+        assert pool.chunk_sizes(37) == [16, 16, 4, 1]
+        assert pool.chunk_sizes(7) == [4, 3]
+        assert pool.chunk_sizes(16) == [16]
+    finally:
+        pool.close()
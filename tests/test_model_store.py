@@ -0,0 +1,88 @@
+import os
+import threading
+import numpy as np
+import pytest
+import tensorflow as tf
+from cnnClassifier.components import model_store
+
+
+def small_model(bias):
+    model = tf.keras.Sequential([tf.keras.layers.Dense(2, input_shape=(3,))])
+    model.layers[0].bias.assign([bias, bias])
+    return model
+
+
+def saved_bias(path):
+    return tf.keras.models.load_model(path, compile=False).layers[0].bias.numpy()
+
+
+def stalled_save(model, started, release, fail=False):
+    """
+    Makes `model.save` write part of the file, then wait for `release` (and fail with `fail`).
+    """
+    save = model.save
+
+    def save_in_two_parts(path, **kwargs):
+        with open(path, "wb") as f:
+            f.write(b"partial")
+        started.set()
+        release.wait(timeout=30)
+        if fail:
+            raise OSError("disk full")
+        save(path, **kwargs)
+
+    model.save = save_in_two_parts
+
+
+@pytest.fixture
+def model_path(project_dir):
+    path = project_dir / "artifacts" / "model.h5"
+    model_store.save_model(path, small_model(1.0), share=False)
+    yield path
+    model_store.wait_for_saves()
+
+
+def test_readers_see_the_previous_model_until_the_background_save_is_done(model_path):
+    started, release = threading.Event(), threading.Event()
+    model = small_model(2.0)
+    stalled_save(model, started, release)
+    future = model_store.save_model(model_path, model, background=True)
+
+    assert started.wait(timeout=30)
+    assert model_store.is_saving(model_path)
+    np.testing.assert_array_equal(saved_bias(model_path), [1.0, 1.0])
+
+    release.set()
+    model_store.wait_for_saves(model_path)
+    assert future.done() and not model_store.is_saving(model_path)
+    np.testing.assert_array_equal(saved_bias(model_path), [2.0, 2.0])
+    assert [path.name for path in model_path.parent.iterdir()] == ["model.h5"]
+
+
+def test_failed_background_save_keeps_the_previous_model(model_path):
+    started, release = threading.Event(), threading.Event()
+    model = small_model(2.0)
+    stalled_save(model, started, release, fail=True)
+    model_store.save_model(model_path, model, background=True)
+    assert started.wait(timeout=30)
+    release.set()
+
+    with pytest.raises(OSError, match="disk full"):
+        model_store.wait_for_saves(model_path)
+    np.testing.assert_array_equal(saved_bias(model_path), [1.0, 1.0])
+    assert [path.name for path in model_path.parent.iterdir()] == ["model.h5"]
+    # The failed model is not handed over, the next load reads the file
+    np.testing.assert_array_equal(model_store.load_model(model_path).layers[0].bias.numpy(), [1.0, 1.0])
+
+
+def test_saved_model_is_handed_over_once_while_the_file_is_unchanged(model_path):
+    model = small_model(3.0)
+    model_store.save_model(model_path, model, background=True)
+    assert model_store.load_model(model_path) is model
+    assert model_store.load_model(model_path) is not model
+
+    # A file rewritten by someone else is read from disk
+    model_store.save_model(model_path, model)
+    small_model(4.0).save(model_path)
+    os.utime(model_path, ns=(0, os.stat(model_path).st_mtime_ns + 1_000_000_000))
+    np.testing.assert_array_equal(model_store.load_model(model_path).layers[0].bias.numpy(), [4.0, 4.0])
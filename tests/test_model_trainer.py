@@ -0,0 +1,215 @@
+import pytest
+import tensorflow as tf
+from conftest import write_images
+from cnnClassifier.config.configuration import ConfigurationManager
+from cnnClassifier.components.model_trainer import Training
+from cnnClassifier.components.callbacks import sync_checkpoint
+from cnnClassifier.components import model_store
+from cnnClassifier.components.dataset_index import build_dataset_index
+
+
+def cached_files(cache_dir):
+    return sorted(path.name for path in cache_dir.iterdir()) if cache_dir.exists() else []
+
+
+def build_training():
+    training = Training(config=ConfigurationManager().get_training_config())
+    training.train_valid_generator()
+    return training
+
+
+def consume_epoch(training):
+    # One pass over the training files finishes the cache file
+    iterator = iter(training.train_generator)
+    for _ in range(training.train_samples // training.batch_size + 1):
+        images, _ = next(iterator)
+    return images
+
+
+def test_disk_data_cache_is_rebuilt_when_its_inputs_change(project_dir, set_params):
+    set_params(INPUT_PIPELINE="tf_data", DATA_CACHE="disk", IMAGE_SIZE=[8, 8, 3], BATCH_SIZE=2,
+               VALIDATION_SPLIT=0.5)
+    config = ConfigurationManager().get_training_config()
+    write_images(config.training_data, {"a": 10, "b": 10})
+
+    training = build_training()
+    consume_epoch(training)
+    first = [name for name in cached_files(config.data_cache_dir) if name.startswith("training-")]
+    assert first
+
+    # The same settings reuse the cache
+    build_training()
+    assert [name for name in cached_files(config.data_cache_dir) if name.startswith("training-")] == first
+
+    # A new split moves images between the subsets: the old training cache is dropped
+    set_params(VALIDATION_SPLIT=0.3)
+    training = build_training()
+    assert not set(first) & set(cached_files(config.data_cache_dir))
+    consume_epoch(training)
+
+    # A new image size reads freshly decoded images instead of failing on the cached shape
+    set_params(IMAGE_SIZE=[16, 16, 3])
+    images = consume_epoch(build_training())
+    assert images.shape[1:] == (16, 16, 3)
+
+
+def test_data_cache_name_depends_on_files_labels_and_settings(project_dir, set_params):
+    set_params(DATA_CACHE="disk")
+    config = ConfigurationManager().get_training_config()
+    training = Training(config=config)
+    files, labels = ["a/1.png", "b/2.png"], [0, 1]
+
+    path = training._data_cache("training", files, labels)
+    assert path == training._data_cache("training", list(files), list(labels))
+    assert path != training._data_cache("training", files[:1], labels[:1])
+    assert path != training._data_cache("training", files, [1, 0])
+    assert path != training._data_cache("validation", files, labels)
+    assert path != training._data_cache("training", files, labels, pipeline_index=0, num_pipelines=2)
+
+    set_params(DATA_CACHE="disk", SAMPLING="oversample")
+    assert path != Training(config=ConfigurationManager().get_training_config())._data_cache("training", files, labels)
+    set_params(SAMPLING=None, BACKBONE="MobileNetV3Small")
+    assert path != Training(config=ConfigurationManager().get_training_config())._data_cache("training", files, labels)
+
+    set_params(DATA_CACHE="memory")
+    assert Training(config=ConfigurationManager().get_training_config())._data_cache("training", files, labels) == "memory"
+
+
+class Interrupted(Exception):
+    pass
+
+
+class StepRecorder(tf.keras.callbacks.Callback):
+    """
+    Records the (epoch, step) of every training step and fails after `interrupt_at`.
+    """
+    def __init__(self, interrupt_at=None):
+        super().__init__()
+        self.interrupt_at = interrupt_at
+        self.steps = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._epoch = epoch
+
+    def on_train_batch_end(self, batch, logs=None):
+        self.steps.append((self._epoch, batch))
+        if (self._epoch, batch) == self.interrupt_at:
+            raise Interrupted()
+
+
+def save_base_model(config):
+    tf.keras.utils.set_random_seed(0)
+    model = tf.keras.Sequential([
+        tf.keras.layers.Flatten(input_shape=(8, 8, 3)),
+        tf.keras.layers.Dense(2, activation="softmax")
+    ])
+    model.compile(optimizer=tf.keras.optimizers.SGD(learning_rate=0.01), loss="categorical_crossentropy",
+                  metrics=["accuracy"])
+    model.save(config.updated_base_model_path)
+
+
+def start_training(monkeypatch, recorder):
+    monkeypatch.setattr(Training, "_instrumentation_callbacks", lambda self: [recorder])
+    training = Training(config=ConfigurationManager().get_training_config())
+    training.get_base_model()
+    training.restore_checkpoint()
+    training.train_valid_generator()
+    return training
+
+
+@pytest.mark.parametrize("background", [False, True])
+def test_training_resumes_mid_epoch_from_the_latest_checkpoint(project_dir, set_params, monkeypatch, background):
+    set_params(INPUT_PIPELINE="tf_data", IMAGE_SIZE=[8, 8, 3], BATCH_SIZE=2, EPOCHS=2, VALIDATION_SPLIT=0.2,
+               CHECKPOINT_EVERY_STEPS=2, CHECKPOINT_ASYNC=background)
+    config = ConfigurationManager().get_training_config()
+    write_images(config.training_data, {"a": 8, "b": 8})
+    save_base_model(config)
+
+    # The run fails during step 4 of the second epoch, after the checkpoint of step 2
+    first = StepRecorder(interrupt_at=(1, 3))
+    training = start_training(monkeypatch, first)
+    with pytest.raises(Interrupted):
+        training.train()
+    sync_checkpoint(training.checkpoint)
+    steps_per_epoch = training.train_samples // training.batch_size
+    assert steps_per_epoch >= 5
+    assert first.steps[-1] == (1, 3)
+
+    second = StepRecorder()
+    training = start_training(monkeypatch, second)
+    assert (training.initial_epoch, training.initial_step) == (1, 2)
+    assert int(training.checkpoint.epoch.numpy()) == 1 and int(training.checkpoint.step.numpy()) == 2
+    latest = tf.train.latest_checkpoint(str(config.checkpoint_dir))
+    assert latest.endswith(f"ckpt-{steps_per_epoch + 2}")
+
+    training.train()
+    model_store.wait_for_saves()
+    # Only the steps after the checkpoint run again, then the epoch completes
+    assert second.steps == [(1, step) for step in range(steps_per_epoch - 2)]
+    assert int(training.checkpoint.epoch.numpy()) == 2 and int(training.checkpoint.step.numpy()) == 0
+    # A completed run removes its checkpoints, the next run starts from the base model
+    assert not config.checkpoint_dir.exists()
+    assert config.trained_model_path.exists()
+
+
+
+def interrupted_run(monkeypatch, set_params, config):
+    set_params(INPUT_PIPELINE="tf_data", IMAGE_SIZE=[8, 8, 3], BATCH_SIZE=2, EPOCHS=2, VALIDATION_SPLIT=0.2,
+               CHECKPOINT_EVERY_STEPS=2, CHECKPOINT_ASYNC=False)
+    write_images(config.training_data, {"a": 8, "b": 8})
+    save_base_model(config)
+    training = start_training(monkeypatch, StepRecorder(interrupt_at=(1, 3)))
+    with pytest.raises(Interrupted):
+        training.train()
+    assert tf.train.latest_checkpoint(str(config.checkpoint_dir)) is not None
+
+
+def test_checkpoint_of_another_base_model_is_not_resumed(project_dir, set_params, monkeypatch):
+    config = ConfigurationManager().get_training_config()
+    interrupted_run(monkeypatch, set_params, config)
+
+    model = tf.keras.models.load_model(config.updated_base_model_path)
+    model.layers[-1].bias.assign([1.0, -1.0])
+    model.save(config.updated_base_model_path)
+    training = start_training(monkeypatch, StepRecorder())
+    assert (training.initial_epoch, training.initial_step) == (0, 0)
+
+    # Back to the base model the checkpoint was written from, it resumes again
+    save_base_model(config)
+    training = start_training(monkeypatch, StepRecorder())
+    assert (training.initial_epoch, training.initial_step) == (1, 2)
+
+
+def test_checkpoint_of_another_dataset_index_is_not_resumed(project_dir, set_params, monkeypatch):
+    config = ConfigurationManager().get_training_config()
+    interrupted_run(monkeypatch, set_params, config)
+
+    write_images(config.training_data, {"b": 2}, start=100)
+    build_dataset_index(config.training_data, config.dataset_index_file, validation_split=0.2)
+    training = start_training(monkeypatch, StepRecorder())
+    assert (training.initial_epoch, training.initial_step) == (0, 0)
+
+
+class TwoReplicas:
+    num_replicas_in_sync = 2
+
+
+def test_generator_pipeline_is_replaced_by_sharded_tf_data_on_several_replicas(project_dir, set_params):
+    set_params(INPUT_PIPELINE="generator", IMAGE_SIZE=[8, 8, 3], BATCH_SIZE=2, VALIDATION_SPLIT=0.5,
+               AUGMENTATION=False)
+    config = ConfigurationManager().get_training_config()
+    write_images(config.training_data, {"a": 10, "b": 10})
+
+    training = Training(config=config)
+    training.strategy = TwoReplicas()
+    training.train_valid_generator()
+    assert isinstance(training.train_generator, tf.keras.utils.experimental.DatasetCreator)
+
+    # Each of the two input pipelines reads its own half of the files, one image per replica and step
+    seen = []
+    for index in range(2):
+        context = tf.distribute.InputContext(num_input_pipelines=2, input_pipeline_id=index, num_replicas_in_sync=2)
+        dataset = training.train_generator(context)
+        seen.append({images.numpy().tobytes() for images, _ in dataset.take(len(range(index, training.train_samples, 2)))})
+    assert len(seen[0]) + len(seen[1]) == training.train_samples
+    assert not seen[0] & seen[1]
@@ -0,0 +1,86 @@
+import json
+import logging
+import numpy as np
+import pytest
+import tensorflow as tf
+from conftest import write_images
+from cnnClassifier.config.configuration import ConfigurationManager
+from cnnClassifier.components.callbacks import ThroughputCallback
+from cnnClassifier.components.model_trainer import Training
+from cnnClassifier.components.performance import apply_precision_policy, configure_onednn, configure_runtime
+from cnnClassifier.components import model_store
+
+
+def dense_model():
+    tf.keras.utils.set_random_seed(0)
+    model = tf.keras.Sequential([
+        tf.keras.layers.Flatten(input_shape=(8, 8, 3)),
+        tf.keras.layers.Dense(4, activation="relu"),
+        tf.keras.layers.Dense(2, activation="softmax")
+    ])
+    model.compile(optimizer="sgd", loss="categorical_crossentropy", metrics=["accuracy"])
+    return model
+
+
+def test_throughput_report_keeps_epochs_across_fit_calls(tmp_path):
+    model = dense_model()
+    report_file = tmp_path / "throughput.json"
+    callback = ThroughputCallback(batch_size=2, report_file=report_file, profile={"jit_compile": False})
+    x, y = np.ones((8, 8, 8, 3), np.float32), np.eye(2, dtype=np.float32)[[0, 1] * 4]
+    for epoch in range(2):
+        model.fit(x, y, batch_size=2, initial_epoch=epoch, epochs=epoch + 1, callbacks=[callback], verbose=0)
+
+    report = json.loads(report_file.read_text())
+    assert report["batch_size"] == 2 and report["profile"] == {"jit_compile": False}
+    assert [epoch["epoch"] for epoch in report["epochs"]] == [1, 2]
+    for epoch in report["epochs"]:
+        assert epoch["steps"] == 4
+        assert epoch["images_per_sec"] > 0 and epoch["first_step_ms"] > 0
+        assert epoch["p95_step_ms"] >= epoch["mean_step_ms"] * 0.5
+
+
+def test_mixed_precision_clone_keeps_the_output_in_float32():
+    model = dense_model()
+    mixed = apply_precision_policy(model, "mixed_bfloat16")
+    assert mixed.layers[1].compute_dtype == "bfloat16"
+    assert mixed.layers[-1].compute_dtype == "float32" and mixed.output.dtype == tf.float32
+    # Variables stay float32, so the weights move between the models unchanged
+    for mixed_weights, weights in zip(mixed.get_weights(), model.get_weights()):
+        assert mixed_weights.dtype == np.float32
+        np.testing.assert_array_equal(mixed_weights, weights)
+    images = np.random.default_rng(0).random((2, 8, 8, 3), dtype=np.float32)
+    np.testing.assert_allclose(mixed(images), model(images), atol=0.02)
+
+
+def test_late_runtime_settings_are_logged_instead_of_failing(monkeypatch, caplog):
+    monkeypatch.delenv("TF_ENABLE_ONEDNN_OPTS", raising=False)
+    current = tf.config.threading.get_intra_op_parallelism_threads()
+    tf.constant(1.0) + 1.0
+    with caplog.at_level(logging.WARNING, logger="cnnClassifierLogger"):
+        configure_onednn(False)
+        configure_runtime(intra_op_threads=current + 3)
+    assert "TF_ENABLE_ONEDNN_OPTS=0" in caplog.text
+    assert f"Could not set intra_op threads to {current + 3}" in caplog.text
+
+
+def test_mixed_precision_training_saves_a_float32_model(project_dir, set_params):
+    set_params(MIXED_PRECISION="mixed_bfloat16", INPUT_PIPELINE="tf_data", IMAGE_SIZE=[8, 8, 3], BATCH_SIZE=2,
+               EPOCHS=1, VALIDATION_SPLIT=0.2, CHECKPOINTS_TO_KEEP=0)
+    config = ConfigurationManager().get_training_config()
+    write_images(config.training_data, {"a": 6, "b": 6})
+    dense_model().save(config.updated_base_model_path)
+
+    training = Training(config=config)
+    training.configure_runtime()
+    training.get_base_model()
+    assert training.model.layers[1].compute_dtype == "bfloat16"
+    training.restore_checkpoint()
+    training.train_valid_generator()
+    training.train()
+    model_store.wait_for_saves()
+
+    saved = tf.keras.models.load_model(config.trained_model_path)
+    assert all(layer.compute_dtype == "float32" for layer in saved.layers)
+    np.testing.assert_array_equal(saved.layers[1].get_weights()[0], training.model.layers[1].get_weights()[0])
+    report = json.loads(config.throughput_report_file.read_text())
+    assert report["profile"]["mixed_precision"] == "mixed_bfloat16"
@@ -0,0 +1,74 @@
+import threading
+import pytest
+import tensorflow as tf
+from conftest import write_images
+from cnnClassifier.config.configuration import ConfigurationManager
+from cnnClassifier.components import model_store
+from cnnClassifier.pipeline.context import PipelineContext
+from cnnClassifier.pipeline.stage_03_model_trainer import ModelTrainingPipeline
+
+
+def base_model():
+    tf.keras.utils.set_random_seed(0)
+    model = tf.keras.Sequential([
+        tf.keras.layers.Flatten(input_shape=(8, 8, 3)),
+        tf.keras.layers.Dense(2, activation="softmax")
+    ])
+    model.compile(optimizer="sgd", loss="categorical_crossentropy", metrics=["accuracy"])
+    return model
+
+
+@pytest.fixture
+def training_project(project_dir, set_params, monkeypatch):
+    set_params(INPUT_PIPELINE="tf_data", IMAGE_SIZE=[8, 8, 3], BATCH_SIZE=2, EPOCHS=1, VALIDATION_SPLIT=0.2,
+               AUGMENTATION=False, CHECKPOINTS_TO_KEEP=0)
+    config = ConfigurationManager().get_training_config()
+    write_images(config.training_data, {"a": 6, "b": 6})
+    base_model().save(config.updated_base_model_path)
+
+    loads = []
+    load_model = model_store.load_model
+
+    def recording_load_model(path, **kwargs):
+        loads.append(str(path))
+        return load_model(path, **kwargs)
+
+    monkeypatch.setattr(model_store, "load_model", recording_load_model)
+    yield config, loads
+    model_store.wait_for_saves()
+
+
+def test_model_left_in_the_context_is_trained_without_reading_the_file(training_project):
+    config, loads = training_project
+    context = PipelineContext()
+    model = base_model()
+    context.put_model(config.updated_base_model_path, model)
+
+    ModelTrainingPipeline(context).main()
+    assert str(config.updated_base_model_path) not in loads
+    # The trained model is the one handed over, and is passed on to the next stage
+    assert context.take_model(config.trained_model_path) is model
+    assert context.take_model(config.updated_base_model_path) is None
+
+
+def test_empty_context_falls_back_to_the_file(training_project):
+    config, loads = training_project
+    context = PipelineContext()
+    ModelTrainingPipeline(context).main()
+    assert loads == [str(config.updated_base_model_path)]
+    assert context.take_model(config.trained_model_path) is not None
+
+
+def test_take_model_waits_for_the_background_save(project_dir):
+    path = project_dir / "model.h5"
+    release = threading.Event()
+    model = base_model()
+    save = model.save
+    model.save = lambda *args, **kwargs: release.wait(timeout=30) and save(*args, **kwargs)
+    model_store.save_model(path, model, background=True, share=False)
+
+    context = PipelineContext()
+    context.put_model(path, model)
+    threading.Timer(0.2, release.set).start()
+    assert context.take_model(path) is model
+    assert path.exists() and not model_store.is_saving(path)
@@ -0,0 +1,129 @@
+import csv
+import json
+import pytest
+import tensorflow as tf
+from conftest import write_images
+from cnnClassifier.config.configuration import ConfigurationManager
+from cnnClassifier.components.prediction_cache import PredictionCache
+from cnnClassifier.pipeline import prediction
+from cnnClassifier.pipeline.prediction import PredictionPipeline
+
+
+@pytest.fixture
+def pipeline(project_dir, set_params):
+    set_params(IMAGE_SIZE=[8, 8, 3], SERVING_BATCH_BUCKETS=[], PREDICTION_CACHE_ON_DISK=False, PREDICTION_WORKERS=2)
+    config = ConfigurationManager().get_prediction_config()
+    tf.keras.utils.set_random_seed(0)
+    model = tf.keras.Sequential([
+        tf.keras.layers.Flatten(input_shape=(8, 8, 3)),
+        tf.keras.layers.Dense(2, activation="softmax")
+    ])
+    model.save(config.trained_model_path)
+
+    pipeline = PredictionPipeline(config)
+    batches = []
+    predict_batch = pipeline.predict_batch
+    pipeline.predict_batch = lambda images: batches.append(len(images)) or predict_batch(images)
+    pipeline.batches = batches
+    return pipeline
+
+
+def test_mixed_hits_and_misses_keep_the_input_order(pipeline, project_dir):
+    paths = [str(path) for path in write_images(project_dir / "slices", {"a": 12})]
+    expected = pipeline.predict(paths, batch_size=4)
+    assert [r["source"] for r in expected] == paths
+
+    # Every other image is now a cache hit
+    pipeline.cache = PredictionCache(pipeline.config.model_path, max_entries=100, ttl_seconds=0)
+    pipeline.predict(paths[::2], batch_size=4)
+    pipeline.batches.clear()
+
+    results = pipeline.predict(paths, batch_size=4)
+    assert [r["source"] for r in results] == paths
+    for result, reference in zip(results, expected):
+        assert result["probabilities"] == pytest.approx(reference["probabilities"])
+    assert pipeline.batches == [4, 2]
+    assert pipeline.cache.stats()["hits"] == 6
+
+
+def test_hits_are_yielded_without_waiting_for_a_batch(pipeline, project_dir):
+    paths = [str(path) for path in write_images(project_dir / "slices", {"a": 30})]
+    hits, misses = paths[:20], paths[20:]
+    pipeline.predict(hits, batch_size=4)
+    pipeline.batches.clear()
+
+    # Leading hits stream out before any batch is scored
+    results = pipeline.iter_predict(hits + misses, batch_size=4)
+    assert [next(results)["source"] for _ in range(20)] == hits
+    assert pipeline.batches == []
+    assert [r["source"] for r in results] == misses
+    assert pipeline.batches == [4, 4, 2]
+
+
+def test_a_lone_miss_is_flushed_after_four_batches_of_hits(pipeline, project_dir):
+    paths = [str(path) for path in write_images(project_dir / "slices", {"a": 25})]
+    miss, hits = paths[0], paths[1:]
+    pipeline.predict(hits, batch_size=4)
+    pipeline.batches.clear()
+
+    results = pipeline.iter_predict([miss] + hits, batch_size=4)
+    # The miss and the 15 hits behind it are held until 4 x batch_size results wait
+    assert [next(results)["source"] for _ in range(16)] == [miss] + hits[:15]
+    assert pipeline.batches == [1]
+    assert [r["source"] for r in results] == hits[15:]
+    assert pipeline.batches == [1]
+
+
+def test_decode_errors_keep_their_place(pipeline, project_dir):
+    paths = [str(path) for path in write_images(project_dir / "slices", {"a": 3})]
+    broken = project_dir / "slices" / "broken.png"
+    broken.write_bytes(b"not an image")
+    results = pipeline.predict([paths[0], str(broken), paths[1], paths[2]], batch_size=2)
+    assert [r["source"] for r in results] == [paths[0], str(broken), paths[1], paths[2]]
+    assert "error" in results[1] and all("error" not in r for r in results[::2])
+
+
+def test_collect_inputs_expands_directories_in_name_order(project_dir):
+    paths = write_images(project_dir / "slices", {"b": 2, "a": 2})
+    (project_dir / "slices" / "a" / "notes.txt").write_text("not an image")
+    single = write_images(project_dir / "single", {"c": 1})[0]
+
+    collected = PredictionPipeline.collect_inputs([str(project_dir / "slices"), single])
+    assert collected == sorted(str(path) for path in paths) + [str(single)]
+    assert PredictionPipeline.collect_inputs(str(single)) == [str(single)]
+
+
+def test_batched_results_match_one_image_at_a_time(pipeline, project_dir):
+    pipeline.cache = None
+    paths = [str(path) for path in write_images(project_dir / "slices", {"a": 5, "b": 5})]
+    batched = pipeline.predict(paths, batch_size=4)
+    assert pipeline.batches == [4, 4, 2]
+
+    single = pipeline.predict(paths, batch_size=1)
+    for result, reference in zip(batched, single):
+        assert result["probabilities"] == pytest.approx(reference["probabilities"], abs=1e-6)
+        assert result["confidence"] == max(result["probabilities"].values())
+
+
+def test_results_use_the_class_names_of_training(pipeline, project_dir):
+    pipeline.config.class_indices_file.parent.mkdir(parents=True, exist_ok=True)
+    pipeline.config.class_indices_file.write_text(json.dumps({"Normal": 1, "Cancer": 0}))
+    named = PredictionPipeline(pipeline.config)
+    result = named.predict(write_images(project_dir / "slices", {"a": 1}))[0]
+    assert list(result["probabilities"]) == ["Cancer", "Normal"]
+    assert result["prediction"] in ("Cancer", "Normal")
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".jsonl"])
+def test_cli_writes_one_row_per_image(pipeline, project_dir, suffix):
+    write_images(project_dir / "slices", {"a": 3, "b": 2})
+    output = project_dir / "out" / f"predictions{suffix}"
+    prediction.main([str(project_dir / "slices"), "--output", str(output), "--batch-size", "2"])
+
+    if suffix == ".csv":
+        with open(output, newline="") as f:
+            rows = list(csv.DictReader(f))
+        assert list(rows[0]) == ["source", "prediction", "confidence", "0", "1", "error"]
+    else:
+        rows = [json.loads(line) for line in output.read_text().splitlines()]
+    assert len(rows) == 5
@@ -0,0 +1,95 @@
+import time
+import sqlite3
+import pytest
+from cnnClassifier.components.prediction_cache import PredictionCache, model_fingerprint
+
+
+@pytest.fixture
+def model_file(tmp_path):
+    path = tmp_path / "model.h5"
+    path.write_bytes(b"weights v1")
+    return path
+
+
+def disk_rows(disk_path):
+    with sqlite3.connect(str(disk_path)) as db:
+        return db.execute("SELECT value FROM predictions ORDER BY created").fetchall()
+
+
+def test_lru_evicts_the_least_recently_used_entry(model_file):
+    cache = PredictionCache(model_file, max_entries=2, ttl_seconds=0)
+    cache.put(b"a", [1.0])
+    cache.put(b"b", [2.0])
+    # Reading "a" makes "b" the least recently used entry
+    assert cache.get(b"a") == [1.0]
+    cache.put(b"c", [3.0])
+
+    assert cache.get(b"b") is None
+    assert cache.get(b"a") == [1.0]
+    assert cache.get(b"c") == [3.0]
+    assert cache.stats()["entries"] == 2
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (3, 1)
+
+
+def test_entries_expire_after_the_ttl(model_file, tmp_path):
+    disk_path = tmp_path / "cache.sqlite"
+    cache = PredictionCache(model_file, max_entries=10, ttl_seconds=0.2, disk_path=disk_path)
+    cache.put(b"a", [1.0])
+    assert cache.get(b"a") == [1.0]
+    time.sleep(0.3)
+    # Neither the memory nor the disk layer returns the expired entry
+    assert cache.get(b"a") is None
+    cache.close()
+
+
+def test_a_new_model_never_reads_the_entries_of_the_old_one(model_file, tmp_path):
+    disk_path = tmp_path / "cache.sqlite"
+    cache = PredictionCache(model_file, max_entries=10, ttl_seconds=0, disk_path=disk_path)
+    cache.put(b"a", [1.0])
+    cache.close()
+    old_hash = cache.model_hash
+
+    model_file.write_bytes(b"weights v2")
+    assert model_fingerprint(model_file) != old_hash
+
+    cache.bind_model(model_file)
+    assert cache.get(b"a") is None
+    # Binding the new model deleted the rows of the old one from disk
+    assert disk_rows(disk_path) == []
+
+    reopened = PredictionCache(model_file, max_entries=10, ttl_seconds=0, disk_path=disk_path)
+    assert reopened.get(b"a") is None
+    reopened.close()
+
+
+def test_disk_entries_survive_a_reopen(model_file, tmp_path):
+    disk_path = tmp_path / "cache.sqlite"
+    cache = PredictionCache(model_file, max_entries=10, ttl_seconds=0, disk_path=disk_path)
+    for i in range(5):
+        cache.put(b"image %d" % i, [float(i)])
+    # close() writes the queued rows before returning
+    cache.close()
+
+    reopened = PredictionCache(model_file, max_entries=10, ttl_seconds=0, disk_path=disk_path)
+    assert [reopened.get(b"image %d" % i) for i in range(5)] == [[float(i)] for i in range(5)]
+    assert reopened.stats()["hits"] == 5
+    reopened.close()
+
+
+def test_prune_keeps_the_newest_rows_of_the_bound_model(model_file, tmp_path):
+    disk_path = tmp_path / "cache.sqlite"
+    cache = PredictionCache(model_file, max_entries=10, ttl_seconds=0, disk_path=disk_path, max_disk_entries=3)
+    for i in range(5):
+        cache.put(b"image %d" % i, [float(i)])
+        time.sleep(0.01)
+    cache.close()
+
+    assert disk_rows(disk_path) == [("[2.0]",), ("[3.0]",), ("[4.0]",)]
+
+    # Expired rows and rows of other models go too
+    with sqlite3.connect(str(disk_path)) as db:
+        db.execute("INSERT INTO predictions VALUES ('other', 'another model', '[9.0]', ?)", (time.time(),))
+        db.execute("UPDATE predictions SET created = 0 WHERE value = '[2.0]'")
+    cache.ttl_seconds = 60
+    cache.prune()
+    assert disk_rows(disk_path) == [("[3.0]",), ("[4.0]",)]
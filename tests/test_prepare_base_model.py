@@ -0,0 +1,66 @@
+import json
+import pytest
+import tensorflow as tf
+from conftest import write_images
+from cnnClassifier.config.configuration import ConfigurationManager
+from cnnClassifier.components.prepare_base_model import HEADS, PrepareBaseModel
+
+
+def benchmark(set_params, **params):
+    set_params(IMAGE_SIZE=[32, 32, 3], WEIGHTS=None, CLASSES=2, BATCH_SIZE=4, BACKBONE_BENCHMARK=["MobileNetV3Small"],
+               BACKBONE_BENCHMARK_BATCH_SIZES=[1, 2], **params)
+    config = ConfigurationManager().get_prepare_base_model_config()
+    write_images(config.training_data, {"a": 6, "b": 6})
+    return PrepareBaseModel(config=config).benchmark_backbones(latency_runs=2)["MobileNetV3Small"]
+
+
+def test_backbone_report_without_accuracy(project_dir, set_params):
+    report = benchmark(set_params)
+    assert set(report["latency"]) == {"batch_1_ms", "batch_2_ms"}
+    assert report["gflops"] > 0 and report["params"] > 0 and report["model_size_mb"] > 0
+    assert report["val_accuracy"] is None
+
+
+def test_backbone_report_with_accuracy(project_dir, set_params):
+    report = benchmark(set_params, BACKBONE_BENCHMARK_ACCURACY_EPOCHS=1, VALIDATION_SPLIT=0.5)
+    assert 0.0 <= report["val_accuracy"] <= 1.0
+
+
+def feature_extractor():
+    inputs = tf.keras.layers.Input(shape=(8, 8, 3))
+    return tf.keras.models.Model(inputs, tf.keras.layers.Conv2D(4, 3)(inputs))
+
+
+@pytest.mark.parametrize("head, head_params", [
+    ("flatten", 6 * 6 * 4 * 2 + 2),
+    ("global_avg_pool", 4 * 2 + 2),
+    ("global_max_pool", 4 * 2 + 2),
+    ("pooled_mlp", (4 * 16 + 16) + (16 * 2 + 2)),
+])
+def test_heads_build_on_a_frozen_backbone(head, head_params):
+    backbone = feature_extractor()
+    model = PrepareBaseModel._prepare_full_model(backbone, classes=2, freeze_all=True, freeze_till=None,
+                                                 learning_rate=0.01, head=head, head_units=16, head_dropout=0.5)
+    assert model.count_params() - backbone.count_params() == head_params
+    assert not any(layer.trainable_weights for layer in backbone.layers)
+    assert model.output.shape[-1] == 2
+    assert any(isinstance(layer, tf.keras.layers.Dropout) for layer in model.layers) == (head == "pooled_mlp")
+
+
+def test_unknown_head_is_rejected():
+    with pytest.raises(ValueError, match="HEAD"):
+        PrepareBaseModel._prepare_full_model(feature_extractor(), classes=2, freeze_all=True, freeze_till=None,
+                                             learning_rate=0.01, head="attention")
+
+
+def test_head_benchmark_reports_every_head(project_dir, set_params):
+    set_params(IMAGE_SIZE=[8, 8, 3], CLASSES=2, HEAD_UNITS=16)
+    config = ConfigurationManager().get_prepare_base_model_config()
+    prepare_base_model = PrepareBaseModel(config=config)
+    prepare_base_model.model = feature_extractor()
+
+    report = prepare_base_model.benchmark_heads(latency_runs=2)
+    assert list(report) == list(HEADS)
+    assert json.loads(config.head_report_file.read_text()) == report
+    assert report["global_avg_pool"]["head_params"] < report["flatten"]["head_params"]
+    assert all(entry["latency_ms_batch_1"] > 0 and entry["model_size_mb"] >= 0 for entry in report.values())
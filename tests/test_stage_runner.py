@@ -0,0 +1,92 @@
+from pathlib import Path
+import pytest
+from cnnClassifier.pipeline import stage_runner
+from cnnClassifier.pipeline.stage_runner import Stage, StageRunner
+
+RUNS = []
+
+
+class CountingPipeline:
+    """
+    Stage pipeline writing its output file from its dependency file.
+    """
+    def __init__(self, context=None):
+        self.context = context
+
+    def main(self):
+        RUNS.append(self)
+        dep = Path("artifacts/data_ingestion/dataset_index.csv")
+        out = Path("artifacts/training/class_indices.json")
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(dep.read_text())
+
+
+STAGE = Stage(
+    name="Counting stage",
+    pipeline="test_stage_runner:CountingPipeline",
+    config_keys=["training"],
+    params_keys=["EPOCHS"],
+    deps=["data_ingestion.index_file"],
+    outs=["training.class_indices_file"],
+    code=["components/counting.py"]
+)
+
+
+@pytest.fixture
+def stage_project(project_dir, monkeypatch):
+    RUNS.clear()
+    package_dir = project_dir / "package"
+    (package_dir / "components").mkdir(parents=True)
+    (package_dir / "components" / "counting.py").write_text("VERSION = 1\n")
+    monkeypatch.setattr(stage_runner, "PACKAGE_DIR", package_dir)
+
+    dep = project_dir / "artifacts" / "data_ingestion" / "dataset_index.csv"
+    dep.parent.mkdir(parents=True)
+    dep.write_text("path,class\n")
+    return project_dir
+
+
+def run_stage(**kwargs):
+    manifest = StageRunner(stages=[STAGE]).run(**kwargs)
+    return manifest["stages"][0]["status"]
+
+
+def test_stage_is_skipped_when_nothing_changed(stage_project):
+    assert run_stage() == "ran"
+    assert run_stage() == "skipped"
+    assert len(RUNS) == 1
+    assert run_stage(force=True) == "ran"
+
+
+def test_stage_reruns_when_a_params_key_changes(stage_project, set_params):
+    assert run_stage() == "ran"
+    # Keys the stage does not read leave it up to date
+    set_params(PREDICTION_BATCH_SIZE=7)
+    assert run_stage() == "skipped"
+    set_params(EPOCHS=2)
+    assert run_stage() == "ran"
+    assert run_stage() == "skipped"
+
+
+def test_stage_reruns_when_a_dependency_changes(stage_project):
+    assert run_stage() == "ran"
+    (stage_project / "artifacts" / "data_ingestion" / "dataset_index.csv").write_text("path,class\na.png,a\n")
+    assert run_stage() == "ran"
+    assert run_stage() == "skipped"
+
+
+def test_stage_reruns_when_its_code_changes(stage_project):
+    assert run_stage() == "ran"
+    (stage_project / "package" / "components" / "counting.py").write_text("VERSION = 2\n")
+    assert run_stage() == "ran"
+    assert run_stage() == "skipped"
+
+
+def test_stage_reruns_when_an_output_changes_or_disappears(stage_project):
+    out = stage_project / "artifacts" / "training" / "class_indices.json"
+    assert run_stage() == "ran"
+    out.write_text("edited")
+    assert run_stage() == "ran"
+    out.unlink()
+    assert run_stage() == "ran"
+    assert run_stage() == "skipped"
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from cnnClassifier.components.study_aggregation import SliceAggregator
+
+SLICES = np.array([[0.9, 0.1], [0.5, 0.5], [0.2, 0.8]])
+
+
+def aggregate(method, slices=SLICES, **kwargs):
+    aggregator = SliceAggregator(2, method=method, **kwargs)
+    aggregator.update(slices)
+    return aggregator.result()
+
+
+def test_mean_averages_the_slices():
+    np.testing.assert_allclose(aggregate("mean"), [1.6 / 3, 1.4 / 3])
+
+
+def test_max_takes_the_highest_probability_per_class():
+    np.testing.assert_allclose(aggregate("max"), np.array([0.9, 0.8]) / 1.7)
+
+
+def test_top_k_averages_the_highest_probabilities_per_class():
+    np.testing.assert_allclose(aggregate("top_k", top_k=2), np.array([0.7, 0.65]) / 1.35)
+    # With k at least the slice count, top_k is the mean
+    np.testing.assert_allclose(aggregate("top_k", top_k=10), aggregate("mean"))
+
+
+def test_attention_weights_slices_by_confidence():
+    temperature = 0.5
+    entropy = -(SLICES * np.log(SLICES)).sum(axis=1)
+    weights = np.exp((1 - entropy / np.log(2)) / temperature)
+    expected = (weights[:, None] * SLICES).sum(axis=0) / weights.sum()
+    np.testing.assert_allclose(aggregate("attention", temperature=temperature), expected / expected.sum())
+
+    # At a low temperature the most confident slice decides
+    np.testing.assert_allclose(aggregate("attention", temperature=0.01), SLICES[0], atol=1e-3)
+
+
+@pytest.mark.parametrize("method", ["mean", "max", "top_k", "attention"])
+def test_streaming_updates_match_one_update(method):
+    aggregator = SliceAggregator(2, method=method, top_k=2)
+    for probabilities in SLICES:
+        aggregator.update(probabilities)
+    assert aggregator.count == 3
+    np.testing.assert_allclose(aggregator.result(), aggregate(method, top_k=2))
+    assert aggregator.result().sum() == pytest.approx(1.0)
+
+
+def test_no_result_before_the_first_slice_and_unknown_methods_fail():
+    aggregator = SliceAggregator(2)
+    aggregator.update(np.empty((0, 2)))
+    assert aggregator.result() is None
+    with pytest.raises(ValueError):
+        SliceAggregator(2, method="median")